@@ -0,0 +1,189 @@
+"""
+Micro-benchmark for per-company message aggregation (ingest.Dataset.add_message).
+
+For each message count N it builds N synthetic message records spread over
+N/5 companies and aggregates them twice: with OutreachAggregate (slots,
+flag bits, interned mediums/accounts/contacts in counter arrays) and with
+the dict-of-defaultdicts-and-sets aggregate it replaced, kept here as the
+baseline. It reports aggregation throughput (messages/s, untraced) and the
+memory the aggregates hold per company (tracemalloc, after the message
+rows are dropped). Results are appended to bench_aggregate_results.jsonl
+with the current commit.
+
+Usage:
+  python bench_aggregate.py [--sizes 100000,1000000] [--repeat 3]
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+from bench_pipeline import ACCOUNTS, MEDIUMS, git_commit, load_results
+from ingest import Dataset, MessageTable, company_record, iso_date, message_record
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_FILE = os.path.join(SCRIPT_DIR, 'bench_aggregate_results.jsonl')
+MESSAGES_PER_COMPANY = 5
+
+
+# ============================================================
+# SYNTHETIC MESSAGES
+# ============================================================
+def generate(n_messages, seed=7):
+    """(companies, [(message, [company id])]) in the shape the adapters produce."""
+    rng = random.Random(seed)
+    n_companies = max(1, n_messages // MESSAGES_PER_COMPANY)
+    n_contacts = max(1, n_companies * 3 // 2)
+    companies = {f'C{i}': company_record(f'Company {i}') for i in range(n_companies)}
+    contacts = [f'P{i}' for i in range(n_contacts)]
+    messages = []
+    for _ in range(n_messages):
+        responded = rng.random() < 0.08
+        contact = rng.choice(contacts)
+        messages.append((message_record(
+            day=rng.randint(19700, 20800),
+            medium=rng.choice(MEDIUMS),
+            account=rng.choice(ACCOUNTS),
+            contact_ids=[contact],
+            contact=contact,
+            responded=responded,
+            scheduled=responded and rng.random() < 0.3,
+            assisted=responded and rng.random() < 0.1,
+            not_interested=responded and rng.random() < 0.2,
+            opened=rng.random() < 0.3,
+        ), [f'C{rng.randrange(n_companies)}']))
+    return companies, messages
+
+
+# ============================================================
+# BASELINE — the dict aggregate OutreachAggregate replaced
+# ============================================================
+def _dict_aggregate():
+    return {
+        'msgsSent': 0, 'byMedium': defaultdict(int), 'byAccount': defaultdict(int),
+        'responded': False, 'respondedCount': 0,
+        'scheduledIntro': False, 'assistedMeeting': False,
+        'notInterested': False, 'followUpLater': False,
+        'contacts': set(), 'firstDay': None, 'lastDay': None,
+        'meetingDay': None, 'opened': False, 'viewedProfile': False,
+    }
+
+
+def aggregate_dicts(companies, messages):
+    """The former Dataset.add_message loop, message rows included."""
+    aggregates = defaultdict(_dict_aggregate)
+    rows = []
+    for msg, company_ids in messages:
+        flags = msg['flags']
+        day = msg['day']
+        ids = [cid for cid in dict.fromkeys(company_ids) if cid in companies]
+        for cid in ids:
+            agg = aggregates[cid]
+            agg['msgsSent'] += 1
+            if msg['medium']:
+                agg['byMedium'][msg['medium']] += 1
+            if msg['account']:
+                agg['byAccount'][msg['account']] += 1
+            agg['contacts'].update(msg['contactIds'])
+            if flags & 1:
+                agg['responded'] = True
+                agg['respondedCount'] += 1
+            agg['scheduledIntro'] |= bool(flags & 2)
+            agg['assistedMeeting'] |= bool(flags & 4)
+            agg['notInterested'] |= bool(flags & 8)
+            agg['followUpLater'] |= bool(flags & 16)
+            agg['opened'] |= bool(flags & 32)
+            agg['viewedProfile'] |= bool(flags & 64)
+            if day is not None:
+                if agg['firstDay'] is None or day < agg['firstDay']:
+                    agg['firstDay'] = day
+                if agg['lastDay'] is None or day > agg['lastDay']:
+                    agg['lastDay'] = day
+            if msg['meetingDay'] is not None:
+                agg['meetingDay'] = msg['meetingDay']
+        rows.append({
+            'date': iso_date(day), 'day': day, 'medium': msg['medium'], 'account': msg['account'],
+            'contact': msg['contact'], 'company': ', '.join(companies[cid]['name'] for cid in ids),
+        })
+    rows.clear()  # only the aggregates should stay live
+    return aggregates
+
+
+def aggregate_slots(companies, messages):
+    dataset = Dataset()
+    dataset.companies = companies
+    for msg, company_ids in messages:
+        dataset.add_message(msg, company_ids)
+    dataset.messages = MessageTable()  # only the aggregates (and their vocabularies) should stay live
+    return dataset
+
+
+# ============================================================
+# RUNNER
+# ============================================================
+def measure(build, companies, messages, repeat):
+    """(messages/s over the best of `repeat` runs, aggregate bytes per company)."""
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = build(companies, messages)
+        best = min(best, time.perf_counter() - start)
+        del result
+
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    result = build(companies, messages)
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del result
+    return len(messages) / best, held / len(companies)
+
+
+def report(result, previous):
+    for kind in ('slots', 'dict'):
+        r = result[kind]
+        print(f"  {kind:>5}: {r['msgsPerSec'] / 1e3:,.0f}k msgs/s, {r['bytesPerCompany']:,.0f} B/company")
+    print(f"    slots vs dict: {result['slots']['msgsPerSec'] / result['dict']['msgsPerSec']:.2f}x throughput, "
+          f"{result['slots']['bytesPerCompany'] / result['dict']['bytesPerCompany']:.2f}x memory")
+    if previous:
+        old = previous['slots']
+        delta = (result['slots']['msgsPerSec'] - old['msgsPerSec']) / old['msgsPerSec'] * 100
+        mem = result['slots']['bytesPerCompany'] - old['bytesPerCompany']
+        print(f"    vs {previous['commit'] or 'previous'}: throughput {delta:+.1f}%, {mem:+.0f} B/company")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-company message aggregation.')
+    parser.add_argument('--sizes', default='100000,1000000', help='message counts')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per size (best is kept)')
+    parser.add_argument('--results', default=RESULTS_FILE)
+    args = parser.parse_args()
+
+    commit = git_commit()
+    history = load_results(args.results)
+    for size in [int(s) for s in args.sizes.split(',') if s]:
+        companies, messages = generate(size)
+        print(f"Aggregating {size} messages over {len(companies)} companies...")
+        result = {'size': size, 'companies': len(companies)}
+        for kind, build in (('slots', aggregate_slots), ('dict', aggregate_dicts)):
+            rate, per_company = measure(build, companies, messages, args.repeat)
+            result[kind] = {'msgsPerSec': round(rate), 'bytesPerCompany': round(per_company, 1)}
+        result.update({'commit': commit, 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                       'python': sys.version.split()[0]})
+        previous = next((r for r in reversed(history) if r['size'] == size), None)
+        report(result, previous)
+        with open(args.results, 'a') as f:
+            f.write(json.dumps(result) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+"""
+End-to-end benchmark for fetch_airtable.main() against fixture_server.py.
+
+For each size N it generates a synthetic base (N companies, N outreach
+messages, 1.5N contacts, plus pipeline/action sheet tabs), serves it from a
+fixture server subprocess, runs the full build in a fresh subprocess and
+records per-stage wall time and peak RSS. Results are appended to
+bench_results.jsonl with the current commit so regressions show up across
+commits.
+
+Usage:
+  python bench_pipeline.py [--sizes 1000,10000,100000] [--latency 0.02]
+                           [--error-rate 0] [--uncached 0.05] [--rate-limit 1000]
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_FILE = os.path.join(SCRIPT_DIR, 'bench_results.jsonl')
+RESULT_PREFIX = 'BENCH_RESULT '
+
+STATES = [
+    ('FL', 'Florida', 33), ('GA', 'Georgia', 30), ('TX', 'Texas', 75), ('CA', 'California', 90),
+    ('NY', 'New York', 10), ('PA', 'Pennsylvania', 15), ('OH', 'Ohio', 43), ('NC', 'North Carolina', 27),
+    ('LA', 'Louisiana', 70), ('TN', 'Tennessee', 37), ('AZ', 'Arizona', 85), ('CO', 'Colorado', 80),
+]
+OWNERSHIP = ["Mom 'n Pop", 'Private Equity', 'Publicly Traded', 'Non-Profit', 'CLOSED', 'GOV']
+MEDIUMS = ['LinkedIn Sales Navigator', 'Phone Call', 'Text', 'Voicemail', 'Email']
+ACCOUNTS = ['Dylan Poler', 'Kevin Poler', 'Noel Poler']
+PIPELINE_STATUSES = ['Active - LOI', 'New Lead', 'Stand By', 'Stalled', 'Due Diligence']
+WORDS = ['Recovery', 'Behavioral', 'Health', 'Detox', 'Wellness', 'Harbor', 'Serenity', 'Pathways',
+         'Center', 'Treatment', 'Haven', 'Summit', 'Ridge', 'Coastal', 'New', 'Hope', 'Bridge']
+
+
+# ============================================================
+# SYNTHETIC BASE
+# ============================================================
+def _record_id(prefix, i):
+    return f'rec{prefix}{i:010d}'
+
+
+def generate_fixtures(fixture_dir, n_companies, n_messages, seed=7):
+    """Write a synthetic Airtable base and sheet tabs in fixture_server layout."""
+    import fetch_airtable
+
+    rng = random.Random(seed)
+    os.makedirs(os.path.join(fixture_dir, 'airtable'), exist_ok=True)
+    os.makedirs(os.path.join(fixture_dir, 'sheets'), exist_ok=True)
+    modified = '2026-01-01T00:00:00.000Z'
+
+    companies = []
+    for i in range(n_companies):
+        abbr, full, zip2 = rng.choice(STATES)
+        name = f"{' '.join(rng.sample(WORDS, 3))} {i}"
+        other = rng.sample(STATES, rng.randint(0, 2))
+        companies.append({'id': _record_id('C', i), 'lastModified': modified, 'fields': {
+            'Name': name,
+            'HQ Address': f"{rng.randint(1, 9999)} Main St, Springfield, {abbr} {zip2}{rng.randint(0, 999):03d}",
+            'Full HQ State Name': full,
+            'HQ State': abbr,
+            'Ownership': rng.choice(OWNERSHIP),
+            'All State(s) Operating In': [full] + [s[1] for s in other if s[1] != full],
+            'Override': rng.random() < 0.05,
+            'Website': f'https://example{i}.com/',
+            'State Tier': f'Tier {rng.randint(1, 3)}',
+            'Bradford Facility': 'Bradford Facility' if rng.random() < 0.002 else '',
+        }})
+
+    n_contacts = max(1, n_companies * 3 // 2)
+    contacts = [{'id': _record_id('P', i), 'lastModified': modified, 'fields': {
+        'Name': f'Contact {i}',
+        'Companies': [_record_id('C', rng.randrange(n_companies))],
+    }} for i in range(n_contacts)]
+
+    outreach = []
+    for i in range(n_messages):
+        responded = rng.random() < 0.08
+        outreach.append({'id': _record_id('O', i), 'lastModified': modified, 'fields': {
+            'Contacts': [_record_id('P', rng.randrange(n_contacts))],
+            'Date Sent': f'20{rng.randint(24, 26)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T15:00:00.000Z',
+            'Message Medium': rng.choice(MEDIUMS),
+            'Account': rng.choice(ACCOUNTS),
+            'Responded': responded,
+            'Scheduled Intro Call': 'Yes' if responded and rng.random() < 0.3 else '',
+            'Assisted Meeting': 'Yes' if responded and rng.random() < 0.1 else '',
+            'Not Interested': ['recNI'] if responded and rng.random() < 0.2 else [],
+            'Opened': 'Yes' if rng.random() < 0.3 else '',
+        }})
+
+    deals = rng.sample(companies, min(len(companies), max(5, n_companies // 50)))
+
+    for table, records in (('Companies', companies), ('Contacts', contacts), ('Cold Outreach', outreach)):
+        with open(os.path.join(fixture_dir, 'airtable', f'{table}.json'), 'w') as f:
+            json.dump(records, f)
+
+    with open(os.path.join(fixture_dir, 'sheets', f'{fetch_airtable.PIPELINE_GID}.csv'), 'w', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(['Bradford Pipeline Dashboard'])
+        w.writerow([])
+        w.writerow(['#', 'Facility Name', 'State(s)', 'Type', 'Status', 'Priority', 'Key Contact', 'Notes'])
+        for i, c in enumerate(deals):
+            w.writerow([i + 1, c['fields']['Name'], c['fields']['HQ State'], 'SUD',
+                        rng.choice(PIPELINE_STATUSES), rng.choice(['1 - High', '2 - Medium', '3 - Low']),
+                        f'Contact {i}', ''])
+    with open(os.path.join(fixture_dir, 'sheets', f'{fetch_airtable.ACTIONS_GID}.csv'), 'w', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(['Action Tracker'])
+        w.writerow([])
+        w.writerow(['Priority', 'Action Item', 'Facility', 'Owner', 'Deadline', 'Status', 'Notes', 'Pipeline Status'])
+        for c in deals:
+            w.writerow(['High', 'Follow up', c['fields']['Name'], 'Dylan', '', 'Pending', '', ''])
+
+    return companies
+
+
+def seed_geocode_cache(path, companies, uncached_fraction, seed=7):
+    """Pre-populate the geocode cache so only `uncached_fraction` goes to the geocoder."""
+    from ingest import normalize_name
+
+    rng = random.Random(seed)
+    cache = {}
+    for c in companies:
+        if rng.random() >= uncached_fraction:
+            key = normalize_name(c['fields']['Name'])
+            cache[key] = [rng.uniform(25, 48), rng.uniform(-124, -67)]
+    with open(path, 'w') as f:
+        json.dump(cache, f)
+
+
+# ============================================================
+# RUNNER
+# ============================================================
+def run_one(rate_limit):
+    """Child process: run the build once and print stage timings + peak RSS."""
+    import fetch_airtable
+
+    fetch_airtable.AIRTABLE_RATE_LIMIT = rate_limit
+    start = time.perf_counter()
+    summary = fetch_airtable.main()
+    summary['total'] = time.perf_counter() - start
+    # ru_maxrss is KB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    summary['peakRssMB'] = rss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    summary['dataJsonBytes'] = os.path.getsize(os.path.join(fetch_airtable.OUTPUT_DIR, 'data.json'))
+    print(RESULT_PREFIX + json.dumps(summary), flush=True)
+
+
+def start_fixture_server(fixture_dir, args):
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(SCRIPT_DIR, 'fixture_server.py'), fixture_dir, '--port', '0',
+         '--latency', str(args.latency), '--jitter', str(args.jitter),
+         '--error-rate', str(args.error_rate)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    line = proc.stdout.readline()
+    return proc, line.strip().rsplit(' ', 1)[-1]
+
+
+def run_scenario(size, args, work_dir):
+    fixture_dir = os.path.join(work_dir, f'fixtures_{size}')
+    out_dir = os.path.join(work_dir, f'out_{size}')
+    os.makedirs(out_dir, exist_ok=True)
+
+    t = time.perf_counter()
+    companies = generate_fixtures(fixture_dir, size, size)
+    cache_file = os.path.join(out_dir, 'geocode_cache.json')
+    seed_geocode_cache(cache_file, companies, args.uncached)
+    print(f"  generated {size} companies / {size} messages in {time.perf_counter() - t:.1f}s")
+
+    server, url = start_fixture_server(fixture_dir, args)
+    try:
+        env = dict(os.environ, AIRTABLE_PAT='fixture', AIRTABLE_API_URL=url, GSHEETS_URL=url,
+                   CENSUS_GEOCODER_URL=url, DASHBOARD_OUTPUT_DIR=out_dir, GEOCODE_CACHE_FILE=cache_file,
+                   GEOCODE_CACHE_DB=os.path.join(out_dir, 'geocode_cache.sqlite'),
+                   AIRTABLE_STORE_DIR=os.path.join(out_dir, 'store'))
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--run-one', '--rate-limit', str(args.rate_limit)],
+            env=env, capture_output=True, text=True,
+        )
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.verbose or proc.returncode:
+        print(proc.stdout)
+        print(proc.stderr)
+    for line in proc.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    raise RuntimeError(f'benchmark run for size {size} failed (exit {proc.returncode})')
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPT_DIR,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ''
+
+
+def load_results(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def report(result, previous):
+    stages = ', '.join(f"{k} {v:.2f}s" for k, v in result['stages'].items())
+    line = (f"  size {result['size']:>7}: total {result['total']:.2f}s, peak RSS {result['peakRssMB']:.0f} MB, "
+            f"data.json {result['dataJsonBytes'] / 1e6:.1f} MB, {result['http']['requests']} requests")
+    print(line)
+    print(f"    stages: {stages}")
+    if previous:
+        delta = (result['total'] - previous['total']) / previous['total'] * 100 if previous['total'] else 0
+        rss = result['peakRssMB'] - previous['peakRssMB']
+        print(f"    vs {previous['commit'] or 'previous'}: total {delta:+.1f}%, peak RSS {rss:+.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the data build against local fixtures.')
+    parser.add_argument('--sizes', default='1000,10000,100000')
+    parser.add_argument('--latency', type=float, default=0.02, help='per-request latency of the fixture server')
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--uncached', type=float, default=0.05, help='fraction of companies not in the geocode cache')
+    parser.add_argument('--rate-limit', type=float, default=1000,
+                        help='Airtable requests/second (the real limit is 5)')
+    parser.add_argument('--results', default=RESULTS_FILE)
+    parser.add_argument('--keep', action='store_true', help='keep the generated fixtures and outputs')
+    parser.add_argument('--verbose', action='store_true')
+    parser.add_argument('--run-one', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        return run_one(args.rate_limit)
+
+    commit = git_commit()
+    history = load_results(args.results)
+    work_dir = tempfile.mkdtemp(prefix='dashboard_bench_')
+    try:
+        for size in [int(s) for s in args.sizes.split(',') if s]:
+            print(f"Benchmarking {size}...")
+            result = run_scenario(size, args, work_dir)
+            result.update({
+                'size': size, 'commit': commit, 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': sys.version.split()[0],
+                'params': {'latency': args.latency, 'errorRate': args.error_rate,
+                           'uncached': args.uncached, 'rateLimit': args.rate_limit},
+            })
+            previous = next((r for r in reversed(history)
+                             if r['size'] == size and r.get('params') == result['params']), None)
+            report(result, previous)
+            with open(args.results, 'a') as f:
+                f.write(json.dumps(result) + '\n')
+    finally:
+        if args.keep:
+            print(f"Fixtures and outputs kept in {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Per-zoom marker clusters for the dashboard map.
+
+Companies are bucketed on a Web Mercator pixel grid for each zoom level from
+MIN_ZOOM to MAX_ZOOM. A cell is RADIUS_PX wide at its zoom, so a cell at zoom
+z is exactly four cells at z + 1 and clusters nest from level to level. Each
+cluster carries its centroid, member count, counts per ownership / outreach
+status / pipeline category, and the indices of its members in the companies
+list. Cells holding a single company are left out; index.html draws clusters
+at or below MAX_ZOOM, and everything not in a cluster as an ordinary marker.
+
+The category rules mirror the dashboard's filter definitions (buildFilters).
+"""
+
+import math
+
+MIN_ZOOM = 3
+MAX_ZOOM = 9
+RADIUS_PX = 60
+TILE_SIZE = 256
+
+STATUS_RULES = (
+    ('assisted', lambda c: c.get('assistedMeeting')),
+    ('scheduled', lambda c: c.get('scheduledIntro')),
+    ('responded', lambda c: c.get('responded')),
+    ('contacted', lambda c: c.get('msgsSent', 0) > 0 and not c.get('responded')),
+    ('not_interested', lambda c: c.get('notInterested')),
+    ('follow_up', lambda c: c.get('followUpLater')),
+    ('overridden', lambda c: c.get('override')),
+    ('not_overridden', lambda c: not c.get('override')),
+)
+
+
+def pipeline_category(company):
+    """Pipeline filter key for a company, or None when it isn't in the pipeline."""
+    status = company.get('pipelineStatus') or ''
+    if not company.get('inPipeline') or not status:
+        return None
+    if status.startswith('Active'):
+        return 'active'
+    if status == 'New Lead':
+        return 'new_lead'
+    if status == 'Stand By':
+        return 'stand_by'
+    if status == 'Stalled':
+        return 'stalled'
+    if 'Due Diligence' in status or 'Placing Bid' in status:
+        return 'due_diligence'
+    return None
+
+
+PIPELINE_KEYS = ('active', 'new_lead', 'stand_by', 'stalled', 'due_diligence')
+
+
+def _project(lat, lng):
+    """Web Mercator position in [0, 1) world units."""
+    sin = math.sin(math.radians(max(-85.0511, min(85.0511, lat))))
+    x = lng / 360 + 0.5
+    y = 0.5 - math.log((1 + sin) / (1 - sin)) / (4 * math.pi)
+    return x, y
+
+
+def build_clusters(companies, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM, radius=RADIUS_PX):
+    """Return the 'clusters' output section for a list of company rows."""
+    ownerships = sorted({c.get('ownership') or '' for c in companies})
+    own_index = {o: i for i, o in enumerate(ownerships)}
+    pipe_index = {k: i for i, k in enumerate(PIPELINE_KEYS)}
+
+    # Per-company facts, computed once and reused at every zoom level
+    points = []
+    for i, c in enumerate(companies):
+        if not c.get('lat') or not c.get('lng'):
+            continue
+        x, y = _project(c['lat'], c['lng'])
+        statuses = [s for s, (_, rule) in enumerate(STATUS_RULES) if rule(c)]
+        pipe = pipeline_category(c)
+        points.append((i, x, y, c['lat'], c['lng'], own_index[c.get('ownership') or ''], statuses,
+                       pipe_index[pipe] if pipe else None))
+
+    zooms = {}
+    for z in range(min_zoom, max_zoom + 1):
+        cells_per_world = TILE_SIZE * 2 ** z / radius
+        cells = {}
+        for i, x, y, lat, lng, own, statuses, pipe in points:
+            key = (int(x * cells_per_world), int(y * cells_per_world))
+            cell = cells.get(key)
+            if cell is None:
+                cell = cells[key] = {
+                    'lat': 0.0, 'lng': 0.0, 'count': 0,
+                    'ownership': [0] * len(ownerships),
+                    'status': [0] * len(STATUS_RULES),
+                    'pipeline': [0] * len(PIPELINE_KEYS),
+                    'members': [],
+                }
+            cell['lat'] += lat
+            cell['lng'] += lng
+            cell['count'] += 1
+            cell['ownership'][own] += 1
+            for s in statuses:
+                cell['status'][s] += 1
+            if pipe is not None:
+                cell['pipeline'][pipe] += 1
+            cell['members'].append(i)
+        out = []
+        for key in sorted(cells):
+            cell = cells[key]
+            if cell['count'] < 2:
+                continue  # lone companies are drawn as ordinary markers
+            cell['lat'] = round(cell['lat'] / cell['count'], 5)
+            cell['lng'] = round(cell['lng'] / cell['count'], 5)
+            out.append(cell)
+        zooms[str(z)] = out
+
+    return {
+        'minZoom': min_zoom,
+        'maxZoom': max_zoom,
+        'radius': radius,
+        'categories': {
+            'ownership': ownerships,
+            'status': [key for key, _ in STATUS_RULES],
+            'pipeline': list(PIPELINE_KEYS),
+        },
+        'zooms': zooms,
+    }
@@ -0,0 +1,301 @@
+"""
+Output writers for the dashboard data.
+
+Besides the monolithic data.json, the build writes one shard per top-level
+section (companies, pipeline, actions, messages, meta) under data/, named by
+a hash of its content, plus a small data/manifest.json pointing at the
+current shards. A shard's URL only changes when its content does, so browsers
+and the CDN re-download just the sections that changed since the last run.
+
+All JSON goes through write_json, which streams compact JSON to disk in
+batches (orjson when installed, else the stdlib C encoder) and writes .gz
+and, when the brotli module is available, .br siblings in the same pass.
+Files are written under a temp name and renamed into place, so a crash
+mid-write never leaves a truncated file behind. content_digest gives a
+key-order-independent hash of the output so unchanged runs can skip writing.
+
+The companies list can optionally be written column-wise (encode_columnar):
+one array per field, low-cardinality strings dictionary-encoded as small ints
+and booleans packed into bitsets. The messages use the same layout, built
+straight from their code columns (ingest.MessageTable.archive). index.html
+decodes both back to row objects.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import time
+import zlib
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SHARD_DIR = 'data'
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+COMPRESSED_SUFFIXES = ('.gz', '.br')
+
+
+# ============================================================
+# STREAMING JSON WRITER
+# ============================================================
+# Long lists are encoded this many items at a time, so memory holds one batch of text
+LIST_BATCH = 500
+
+_encoder = json.JSONEncoder(separators=(',', ':'))
+_canonical_encoder = json.JSONEncoder(separators=(',', ':'), sort_keys=True)
+
+
+def _dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return _encoder.encode(obj).encode('utf-8')
+
+
+def _dumps_canonical(obj):
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+    return _canonical_encoder.encode(obj).encode('utf-8')
+
+
+def iter_json(obj, canonical=False):
+    """Yield compact JSON for obj as byte chunks.
+
+    Dicts are walked key by key and long lists are encoded in LIST_BATCH-item
+    slices, each through the one-shot C (or orjson) encoder. With canonical
+    set, keys are sorted at every level.
+    """
+    dumps = _dumps_canonical if canonical else _dumps
+    if isinstance(obj, dict) and obj:
+        items = sorted(obj.items(), key=lambda kv: str(kv[0])) if canonical else obj.items()
+        for i, (key, value) in enumerate(items):
+            yield (b',' if i else b'{') + dumps(str(key)) + b':'
+            yield from iter_json(value, canonical)
+        yield b'}'
+    elif isinstance(obj, list) and len(obj) > LIST_BATCH:
+        for i in range(0, len(obj), LIST_BATCH):
+            yield (b',' if i else b'[') + dumps(obj[i:i + LIST_BATCH])[1:-1]
+        yield b']'
+    else:
+        yield dumps(obj)
+
+
+def content_digest(obj):
+    """sha256 of obj's canonical JSON (sorted keys, compact), independent of dict order."""
+    digest = hashlib.sha256()
+    for chunk in iter_json(obj, canonical=True):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_digest(path):
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            return f.read().strip()
+    return None
+
+
+def write_digest(path, digest):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        f.write(digest + '\n')
+    os.replace(tmp, path)
+
+
+def write_json(obj, path, compress=True, atomic=True):
+    """Stream obj as compact JSON to path, plus path.gz / path.br when compress is set.
+
+    With atomic set, everything is written to .tmp names first and renamed
+    into place at the end. Returns {'bytes', 'gzBytes', 'brBytes', 'sha256', 'seconds'}.
+    """
+    if atomic:
+        stats = write_json(obj, path + '.tmp', compress, atomic=False)
+        _replace_with_siblings(path + '.tmp', path)
+        return stats
+
+    start = time.perf_counter()
+    digest = hashlib.sha256()
+    # wbits=31 -> gzip container; zlib leaves the header mtime at 0, so output is reproducible
+    gz = zlib.compressobj(9, zlib.DEFLATED, 31) if compress else None
+    br = brotli.Compressor(quality=9) if compress and brotli is not None else None
+    sizes = {'bytes': 0, 'gzBytes': 0, 'brBytes': 0}
+
+    out = open(path, 'wb')
+    gz_out = open(path + '.gz', 'wb') if gz else None
+    br_out = open(path + '.br', 'wb') if br else None
+    try:
+        for chunk in iter_json(obj):
+            out.write(chunk)
+            digest.update(chunk)
+            sizes['bytes'] += len(chunk)
+            if gz:
+                gz_out.write(gz.compress(chunk))
+            if br:
+                br_out.write(br.process(chunk))
+        if gz:
+            gz_out.write(gz.flush())
+            sizes['gzBytes'] = gz_out.tell()
+        if br:
+            br_out.write(br.finish())
+            sizes['brBytes'] = br_out.tell()
+    finally:
+        for f in (out, gz_out, br_out):
+            if f:
+                f.close()
+
+    sizes['sha256'] = digest.hexdigest()
+    sizes['seconds'] = time.perf_counter() - start
+    return sizes
+
+
+def _sibling_paths(path):
+    return [path] + [path + suffix for suffix in COMPRESSED_SUFFIXES]
+
+
+def _replace_with_siblings(tmp, path):
+    for src, dst in zip(_sibling_paths(tmp), _sibling_paths(path)):
+        if os.path.exists(src):
+            os.replace(src, dst)
+
+
+def _remove_with_siblings(path):
+    for p in _sibling_paths(path):
+        if os.path.exists(p):
+            os.remove(p)
+
+
+def format_write_stats(name, stats):
+    line = f"{name} {stats['bytes'] / 1e6:.2f} MB"
+    extras = [f"{label} {stats[key] / 1e6:.2f} MB" for key, label in (('gzBytes', 'gz'), ('brBytes', 'br')) if stats[key]]
+    if extras:
+        line += f" ({', '.join(extras)})"
+    return line + f" in {stats['seconds']:.2f}s"
+
+
+# ============================================================
+# SHARDED OUTPUT
+# ============================================================
+
+
+def load_manifest(out_dir):
+    path = os.path.join(out_dir, SHARD_DIR, MANIFEST_NAME)
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            return json.load(f)
+    return None
+
+
+def write_sharded(output, out_dir, compress=True):
+    """Write a content-hashed shard per section and the manifest.
+
+    Each section is streamed to a temp file and renamed to <section>.<hash>.json
+    once its hash is known. Returns (manifest, changed sections, write stats).
+    """
+    shard_dir = os.path.join(out_dir, SHARD_DIR)
+    os.makedirs(shard_dir, exist_ok=True)
+    previous = load_manifest(out_dir) or {'shards': {}}
+
+    shards = {}
+    changed = []
+    totals = {'bytes': 0, 'gzBytes': 0, 'brBytes': 0, 'seconds': 0.0}
+    for section, value in output.items():
+        tmp = os.path.join(shard_dir, f'.{section}.tmp')
+        stats = write_json(value, tmp, compress, atomic=False)
+        for key in totals:
+            totals[key] += stats[key]
+        digest = stats['sha256'][:12]
+        name = f'{section}.{digest}.json'
+        path = os.path.join(shard_dir, name)
+        if os.path.exists(path):
+            _remove_with_siblings(tmp)
+        else:
+            _replace_with_siblings(tmp, path)
+        shards[section] = {'path': f'{SHARD_DIR}/{name}', 'hash': digest, 'bytes': stats['bytes']}
+        if previous['shards'].get(section, {}).get('hash') != digest:
+            changed.append(section)
+
+    manifest = {'version': MANIFEST_VERSION, 'shards': shards}
+    tmp = os.path.join(shard_dir, MANIFEST_NAME + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(shard_dir, MANIFEST_NAME))
+
+    # Keep the previous generation so a page that loaded the old manifest can still fetch its shards
+    keep = {os.path.basename(s['path']) for m in (manifest, previous) for s in m['shards'].values()}
+    for fn in os.listdir(shard_dir):
+        base = fn[:-3] if fn.endswith(COMPRESSED_SUFFIXES) else fn
+        if base != MANIFEST_NAME and base.endswith('.json') and base not in keep:
+            os.remove(os.path.join(shard_dir, fn))
+
+    return manifest, changed, totals
+
+
+# ============================================================
+# COLUMNAR COMPANIES
+# ============================================================
+COLUMNAR_FORMAT = 'columnar-v1'
+
+
+def pack_bits(flags):
+    """Pack booleans into a base64 bitset, least significant bit first within each byte."""
+    buf = bytearray((len(flags) + 7) // 8)
+    for i, flag in enumerate(flags):
+        if flag:
+            buf[i >> 3] |= 1 << (i & 7)
+    return base64.b64encode(bytes(buf)).decode('ascii')
+
+
+def unpack_bits(encoded, length):
+    buf = base64.b64decode(encoded)
+    return [bool(buf[i >> 3] >> (i & 7) & 1) for i in range(length)]
+
+
+def _encode_column(values, max_dict_ratio):
+    if all(isinstance(v, bool) for v in values):
+        return {'type': 'bits', 'bits': pack_bits(values)}
+    if all(isinstance(v, str) for v in values):
+        lookup = {}
+        codes = [lookup.setdefault(v, len(lookup)) for v in values]
+        if len(lookup) <= max(16, len(values) * max_dict_ratio):
+            return {'type': 'dict', 'values': list(lookup), 'codes': codes}
+    return {'type': 'plain', 'data': values}
+
+
+def encode_columnar(rows, max_dict_ratio=0.25):
+    """Turn a list of same-shaped dicts into {format, length, columns}.
+
+    Columns are 'bits' (all booleans), 'dict' (strings with few distinct
+    values, stored as lookup table + codes) or 'plain' (everything else).
+    """
+    fields = list(rows[0]) if rows else []
+    return {
+        'format': COLUMNAR_FORMAT,
+        'length': len(rows),
+        'columns': {
+            field: _encode_column([r.get(field) for r in rows], max_dict_ratio)
+            for field in fields
+        },
+    }
+
+
+def decode_columnar(table):
+    """Inverse of encode_columnar (the dashboard does the same in decodeColumnar)."""
+    n = table['length']
+    columns = {}
+    for field, col in table['columns'].items():
+        if col['type'] == 'bits':
+            columns[field] = unpack_bits(col['bits'], n)
+        elif col['type'] == 'dict':
+            columns[field] = [col['values'][c] for c in col['codes']]
+        else:
+            columns[field] = col['data']
+    return [{field: values[i] for field, values in columns.items()} for i in range(n)]
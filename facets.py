@@ -0,0 +1,88 @@
+"""
+Facet bitmaps for the dashboard filters.
+
+For every value of every filter section (pipeline stage, outreach status,
+state, ownership, medium, account) the 'facets' output section holds a
+bitset over the companies list: bit i is set when companies[i] matches.
+Bitsets are packed like the columnar 'bits' columns (export.pack_bits:
+base64, least significant bit first within each byte), straight from each
+value's member indices. index.html ORs the bitsets of the selected values
+within a section, ANDs the sections, and counts matches by popcount
+instead of re-testing every company.
+
+The rules mirror the dashboard's filter definitions (buildFilters).
+"""
+
+import base64
+
+from clusters import STATUS_RULES
+
+FACETS_FORMAT = 'bitmap-v1'
+
+# Unlike clusters.pipeline_category these are independent tests, as in the
+# dashboard: an 'Active - Due Diligence' deal is in both sections
+PIPELINE_RULES = (
+    ('active', lambda s: s.startswith('Active')),
+    ('new_lead', lambda s: s == 'New Lead'),
+    ('stand_by', lambda s: s == 'Stand By'),
+    ('stalled', lambda s: s == 'Stalled'),
+    ('due_diligence', lambda s: 'Due Diligence' in s or 'Placing Bid' in s),
+)
+
+# bradfordFacility values that have their own ownership filter
+BRADFORD_FACETS = (
+    ('bradford_facility', 'Bradford Facility'),
+    ('bradford_op', 'Bradford OP Office'),
+)
+
+
+def _company_facets(c):
+    """(section, value) pairs for every filter value company row c matches."""
+    status = c.get('pipelineStatus') or ''
+    if c.get('inPipeline') and status:
+        for key, rule in PIPELINE_RULES:
+            if rule(status):
+                yield 'pipeline', key
+    for key, rule in STATUS_RULES:
+        if rule(c):
+            yield 'status', key
+    state = c.get('fullState') or c.get('state')
+    if state:
+        yield 'state', state
+    if c.get('ownership'):
+        yield 'ownership', c['ownership']
+    for key, value in BRADFORD_FACETS:
+        if c.get('bradfordFacility') == value:
+            yield 'ownership', key
+    for medium, n in (c.get('byMedium') or {}).items():
+        if n > 0:
+            yield 'medium', medium
+    for account, n in (c.get('byAccount') or {}).items():
+        if n > 0:
+            yield 'account', account
+
+
+def _pack_members(indices, length):
+    """Base64 bitset of `length` bits with the given bits set (the export.pack_bits layout)."""
+    buf = bytearray((length + 7) // 8)
+    for i in indices:
+        buf[i >> 3] |= 1 << (i & 7)
+    return base64.b64encode(bytes(buf)).decode('ascii')
+
+
+def build_facets(companies):
+    """Return the 'facets' output section for a list of company rows."""
+    members = {section: {} for section in ('pipeline', 'status', 'state', 'ownership', 'medium', 'account')}
+    for i, c in enumerate(companies):
+        for section, value in _company_facets(c):
+            members[section].setdefault(value, []).append(i)
+
+    n = len(companies)
+    return {
+        'format': FACETS_FORMAT,
+        'length': n,
+        'facets': {
+            section: {value: _pack_members(values[value], n) for value in sorted(values)}
+            for section, values in members.items()
+        },
+    }
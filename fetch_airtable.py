@@ -4,207 +4,101 @@ Tables used:
   - Companies: company info, addresses, ownership, states
   - Cold Outreach: messages, responses, meetings
   - Contacts: links outreach to companies
-  - Negotiations: pipeline deals
+Pipeline deals and action items come from the Google Sheet's tabs.
 
 Env var required: AIRTABLE_PAT (Personal Access Token)
+
+Every raw source response is also kept as a compressed, timestamped
+snapshot (source_snapshots.py). A table whose live fetch fails falls back
+to its latest snapshot, and --offline rebuilds from the snapshots alone.
+
+Each run also writes build_stats.json next to data.json: per-stage timing
+spans, counters and HTTP use (instrument.py). --profile adds a cProfile
+and tracemalloc peak per stage.
 """
 
-import csv
 import json
 import re
-import hashlib
 import os
-import io
+import queue
 import sys
+import threading
 import time
-import urllib.request
 import urllib.parse
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from geocode_store import DEFAULT_NEGATIVE_TTL_DAYS
+from http_client import HTTPError, TokenBucket, call_with_retry, client, format_stats
+from ingest import (
+    Dataset, airtable_companies, airtable_contacts, airtable_messages, print_summary, sheet_actions,
+    sheet_pipeline, write_output,
+)
+from instrument import BUILD_STATS_FILE, recorder
+from sheet_cache import SheetCache, content_hash
+from source_snapshots import DEFAULT_SNAPSHOT_KEEP, SnapshotStore
 
 BASE_ID = 'appsXvuuRisy7GiSH'
 PAT = os.environ.get('AIRTABLE_PAT', '')
 
-# ============================================================
-# GEOCODING
-# ============================================================
-STATE_COORDS = {
-    'AL': [32.806671, -86.791130], 'AK': [61.370716, -152.404419],
-    'AZ': [33.729759, -111.431221], 'AR': [34.969704, -92.373123],
-    'CA': [36.116203, -119.681564], 'CO': [39.059811, -105.311104],
-    'CT': [41.597782, -72.755371], 'DE': [39.318523, -75.507141],
-    'FL': [27.766279, -81.686783], 'GA': [33.040619, -83.643074],
-    'HI': [21.094318, -157.498337], 'ID': [44.240459, -114.478828],
-    'IL': [40.349457, -88.986137], 'IN': [39.849426, -86.258278],
-    'IA': [42.011539, -93.210526], 'KS': [38.526600, -96.726486],
-    'KY': [37.668140, -84.670067], 'LA': [31.169546, -91.867805],
-    'ME': [44.693947, -69.381927], 'MD': [39.063946, -76.802101],
-    'MA': [42.230171, -71.530106], 'MI': [43.326618, -84.536095],
-    'MN': [45.694454, -93.900192], 'MS': [32.741646, -89.678696],
-    'MO': [38.456085, -92.288368], 'MT': [46.921925, -110.454353],
-    'NE': [41.125370, -98.268082], 'NV': [38.313515, -117.055374],
-    'NH': [43.452492, -71.563896], 'NJ': [40.298904, -74.521011],
-    'NM': [34.840515, -106.248482], 'NY': [42.165726, -74.948051],
-    'NC': [35.630066, -79.806419], 'ND': [47.528912, -99.784012],
-    'OH': [40.388783, -82.764915], 'OK': [35.565342, -96.928917],
-    'OR': [44.572021, -122.070938], 'PA': [40.590752, -77.209755],
-    'RI': [41.680893, -71.511780], 'SC': [33.856892, -80.945007],
-    'SD': [44.299782, -99.438828], 'TN': [35.747845, -86.692345],
-    'TX': [31.054487, -97.563461], 'UT': [40.150032, -111.862434],
-    'VT': [44.045876, -72.710686], 'VA': [37.769337, -78.169968],
-    'WA': [47.400902, -121.490494], 'WV': [38.491226, -80.954456],
-    'WI': [44.268543, -89.616508], 'WY': [42.755966, -107.302490],
-    'DC': [38.897438, -77.026817]
-}
-
-STATE_NAME_TO_ABBR = {
-    'Alabama': 'AL', 'Alaska': 'AK', 'Arizona': 'AZ', 'Arkansas': 'AR',
-    'California': 'CA', 'Colorado': 'CO', 'Connecticut': 'CT', 'Delaware': 'DE',
-    'Florida': 'FL', 'Georgia': 'GA', 'Hawaii': 'HI', 'Idaho': 'ID',
-    'Illinois': 'IL', 'Indiana': 'IN', 'Iowa': 'IA', 'Kansas': 'KS',
-    'Kentucky': 'KY', 'Louisiana': 'LA', 'Maine': 'ME', 'Maryland': 'MD',
-    'Massachusetts': 'MA', 'Michigan': 'MI', 'Minnesota': 'MN', 'Mississippi': 'MS',
-    'Missouri': 'MO', 'Montana': 'MT', 'Nebraska': 'NE', 'Nevada': 'NV',
-    'New Hampshire': 'NH', 'New Jersey': 'NJ', 'New Mexico': 'NM', 'New York': 'NY',
-    'North Carolina': 'NC', 'North Dakota': 'ND', 'Ohio': 'OH', 'Oklahoma': 'OK',
-    'Oregon': 'OR', 'Pennsylvania': 'PA', 'Rhode Island': 'RI', 'South Carolina': 'SC',
-    'South Dakota': 'SD', 'Tennessee': 'TN', 'Texas': 'TX', 'Utah': 'UT',
-    'Vermont': 'VT', 'Virginia': 'VA', 'Washington': 'WA', 'West Virginia': 'WV',
-    'Wisconsin': 'WI', 'Wyoming': 'WY', 'Washington DC': 'DC'
-}
-
-ABBR_TO_STATE_NAME = {v: k for k, v in STATE_NAME_TO_ABBR.items()}
-
-FL_ZIP_REGIONS = {
-    '320': [30.4, -84.3], '321': [29.2, -81.0], '322': [30.3, -81.7],
-    '323': [30.3, -81.7], '324': [30.4, -86.6], '325': [30.4, -87.2],
-    '326': [29.2, -82.1], '327': [28.5, -81.4], '328': [28.5, -81.4],
-    '329': [28.1, -80.6], '330': [25.8, -80.2], '331': [25.8, -80.2],
-    '332': [25.8, -80.2], '333': [26.1, -80.1], '334': [26.7, -80.1],
-    '335': [27.8, -82.6], '336': [27.8, -82.6], '337': [27.3, -82.5],
-    '338': [28.0, -82.0], '339': [26.6, -81.9], '340': [26.6, -81.9],
-    '341': [26.1, -80.4], '342': [28.0, -82.5], '344': [29.0, -82.5],
-    '346': [27.5, -82.5], '347': [28.2, -82.2], '349': [26.4, -80.1],
-}
-
-
-def resolve_state_abbr(s):
-    s = s.strip()
-    if len(s) == 2 and s.upper() in STATE_COORDS:
-        return s.upper()
-    return STATE_NAME_TO_ABBR.get(s, '')
+# Service endpoints; override to point the build at fixture_server.py
+AIRTABLE_API_URL = os.environ.get('AIRTABLE_API_URL', 'https://api.airtable.com')
+GSHEETS_URL = os.environ.get('GSHEETS_URL', 'https://docs.google.com')
 
+GSHEET_ID = '19w2nLn7VrNEWQSRaEIgPQuZwPi88ABNKWnl8Bh7pqVk'
+PIPELINE_GID = '1109153656'
+ACTIONS_GID = '2003109190'
 
-def get_coords(address, state_abbr, name):
-    lat, lng = None, None
-    zip_match = re.search(r'\b(\d{5})\b', address) if address else None
-    if zip_match:
-        prefix = zip_match.group(1)[:3]
-        if state_abbr == 'FL' and prefix in FL_ZIP_REGIONS:
-            lat, lng = FL_ZIP_REGIONS[prefix]
-        elif state_abbr in STATE_COORDS:
-            lat, lng = STATE_COORDS[state_abbr]
-    elif state_abbr in STATE_COORDS:
-        lat, lng = STATE_COORDS[state_abbr]
-    if lat is not None:
-        h = int(hashlib.md5(name.encode()).hexdigest()[:8], 16)
-        lat += ((h % 1000) / 1000 - 0.5) * 0.8
-        lng += (((h >> 10) % 1000) / 1000 - 0.5) * 0.8
-    return lat, lng
-
+# Airtable allows 5 requests/second per base; every worker shares one bucket.
+# A burst of 1 keeps any one-second window at the limit.
+AIRTABLE_RATE_LIMIT = 5
+AIRTABLE_BURST = 1
+# Airtable asks clients to wait 30s after a 429 and sends no Retry-After
+AIRTABLE_RATE_LIMITED_WAIT = 30
+FETCH_WORKERS = 6
+# Cold Outreach pages held in memory while aggregation catches up
+OUTREACH_PAGE_BUFFER = 20
 
 # ============================================================
-# GEOCODING — Census Bureau Batch API
+# GEOCODE CACHE
 # ============================================================
-def batch_geocode_census(addresses):
-    results = {}
-    batch_size = 1000
-    for batch_start in range(0, len(addresses), batch_size):
-        batch = addresses[batch_start:batch_start + batch_size]
-        print(f"  Geocoding batch {batch_start // batch_size + 1} ({len(batch)} addresses)...")
-        csv_content = io.StringIO()
-        writer = csv.writer(csv_content)
-        for uid, addr in batch:
-            parts = [p.strip() for p in addr.split(',')]
-            if len(parts) >= 3:
-                street = parts[0]
-                city = parts[1]
-                state_zip = parts[2]
-                sz_match = re.match(r'([A-Za-z\s]+?)\s*(\d{5})', state_zip)
-                if sz_match:
-                    state, zipcode = sz_match.group(1).strip(), sz_match.group(2)
-                else:
-                    state, zipcode = state_zip.strip(), ''
-                writer.writerow([uid, street, city, state, zipcode])
-            elif len(parts) >= 2:
-                writer.writerow([uid, parts[0], parts[1], '', ''])
-            else:
-                writer.writerow([uid, addr, '', '', ''])
-        csv_data = csv_content.getvalue().encode('utf-8')
-        try:
-            url = 'https://geocoding.geo.census.gov/geocoder/locations/addressbatch'
-            boundary = '----BatchBoundary'
-            body = (
-                f'--{boundary}\r\n'
-                f'Content-Disposition: form-data; name="addressFile"; filename="addresses.csv"\r\n'
-                f'Content-Type: text/csv\r\n\r\n'
-            ).encode('utf-8') + csv_data + (
-                f'\r\n--{boundary}\r\n'
-                f'Content-Disposition: form-data; name="benchmark"\r\n\r\n'
-                f'Public_AR_Current\r\n'
-                f'--{boundary}--\r\n'
-            ).encode('utf-8')
-            req = urllib.request.Request(url, data=body,
-                                        headers={'Content-Type': f'multipart/form-data; boundary={boundary}'},
-                                        method='POST')
-            with urllib.request.urlopen(req, timeout=120) as resp:
-                response_text = resp.read().decode('utf-8')
-            for line in response_text.strip().split('\n'):
-                if not line.strip():
-                    continue
-                for row in csv.reader(io.StringIO(line)):
-                    if len(row) >= 6 and row[2].strip().lower() == 'match':
-                        uid = row[0].strip().strip('"')
-                        coords_str = row[5].strip().strip('"')
-                        if coords_str:
-                            try:
-                                lng_s, lat_s = coords_str.split(',')
-                                results[uid] = (float(lat_s.strip()), float(lng_s.strip()))
-                            except (ValueError, IndexError):
-                                pass
-            print(f"    Got {sum(1 for b in batch if b[0] in results)} matches")
-        except Exception as e:
-            print(f"    Geocoding error: {e}")
-        if batch_start + batch_size < len(addresses):
-            time.sleep(1)
-    return results
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.environ.get('DASHBOARD_OUTPUT_DIR') or SCRIPT_DIR
+# Legacy name-keyed JSON cache, imported once into the SQLite cache
+GEOCODE_CACHE_FILE = os.environ.get('GEOCODE_CACHE_FILE') or os.path.join(SCRIPT_DIR, 'geocode_cache.json')
+GEOCODE_CACHE_DB = os.environ.get('GEOCODE_CACHE_DB') or os.path.join(SCRIPT_DIR, 'geocode_cache.sqlite')
+# Addresses the geocoder couldn't match are retried after this many days
+GEOCODE_NEGATIVE_TTL_DAYS = float(os.environ.get('GEOCODE_NEGATIVE_TTL_DAYS') or DEFAULT_NEGATIVE_TTL_DAYS)
+# Digest of the last written output; CI keeps it in a cached dir so unchanged runs can skip the deploy
+OUTPUT_DIGEST_FILE = os.environ.get('OUTPUT_DIGEST_FILE') or os.path.join(OUTPUT_DIR, 'data.json.sha256')
 
 
 # ============================================================
-# GEOCODE CACHE
+# AIRTABLE HELPERS
 # ============================================================
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-GEOCODE_CACHE_FILE = os.path.join(SCRIPT_DIR, 'geocode_cache.json')
-
+# One token bucket per base, shared by every thread fetching from that base
+_base_buckets = {}
+_base_buckets_lock = threading.Lock()
 
-def load_geocode_cache():
-    if os.path.exists(GEOCODE_CACHE_FILE):
-        with open(GEOCODE_CACHE_FILE, 'r') as f:
-            return json.load(f)
-    return {}
 
+def base_bucket(base_id):
+    with _base_buckets_lock:
+        if base_id not in _base_buckets:
+            _base_buckets[base_id] = TokenBucket(AIRTABLE_RATE_LIMIT, AIRTABLE_BURST)
+        return _base_buckets[base_id]
 
-def save_geocode_cache(cache):
-    with open(GEOCODE_CACHE_FILE, 'w') as f:
-        json.dump(cache, f, indent=2)
 
+def airtable_iter_pages(table, fields=None, formula=None):
+    """Yield an Airtable table one page (list of up to 100 records) at a time.
 
-# ============================================================
-# AIRTABLE HELPERS
-# ============================================================
-def airtable_fetch_all(table, fields=None, formula=None):
-    """Fetch all records from an Airtable table, handling pagination."""
-    records = []
+    Every page goes through the base's token bucket and is retried on
+    429/5xx/network errors, resuming from the same offset. If a page still
+    fails the error is raised, so callers never see a truncated table.
+    """
     offset = None
+    restarts = 0
+    yielded = 0
+    skip = 0
+    bucket = base_bucket(BASE_ID)
     while True:
         params = {}
         if fields:
@@ -213,572 +107,477 @@ def airtable_fetch_all(table, fields=None, formula=None):
             params['filterByFormula'] = formula
         if offset:
             params['offset'] = offset
-        url = f'https://api.airtable.com/v0/{BASE_ID}/{urllib.parse.quote(table)}?{urllib.parse.urlencode(params, doseq=True)}'
-        req = urllib.request.Request(url, headers={'Authorization': f'Bearer {PAT}'})
+        url = f'{AIRTABLE_API_URL}/v0/{BASE_ID}/{urllib.parse.quote(table)}?{urllib.parse.urlencode(params, doseq=True)}'
         try:
-            data = json.load(urllib.request.urlopen(req, timeout=60))
-        except Exception as e:
-            print(f"  Error fetching {table}: {e}")
-            break
-        records.extend(data.get('records', []))
+            data = call_with_retry(
+                lambda: client.get(url, headers={'Authorization': f'Bearer {PAT}'}, timeout=60).json(),
+                bucket=bucket, rate_limited_wait=AIRTABLE_RATE_LIMITED_WAIT,
+                label=f'{table} (offset {offset or "start"})',
+            )
+        except HTTPError as e:
+            # Offsets expire; if Airtable drops the iterator, re-list the table
+            # and skip the records already handed out
+            if e.status == 422 and b'LIST_RECORDS_ITERATOR_NOT_AVAILABLE' in e.body and restarts < 2:
+                print(f"    {table}: pagination offset expired, restarting after {yielded} records")
+                offset, skip = None, yielded
+                restarts += 1
+                continue
+            raise
+        page = data.get('records', [])
+        if skip:
+            dropped = min(skip, len(page))
+            page, skip = page[dropped:], skip - dropped
+        if page:
+            yielded += len(page)
+            yield page
         offset = data.get('offset')
         if not offset:
             break
+
+
+def airtable_fetch_all(table, fields=None, formula=None):
+    """Fetch all records from an Airtable table, handling pagination."""
+    records = []
+    for page in airtable_iter_pages(table, fields, formula):
+        records.extend(page)
     return records
 
 
-def at_val(fields, key, default=''):
-    """Extract a value from Airtable fields, handling AI-generated fields."""
-    v = fields.get(key, default)
-    if isinstance(v, dict):
-        # AI-generated fields have {state, value, isStale}
-        return v.get('value', default) or default
-    if isinstance(v, list):
-        return v  # Return lists as-is
-    return v if v is not None else default
+class PageStream:
+    """Run a page generator on a background thread, buffering at most `depth` pages.
+
+    Iterating the stream yields pages as they arrive, so the consumer works on
+    page N while page N+1 downloads. The bounded queue keeps memory flat: the
+    producer blocks once the consumer falls `depth` pages behind.
+    """
+
+    _DONE = object()
+
+    def __init__(self, name, pages, depth):
+        self.name = name
+        self.records = 0
+        self.elapsed = 0.0
+        self.error = None
+        self._queue = queue.Queue(maxsize=depth)
+        self._thread = threading.Thread(target=self._produce, args=(pages,), daemon=True)
+        self._thread.start()
+
+    def _produce(self, pages):
+        start = time.perf_counter()
+        try:
+            for page in pages:
+                self._queue.put(page)
+            item = self._DONE
+        except Exception as e:
+            item = self.error = e
+        self.elapsed = time.perf_counter() - start
+        self._queue.put(item)
+
+    def __iter__(self):
+        while True:
+            item = self._queue.get()
+            if item is self._DONE:
+                return
+            if isinstance(item, Exception):
+                print(f"    {self.name}: fetch failed: {item}")
+                raise item
+            self.records += len(item)
+            yield item
 
 
 # ============================================================
-# MAIN
+# INCREMENTAL SYNC — local record store per table
 # ============================================================
-def main():
-    if not PAT:
-        print("ERROR: Set AIRTABLE_PAT environment variable")
-        sys.exit(1)
+RECORD_STORE_DIR = os.environ.get('AIRTABLE_STORE_DIR') or os.path.join(SCRIPT_DIR, '.airtable_store')
+# Re-read edits made just before the previous sync started (clock skew between us and Airtable)
+SYNC_OVERLAP_SECONDS = 120
+# LAST_MODIFIED_TIME() ignores lookup/rollup changes, so periodically pull everything
+FULL_SYNC_MAX_AGE_HOURS = 24
+# Listing every record ID to find deletions costs N/100 requests, so it only runs this often
+ID_PASS_MAX_AGE_HOURS = 6
+
+
+def _utc_iso(ts):
+    return time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(ts))
+
+
+def _store_path(table):
+    safe = re.sub(r'[^A-Za-z0-9]+', '_', table).strip('_').lower()
+    return os.path.join(RECORD_STORE_DIR, f'{safe}.json')
+
+
+def load_record_store(table):
+    path = _store_path(table)
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            return json.load(f)
+    return None
+
+
+def save_record_store(table, store):
+    os.makedirs(RECORD_STORE_DIR, exist_ok=True)
+    path = _store_path(table)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(store, f, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def _record_id_formula(ids):
+    return 'OR(' + ','.join(f"RECORD_ID()='{rid}'" for rid in ids) + ')'
+
+
+def airtable_sync_table(table, fields):
+    """Incrementally sync a table into its local record store and return all records.
+
+    Only records modified since the stored cursor are pulled (LAST_MODIFIED_TIME()
+    filter), so most runs cost requests in proportion to the changed records. A
+    second, single-field pass lists every live record ID so deletions can be
+    dropped from the store; it pages through the whole table, so it runs only
+    once ID_PASS_MAX_AGE_HOURS have passed since the last one (or full pull),
+    and deleted records linger in the output until then. Falls back to a full
+    pull when there is no store, the field list changed, or the last full pull
+    is older than FULL_SYNC_MAX_AGE_HOURS.
+
+    Any fetch error propagates, so the caller sees the table as failed (and can
+    fall back to its snapshot). The store is saved only after a complete sync; a
+    half-applied one is never written or returned.
+    """
+    started = time.time()
+    store = load_record_store(table)
+    full = (
+        store is None
+        or store.get('fields') != fields
+        or started - store.get('fullSyncedAt', 0) > FULL_SYNC_MAX_AGE_HOURS * 3600
+    )
+
+    if full:
+        records = airtable_fetch_all(table, fields)
+        store = {
+            'table': table, 'fields': fields, 'fullSyncedAt': started, 'idsCheckedAt': started,
+            'records': {r['id']: r for r in records},
+        }
+        print(f"    {table}: full sync, {len(records)} records")
+    else:
+        since = _utc_iso(store['cursor'] - SYNC_OVERLAP_SECONDS)
+        changed = airtable_fetch_all(
+            table, fields,
+            formula=f"IS_AFTER(LAST_MODIFIED_TIME(), DATETIME_PARSE('{since}'))",
+        )
+        by_id = store['records']
+        for r in changed:
+            by_id[r['id']] = r
+
+        last_id_pass = store.get('idsCheckedAt', store['fullSyncedAt'])
+        if started - last_id_pass < ID_PASS_MAX_AGE_HOURS * 3600:
+            print(f"    {table}: {len(changed)} changed, {len(by_id)} total "
+                  f"(deletion check in {(last_id_pass + ID_PASS_MAX_AGE_HOURS * 3600 - started) / 3600:.1f}h)")
+        else:
+            # Deletion pass: list live IDs with a single field
+            live_ids = {r['id'] for r in airtable_fetch_all(table, fields[:1])}
+            deleted = [rid for rid in by_id if rid not in live_ids]
+            for rid in deleted:
+                del by_id[rid]
+
+            # IDs we have never seen (e.g. restored from trash without a modification)
+            missing = [rid for rid in live_ids if rid not in by_id]
+            for i in range(0, len(missing), 50):
+                chunk = missing[i:i + 50]
+                for r in airtable_fetch_all(table, fields, formula=_record_id_formula(chunk)):
+                    by_id[r['id']] = r
+            store['idsCheckedAt'] = started
+            print(f"    {table}: {len(changed)} changed, {len(deleted)} deleted, "
+                  f"{len(missing)} backfilled, {len(by_id)} total")
+
+    store['cursor'] = started
+    save_record_store(table, store)
+    return list(store['records'].values())
 
-    print("Fetching data from Airtable...")
 
-    # ---- Fetch all tables in parallel-ish ----
-    print("  Fetching Companies...")
-    companies_raw = airtable_fetch_all('Companies', [
+# ============================================================
+# SOURCE SNAPSHOTS — last good raw response per source
+# ============================================================
+# Inside the record store dir so CI's cached directory keeps them between runs
+SNAPSHOT_DIR = os.environ.get('SOURCE_SNAPSHOT_DIR') or os.path.join(RECORD_STORE_DIR, 'snapshots')
+SNAPSHOT_KEEP = int(os.environ.get('SOURCE_SNAPSHOT_KEEP') or DEFAULT_SNAPSHOT_KEEP)
+
+
+def snapshot_fallback(snapshots, name, error):
+    """(result, stamp) from a failed source's latest snapshot, or (None, None) if it has none."""
+    data, stamp = snapshots.latest(name)
+    if data is None:
+        print(f"    {name}: fetch failed ({error}) and no snapshot to fall back to")
+        return None, None
+    print(f"    {name}: fetch failed ({error}); using snapshot {stamp}")
+    recorder.count('snapshot fallbacks')
+    return data, stamp
+
+
+def load_snapshots(snapshots, names, provenance):
+    """Offline stand-in for fetch_sources: {name: (result, error)} from the latest snapshots.
+
+    The timestamp of each snapshot used is recorded in provenance.
+    """
+    fetched = {}
+    for name in names:
+        data, stamp = snapshots.latest(name)
+        if data is None:
+            fetched[name] = (None, FileNotFoundError(f'no snapshot of {name} in {SNAPSHOT_DIR}'))
+            print(f"    {name:<15} no snapshot")
+            continue
+        fetched[name] = (data, None)
+        provenance[name] = stamp
+        detail = f"{len(data)} records" if isinstance(data, list) else f"{len(data)} bytes"
+        print(f"    {name:<15} {stamp}  {detail}")
+    return fetched
+
+
+# ============================================================
+# GOOGLE SHEET HELPERS
+# ============================================================
+# ETag / Last-Modified / body hash per tab and the last parse + match results
+SHEET_CACHE_FILE = os.environ.get('SHEET_CACHE_FILE') or os.path.join(RECORD_STORE_DIR, 'sheet_cache.json')
+
+
+def fetch_gsheet_csv(gid, cache=None):
+    """Download one tab of the pipeline Google Sheet as CSV text, conditionally given a SheetCache."""
+    url = f'{GSHEETS_URL}/spreadsheets/d/{GSHEET_ID}/export?format=csv&gid={gid}'
+    if cache is not None:
+        return cache.fetch(url)
+    return client.get(url, timeout=30).text()
+
+
+# ============================================================
+# CONCURRENT SOURCE FETCH
+# ============================================================
+AIRTABLE_TABLES = {
+    'Companies': [
         'Name', 'HQ Address', 'Full HQ State Name', 'HQ State', 'Ownership',
         'All State(s) Operating In', 'Override', 'Website', 'State Tier',
         'State Tier Categories', 'Bradford Facility',
-    ])
-    print(f"    {len(companies_raw)} companies")
-
-    print("  Fetching Contacts...")
-    contacts_raw = airtable_fetch_all('Contacts', [
+    ],
+    'Contacts': [
         'Name', 'Companies', 'Cold Outreach',
-    ])
-    print(f"    {len(contacts_raw)} contacts")
-
-    print("  Fetching Cold Outreach...")
-    outreach_raw = airtable_fetch_all('Cold Outreach', [
+    ],
+    'Cold Outreach': [
         'Contacts', 'Date Sent', 'Message Medium', 'Account', 'Message Type',
         'Responded', 'Scheduled Intro Call', 'Assisted Meeting', 'Not Interested',
         'Meeting Date', 'Opened', 'Follow Up Priority (from Follow Ups)',
-    ])
-    print(f"    {len(outreach_raw)} outreach messages")
+    ],
+}
 
-    print("  Fetching Negotiations...")
-    negotiations_raw = airtable_fetch_all('Negotiations', [
-        'Status', 'Name (from Companies)', 'Companies', 'Name (from Clients)',
-        'Assignee',
-    ])
-    print(f"    {len(negotiations_raw)} negotiations")
 
-    # ============================================================
-    # BUILD LOOKUP MAPS
-    # ============================================================
-
-    # Company record ID -> company data
-    company_by_id = {}
-    for r in companies_raw:
-        f = r['fields']
-        name = f.get('Name', '').strip()
-        if not name:
-            continue
-        address = at_val(f, 'HQ Address', '')
-        if isinstance(address, str):
-            address = address.strip()
-        else:
-            address = ''
-        website = at_val(f, 'Website', '')
-        if isinstance(website, str):
-            website = website.strip()
-        else:
-            website = ''
-
-        all_states_list = f.get('All State(s) Operating In', [])
-        all_states_str = ', '.join(all_states_list) if isinstance(all_states_list, list) else str(all_states_list)
-
-        full_state = f.get('Full HQ State Name', '').strip() if isinstance(f.get('Full HQ State Name'), str) else ''
-        hq_state_raw = at_val(f, 'HQ State', '')
-        hq_state = hq_state_raw.strip() if isinstance(hq_state_raw, str) else ''
-        state_abbr = resolve_state_abbr(full_state) or resolve_state_abbr(hq_state)
-
-        ownership = f.get('Ownership', '') or ''
-        override = bool(f.get('Override'))
-        state_tier_raw = at_val(f, 'State Tier', '')
-        state_tier = state_tier_raw.strip() if isinstance(state_tier_raw, str) else ''
-        bradford_raw = at_val(f, 'Bradford Facility', '')
-        bradford_facility = bradford_raw.strip() if isinstance(bradford_raw, str) else ''
-
-        company_by_id[r['id']] = {
-            'name': name,
-            'key': re.sub(r'\s+', ' ', name.lower().strip().replace('\u202f', ' ').replace('\u00a0', ' ')),
-            'address': address,
-            'fullState': full_state,
-            'state': state_abbr,
-            'ownership': ownership,
-            'allStates': all_states_str,
-            'website': website,
-            'override': override,
-            'stateTier': state_tier,
-            'bradfordFacility': bradford_facility,
-        }
-
-    # Contact record ID -> list of company record IDs + name
-    contact_to_companies = {}
-    contact_names = {}
-    for r in contacts_raw:
-        f = r['fields']
-        comp_ids = f.get('Companies', [])
-        if comp_ids:
-            contact_to_companies[r['id']] = comp_ids
-        name = f.get('Name', '')
-        if name:
-            contact_names[r['id']] = name
+def build_sources(incremental=False, sheet_cache=None):
+    """Map source name -> zero-arg fetch function."""
+    fetch_table = airtable_sync_table if incremental else airtable_fetch_all
+    sources = {
+        table: (lambda t=table, f=fields: fetch_table(t, f))
+        for table, fields in AIRTABLE_TABLES.items()
+    }
+    sources['Pipeline Sheet'] = lambda: fetch_gsheet_csv(PIPELINE_GID, sheet_cache)
+    sources['Actions Sheet'] = lambda: fetch_gsheet_csv(ACTIONS_GID, sheet_cache)
+    return sources
 
-    # ============================================================
-    # PROCESS COLD OUTREACH → per-company aggregation
-    # ============================================================
-    # Per-company aggregation
-    comp_msgs = defaultdict(lambda: {
-        'msgsSent': 0, 'byMedium': defaultdict(int), 'byAccount': defaultdict(int),
-        'responded': False, 'respondedCount': 0,
-        'scheduledIntro': False, 'assistedMeeting': False,
-        'notInterested': False, 'followUpLater': False,
-        'contacts': set(), 'firstMsgDate': '', 'lastMsgDate': '',
-        'meetingDate': '', 'opened': False, 'viewedProfile': False,
-    })
-
-    all_messages = []
-
-    for r in outreach_raw:
-        f = r['fields']
-        contact_ids = f.get('Contacts', [])
-        date_sent = f.get('Date Sent', '')
-        medium = f.get('Message Medium', '') or ''
-        account = f.get('Account', '') or ''
-        msg_type = f.get('Message Type', [])
-        responded_val = at_val(f, 'Responded', '')
-        scheduled = f.get('Scheduled Intro Call', '') or ''
-        assisted = f.get('Assisted Meeting', '') or ''
-        not_interested = f.get('Not Interested', [])
-        meeting_date = f.get('Meeting Date', '') or ''
-        opened = f.get('Opened', '') or ''
-        follow_up_priority = f.get('Follow Up Priority (from Follow Ups)', [])
-
-        # Format date
-        date_str = ''
-        if date_sent:
-            try:
-                from datetime import datetime
-                dt = datetime.fromisoformat(date_sent.replace('Z', '+00:00'))
-                date_str = dt.strftime('%m/%d/%Y')
-            except:
-                date_str = date_sent[:10] if len(date_sent) >= 10 else date_sent
-
-        meeting_date_str = ''
-        if meeting_date:
-            try:
-                from datetime import datetime
-                dt = datetime.fromisoformat(meeting_date.replace('Z', '+00:00'))
-                meeting_date_str = dt.strftime('%m/%d/%Y')
-            except:
-                meeting_date_str = meeting_date[:10]
-
-        # Determine which companies this outreach belongs to
-        company_ids_for_msg = set()
-        for cid in contact_ids:
-            for comp_id in contact_to_companies.get(cid, []):
-                company_ids_for_msg.add(comp_id)
-
-        is_responded = (str(responded_val).strip() not in ('', '0', 'False', 'false', 'None'))
-        is_scheduled = scheduled and scheduled.lower() not in ('', 'no', 'n/a')
-        is_assisted = assisted and assisted.lower() not in ('', 'no', 'n/a')
-        is_not_interested = bool(not_interested)
-        is_opened = opened and opened.lower() not in ('', 'no', 'n/a')
-        has_follow_up = bool(follow_up_priority)
-
-        for comp_id in company_ids_for_msg:
-            if comp_id not in company_by_id:
-                continue
-            agg = comp_msgs[comp_id]
-            agg['msgsSent'] += 1
-            if medium:
-                agg['byMedium'][medium] += 1
-            if account:
-                agg['byAccount'][account] += 1
-            for cid in contact_ids:
-                agg['contacts'].add(cid)
-            if is_responded:
-                agg['responded'] = True
-                agg['respondedCount'] += 1
-            if is_scheduled:
-                agg['scheduledIntro'] = True
-            if is_assisted:
-                agg['assistedMeeting'] = True
-            if is_not_interested:
-                agg['notInterested'] = True
-            if has_follow_up:
-                agg['followUpLater'] = True
-            if is_opened:
-                agg['opened'] = True
-            if date_str:
-                if not agg['firstMsgDate'] or date_str < agg['firstMsgDate']:
-                    agg['firstMsgDate'] = date_str
-                if not agg['lastMsgDate'] or date_str > agg['lastMsgDate']:
-                    agg['lastMsgDate'] = date_str
-            if meeting_date_str:
-                agg['meetingDate'] = meeting_date_str
-
-        # Resolve contact names and company names for this message
-        msg_contacts = [contact_names.get(cid, '') for cid in contact_ids if contact_names.get(cid)]
-        msg_companies = []
-        for comp_id in company_ids_for_msg:
-            c = company_by_id.get(comp_id)
-            if c:
-                msg_companies.append(c.get('name', ''))
-
-        all_messages.append({
-            'date': date_str,
-            'medium': medium,
-            'account': account,
-            'contact': ', '.join(msg_contacts) if msg_contacts else '',
-            'company': ', '.join(msg_companies) if msg_companies else '',
-        })
 
-    # ============================================================
-    # FETCH GOOGLE SHEET PIPELINE (primary pipeline source)
-    # ============================================================
-    GSHEET_ID = '19w2nLn7VrNEWQSRaEIgPQuZwPi88ABNKWnl8Bh7pqVk'
-    PIPELINE_GID = '1109153656'
-    ACTIONS_GID = '2003109190'
+def _timed(fn):
+    """Run fn, returning (result, error, seconds) instead of raising."""
+    start = time.perf_counter()
+    try:
+        return fn(), None, time.perf_counter() - start
+    except Exception as e:
+        return None, e, time.perf_counter() - start
 
-    print("  Fetching Google Sheet pipeline...")
-    pipeline = []
-    actions = []
-    gsheet_pipeline_by_name = {}  # normalized name -> deal
 
-    try:
-        # Fetch pipeline detail tab
-        pipe_url = f'https://docs.google.com/spreadsheets/d/{GSHEET_ID}/export?format=csv&gid={PIPELINE_GID}'
-        req = urllib.request.Request(pipe_url)
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            pipe_csv = resp.read().decode('utf-8')
-
-        # Skip to the header row (look for "Facility Name")
-        pipe_lines = pipe_csv.strip().split('\n')
-        header_idx = None
-        for i, line in enumerate(pipe_lines):
-            if 'Facility Name' in line:
-                header_idx = i
-                break
-        if header_idx is None:
-            print("    Could not find pipeline header row!")
-            raise Exception("Missing header")
-        pipe_body = '\n'.join(pipe_lines[header_idx:])
-        reader = csv.DictReader(io.StringIO(pipe_body))
-        for row in reader:
-            name = (row.get('Facility Name') or '').strip()
-            if not name:
-                continue
-            status = (row.get('Status') or '').strip()
-            priority = (row.get('Priority') or '').strip()
-            deal_type = (row.get('Type') or '').strip()
-            states = (row.get('State(s)') or '').strip()
-            ebitda = (row.get('EBITDA / Financials') or '').strip()
-            asking_price = (row.get('Asking Price') or '').strip()
-            nda_status = (row.get('NDA Status') or '').strip()
-            data_room = (row.get('Data Room') or '').strip()
-            site_visit = (row.get('Site Visit') or '').strip()
-            key_contact = (row.get('Key Contact') or '').strip()
-            next_action = (row.get('Next Action') or '').strip()
-            action_owner = (row.get('Action Owner') or '').strip()
-            deadline = (row.get('Deadline') or '').strip()
-            last_update = (row.get('Last Update') or '').strip()
-            days_since = (row.get('Days Since Update') or '').strip()
-            notes = (row.get('Notes') or '').strip()
-            deal_num = (row.get('#') or '').strip()
-
-            deal = {
-                'name': name,
-                'status': status,
-                'type': deal_type,
-                'priority': priority,
-                'states': states,
-                'ebitda': ebitda,
-                'askingPrice': asking_price,
-                'ndaStatus': nda_status,
-                'dataRoom': data_room,
-                'siteVisit': site_visit,
-                'keyContact': key_contact,
-                'nextAction': next_action,
-                'actionOwner': action_owner,
-                'deadline': deadline,
-                'lastUpdate': last_update,
-                'daysSinceUpdate': days_since,
-                'notes': notes,
-                'dealNumber': deal_num,
-            }
-            pipeline.append(deal)
-            norm_name = re.sub(r'\s+', ' ', name.lower().strip().replace('\u202f', ' ').replace('\u00a0', ' '))
-            gsheet_pipeline_by_name[norm_name] = deal
-
-        print(f"    {len(pipeline)} pipeline deals from Google Sheet")
-
-        # Fetch action items tab
-        act_url = f'https://docs.google.com/spreadsheets/d/{GSHEET_ID}/export?format=csv&gid={ACTIONS_GID}'
-        req = urllib.request.Request(act_url)
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            act_csv = resp.read().decode('utf-8')
-
-        # Skip the header rows (first 2 rows are title + blank)
-        lines = act_csv.strip().split('\n')
-        # Find the header row with "Priority,Action Item,..."
-        header_idx = None
-        for i, line in enumerate(lines):
-            if 'Action Item' in line and 'Priority' in line:
-                header_idx = i
-                break
-        if header_idx is not None:
-            csv_body = '\n'.join(lines[header_idx:])
-            reader = csv.DictReader(io.StringIO(csv_body))
-            for row in reader:
-                action_item = (row.get('Action Item') or '').strip()
-                if not action_item:
-                    continue
-                actions.append({
-                    'priority': (row.get('Priority') or '').strip(),
-                    'action': action_item,
-                    'facility': (row.get('Facility') or '').strip(),
-                    'owner': (row.get('Owner') or '').strip(),
-                    'deadline': (row.get('Deadline') or '').strip(),
-                    'status': (row.get('Status') or '').strip(),
-                    'notes': (row.get('Notes') or '').strip(),
-                    'pipelineStatus': (row.get('Pipeline Status') or '').strip(),
-                })
-            print(f"    {len(actions)} action items from Google Sheet")
+def fetch_sources(sources, workers=FETCH_WORKERS):
+    """Fetch every source concurrently on a bounded pool.
 
-    except Exception as e:
-        print(f"    Google Sheet fetch error: {e}")
-        print(f"    Falling back to Airtable Negotiations only")
+    Returns {name: (result, error)} and prints per-source wall time.
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {name: pool.submit(_timed, fn) for name, fn in sources.items()}
+        outcomes = {name: f.result() for name, f in futures.items()}
+    for name, (result, error, elapsed) in outcomes.items():
+        detail = f"error: {error}" if error else (
+            f"{len(result)} records" if isinstance(result, list) else f"{len(result)} bytes")
+        print(f"    {name:<15} {elapsed:6.2f}s  {detail}")
+    print(f"    Fetched {len(sources)} sources in {time.perf_counter() - start:.2f}s")
+    return {name: (result, error) for name, (result, error, _) in outcomes.items()}
 
-    # ============================================================
-    # MATCH PIPELINE TO COMPANIES (Google Sheet name → Airtable company ID)
-    # ============================================================
-    # Name aliases from pipeline deal names to Airtable company names
-    PIPELINE_ALIASES = {
-        'nola detox & recovery center': 'nola detox',
-        'second chances': 'second chances addiction recovery center',
-        'serenity treatment centers': 'serenity treatment center',
-        'sanctuary': 'sanctuary louisiana',
-        'asheville detox (healthcare alliance)': 'asheville detox center',
-        'recovery now / longbranch': 'longbranch healthcare',
-        'dreamlife / crestview': 'dreamlife recovery pa',
-        'new waters': 'new waters recovery',
-        'momentum recovery': 'momentum recovery',
-        'the grove recovery': 'the grove recovery centers',
-        'sycamour': 'sycamore behavioral health',
-        'new vista / ethan crossing': 'ethan crossing addiction treatment',
-        'southeast detox / addiction ctr': 'southeast detox',
-        'cardinal': 'cardinal recovery',
-        'ghr': 'ghr center for addiction recovery and treatment',
-        'peachtree detox (evoraa)': 'peachtree detox',
-        'revive recover': 'gateway to sobriety (revive recover)',
-        'southern sky': 'southern sky recovery',
-        'the wave': 'the wave international',
-        'woodlake center': 'woodlake addiction recovery',
-        'the sylvia brafman mh center': 'the sylvia brafman mental health center',
-        'turning leaf behavioral health': 'turning leaf behavioral health services',
-        'centric': 'reign residential treatment center',
-    }
 
-    # Build reverse lookup: company key -> company ID
-    company_key_to_id = {}
-    for comp_id, comp in company_by_id.items():
-        company_key_to_id[comp['key']] = comp_id
-
-    # Also build from Airtable Negotiations for direct ID matching
-    neg_company_ids = {}
-    for r in negotiations_raw:
-        f = r['fields']
-        company_ids = f.get('Companies', [])
-        company_names = f.get('Name (from Companies)', [])
-        for comp_id in company_ids:
-            neg_company_ids[comp_id] = True
-
-    pipeline_by_company_id = {}
-    matched = 0
-    for deal in pipeline:
-        norm_name = re.sub(r'\s+', ' ', deal['name'].lower().strip().replace('\u202f', ' ').replace('\u00a0', ' '))
-        # Try direct match
-        comp_id = company_key_to_id.get(norm_name)
-        # Try alias
-        if not comp_id:
-            aliased = PIPELINE_ALIASES.get(norm_name)
-            if aliased:
-                comp_id = company_key_to_id.get(aliased)
-        if comp_id:
-            deal['airtableId'] = comp_id
-            pipeline_by_company_id[comp_id] = deal
-            matched += 1
-
-    print(f"  Pipeline matched to companies: {matched}/{len(pipeline)}")
+# ============================================================
+# MAIN
+# ============================================================
+def set_step_output(name, value):
+    """Expose a value to later workflow steps when running under GitHub Actions."""
+    path = os.environ.get('GITHUB_OUTPUT')
+    if path:
+        with open(path, 'a') as f:
+            f.write(f"{name}={value}\n")
+
+
+def aggregate_outreach(companies_raw, contacts_raw, outreach_pages):
+    """Build a Dataset from the raw Companies, Contacts and Cold Outreach records."""
+    dataset = Dataset()
+    for comp_id, company in airtable_companies(companies_raw):
+        dataset.add_company(comp_id, company)
+    contact_to_companies, contact_names = airtable_contacts(contacts_raw)
+    messages = (r for page in outreach_pages for r in page)
+    for msg, company_ids in airtable_messages(messages, contact_to_companies, contact_names):
+        dataset.add_message(msg, company_ids)
+    return dataset
+
+
+def main(incremental=False, columnar=False, force=False, profile=False, offline=False):
+    """Build data.json and build_stats.json; returns a run summary with per-stage wall times.
+
+    offline=True rebuilds from the latest source snapshots without any network access.
+    """
+    if not PAT and not offline:
+        print("ERROR: Set AIRTABLE_PAT environment variable")
+        sys.exit(1)
 
-    # ============================================================
-    # GEOCODING
-    # ============================================================
-    geocode_cache = load_geocode_cache()
-    print(f"  Geocode cache: {len(geocode_cache)} entries")
-
-    addresses_to_geocode = []
-    for comp_id, comp in company_by_id.items():
-        key = comp['key']
-        if comp['address'] and key not in geocode_cache:
-            addresses_to_geocode.append((key, comp['address']))
-
-    if addresses_to_geocode:
-        print(f"  Geocoding {len(addresses_to_geocode)} new addresses...")
-        geo_results = batch_geocode_census(addresses_to_geocode)
-        for uid, coords in geo_results.items():
-            geocode_cache[uid] = list(coords)
-        for uid, _ in addresses_to_geocode:
-            if uid not in geocode_cache:
-                geocode_cache[uid] = None
-        save_geocode_cache(geocode_cache)
-        print(f"  Geocoded {len(geo_results)} new addresses")
-    else:
-        print("  All addresses already cached")
+    recorder.reset(profile)
+    snapshots = SnapshotStore(SNAPSHOT_DIR, SNAPSHOT_KEEP)
+    sheet_cache = SheetCache(SHEET_CACHE_FILE)
+    # Source name -> 'live' or the timestamp of the snapshot it was built from
+    provenance = {}
+
+    # ---- Fetch all tables concurrently ----
+    with recorder.span('fetch'):
+        outreach_stream = None
+        if offline:
+            print(f"Rebuilding from source snapshots in {SNAPSHOT_DIR}...")
+            sources = build_sources()
+            fetched = load_snapshots(snapshots, sources, provenance)
+        else:
+            print("Fetching data from Airtable and Google Sheets...")
+            sources = build_sources(incremental, sheet_cache)
+            if not incremental:
+                # Cold Outreach is aggregated page by page while later pages download
+                del sources['Cold Outreach']
+                outreach_stream = PageStream(
+                    'Cold Outreach',
+                    airtable_iter_pages('Cold Outreach', AIRTABLE_TABLES['Cold Outreach']),
+                    OUTREACH_PAGE_BUFFER,
+                )
+            fetched = fetch_sources(sources)
+            with recorder.span('snapshots'):
+                for name, (result, error) in fetched.items():
+                    if error:
+                        result, stamp = snapshot_fallback(snapshots, name, error)
+                        if result is not None:
+                            fetched[name] = (result, None)
+                            provenance[name] = stamp
+                    else:
+                        recorder.count('bytes', snapshots.save(name, result))
+                        provenance[name] = 'live'
+        failed = [table for table in sources if table in AIRTABLE_TABLES and fetched[table][1]]
+        if failed:
+            # Never aggregate a partial dataset; keep the previous data.json
+            print(f"ERROR: could not fetch {', '.join(failed)}; leaving data.json unchanged")
+            sys.exit(1)
+        companies_raw = fetched['Companies'][0]
+        contacts_raw = fetched['Contacts'][0]
+        for name, (result, _) in fetched.items():
+            if isinstance(result, list):
+                recorder.count(f'{name} records', len(result))
 
     # ============================================================
-    # BUILD FINAL COMPANIES LIST
+    # NORMALIZE + AGGREGATE
     # ============================================================
-    companies = []
-    for comp_id, comp in company_by_id.items():
-        key = comp['key']
-        agg = comp_msgs.get(comp_id, {
-            'msgsSent': 0, 'byMedium': {}, 'byAccount': {},
-            'responded': False, 'respondedCount': 0,
-            'scheduledIntro': False, 'assistedMeeting': False,
-            'notInterested': False, 'followUpLater': False,
-            'contacts': set(), 'firstMsgDate': '', 'lastMsgDate': '',
-            'meetingDate': '', 'opened': False, 'viewedProfile': False,
-        })
-
-        # Geocode
-        cached = geocode_cache.get(key)
-        if cached:
-            lat, lng = cached
+    with recorder.span('outreach'):
+        if outreach_stream:
+            try:
+                dataset = aggregate_outreach(companies_raw, contacts_raw,
+                                             snapshots.tee('Cold Outreach', outreach_stream))
+                provenance['Cold Outreach'] = 'live'
+            except Exception as e:
+                if outreach_stream.error is None:
+                    raise
+                outreach_raw, stamp = snapshot_fallback(snapshots, 'Cold Outreach', e)
+                if outreach_raw is None:
+                    print("ERROR: could not fetch Cold Outreach; leaving data.json unchanged")
+                    sys.exit(1)
+                provenance['Cold Outreach'] = stamp
+                dataset = aggregate_outreach(companies_raw, contacts_raw, [outreach_raw])
+            print(f"    {'Cold Outreach':<15} {outreach_stream.elapsed:6.2f}s  "
+                  f"{outreach_stream.records} records (streamed)")
         else:
-            lat, lng = get_coords(comp['address'], comp['state'], comp['name'])
-
-        pipe = pipeline_by_company_id.get(comp_id)
-
-        companies.append({
-            'airtableId': comp_id,
-            'name': comp['name'],
-            'address': comp['address'],
-            'state': comp['state'],
-            'fullState': comp['fullState'],
-            'ownership': comp['ownership'],
-            'override': comp['override'],
-            'website': comp['website'],
-            'allStates': comp['allStates'],
-            'stateTier': comp['stateTier'],
-            'bradfordFacility': comp.get('bradfordFacility', False),
-            'msgsSent': agg['msgsSent'],
-            'byMedium': dict(agg['byMedium']) if isinstance(agg['byMedium'], defaultdict) else agg['byMedium'],
-            'byAccount': dict(agg['byAccount']) if isinstance(agg['byAccount'], defaultdict) else agg['byAccount'],
-            'responded': agg['responded'],
-            'respondedCount': agg['respondedCount'],
-            'scheduledIntro': agg['scheduledIntro'],
-            'assistedMeeting': agg['assistedMeeting'],
-            'notInterested': agg['notInterested'],
-            'followUpLater': agg['followUpLater'],
-            'contactCount': len(agg['contacts']),
-            'contacts': list(agg['contacts']) if isinstance(agg['contacts'], set) else agg['contacts'],
-            'firstMsg': agg['firstMsgDate'],
-            'lastMsg': agg['lastMsgDate'],
-            'meetingDate': agg['meetingDate'],
-            'opened': agg['opened'],
-            'viewedProfile': agg.get('viewedProfile', False),
-            'inPipeline': pipe is not None,
-            'pipelineStatus': pipe['status'] if pipe else '',
-            'pipelinePriority': pipe.get('priority', '') if pipe else '',
-            'pipelineType': pipe.get('type', '') if pipe else '',
-            'pipelineEbitda': pipe.get('ebitda', '') if pipe else '',
-            'pipelineAskingPrice': pipe.get('askingPrice', '') if pipe else '',
-            'pipelineNda': pipe.get('ndaStatus', '') if pipe else '',
-            'pipelineDataRoom': pipe.get('dataRoom', '') if pipe else '',
-            'pipelineSiteVisit': pipe.get('siteVisit', '') if pipe else '',
-            'pipelineKeyContact': pipe.get('keyContact', '') if pipe else '',
-            'pipelineNextAction': pipe.get('nextAction', '') if pipe else '',
-            'pipelineActionOwner': pipe.get('actionOwner', '') if pipe else '',
-            'pipelineDeadline': pipe.get('deadline', '') if pipe else '',
-            'pipelineLastUpdate': pipe.get('lastUpdate', '') if pipe else '',
-            'pipelineDaysSince': pipe.get('daysSinceUpdate', '') if pipe else '',
-            'pipelineNotes': pipe.get('notes', '') if pipe else '',
-            'lat': lat,
-            'lng': lng,
-        })
+            dataset = aggregate_outreach(companies_raw, contacts_raw, [fetched['Cold Outreach'][0]])
+        recorder.count('companies', len(dataset.companies))
+        recorder.count('messages', len(dataset.messages))
 
     # ============================================================
-    # COMPUTE AGGREGATES
+    # GOOGLE SHEET PIPELINE → companies
     # ============================================================
-    medium_counts = defaultdict(int)
-    account_counts = defaultdict(int)
-    monthly_counts = defaultdict(int)
-    for m in all_messages:
-        if m['medium']:
-            medium_counts[m['medium']] += 1
-        if m['account']:
-            account_counts[m['account']] += 1
-        if m['date']:
-            match = re.match(r'(\d{1,2})/\d{1,2}/(\d{4})', m['date'])
-            if match:
-                month_key = f"{match.group(2)}-{int(match.group(1)):02d}"
-                monthly_counts[month_key] += 1
-
-    output = {
-        'companies': companies,
-        'pipeline': pipeline,
-        'actions': actions,
-        'messages': all_messages,
-        'meta': {
-            'totalMessages': len(all_messages),
-            'mediumCounts': dict(medium_counts),
-            'accountCounts': dict(account_counts),
-            'monthlyCounts': dict(sorted(monthly_counts.items())),
-        },
+    with recorder.span('pipeline'):
+        print("  Parsing Google Sheet pipeline...")
+        try:
+            pipe_csv, pipe_error = fetched['Pipeline Sheet']
+            if pipe_error:
+                raise pipe_error
+            # Unchanged tab contents reuse the last run's parse
+            dataset.pipeline = sheet_cache.memo('pipeline tab', content_hash(pipe_csv),
+                                                lambda: sheet_pipeline(pipe_csv))
+            print(f"    {len(dataset.pipeline)} pipeline deals from Google Sheet")
+
+            act_csv, act_error = fetched['Actions Sheet']
+            if act_error:
+                raise act_error
+            dataset.actions = sheet_cache.memo('actions tab', content_hash(act_csv),
+                                               lambda: sheet_actions(act_csv))
+            print(f"    {len(dataset.actions)} action items from Google Sheet")
+        except Exception as e:
+            print(f"    Google Sheet fetch error: {e}")
+            print("    Building without the Google Sheet pipeline data")
+
+        matched = dataset.match_pipeline(memo=sheet_cache)
+        sheet_cache.save()
+        print(f"  Pipeline matched to companies: {matched}/{len(dataset.pipeline)}")
+
+    with recorder.span('geocode'):
+        dataset.geocode(GEOCODE_CACHE_DB, GEOCODE_CACHE_FILE, GEOCODE_NEGATIVE_TTL_DAYS, lookup=not offline)
+
+    with recorder.span('build'):
+        output = dataset.build_output(columnar)
+
+    with recorder.span('serialize'):
+        result = write_output(output, OUTPUT_DIR, OUTPUT_DIGEST_FILE, force, dataset.assets())
+        set_step_output('changed', 'true' if result['changed'] else 'false')
+
+    print_summary(dataset, output, result)
+    print(f"HTTP: {format_stats(client.stats())}")
+    print("Stages: " + recorder.summary())
+
+    summary = {
+        'stages': recorder.stage_seconds(),
+        'companies': len(dataset.rows),
+        'messages': len(dataset.messages),
+        'pipelineMatches': dataset.pipeline_matches,
+        'http': client.stats(),
+        'sources': provenance,
+        'output': {'changed': result['changed'], 'digest': result['digest'],
+                   'dataJson': result['dataJson'], 'shards': result['shards']},
     }
-
-    out_path = os.path.join(SCRIPT_DIR, 'data.json')
-    with open(out_path, 'w') as f:
-        json.dump(output, f, indent=2)
-
-    c = companies
-    gc = geocode_cache
-    geocoded = sum(1 for x in c if x['lat'] and gc.get(x['name'].lower().strip()))
-    print(f"\n=== OUTPUT ===")
-    print(f"Total companies: {len(c)}")
-    print(f"With coordinates: {sum(1 for x in c if x['lat'])}")
-    print(f"Geocoded (precise): {geocoded}")
-    print(f"With allStates: {sum(1 for x in c if x['allStates'])}")
-    print(f"With messages: {sum(1 for x in c if x['msgsSent'] > 0)}")
-    print(f"Total messages: {output['meta']['totalMessages']}")
-    print(f"Responded: {sum(1 for x in c if x['responded'])}")
-    print(f"Scheduled intro: {sum(1 for x in c if x['scheduledIntro'])}")
-    print(f"Assisted meeting: {sum(1 for x in c if x['assistedMeeting'])}")
-    print(f"Not interested: {sum(1 for x in c if x['notInterested'])}")
-    print(f"In pipeline: {sum(1 for x in c if x['inPipeline'])}")
-    print(f"Pipeline deals: {len(pipeline)}")
-    print(f"Mediums: {output['meta']['mediumCounts']}")
-    print(f"Accounts: {output['meta']['accountCounts']}")
-
+    recorder.write(os.path.join(OUTPUT_DIR, BUILD_STATS_FILE), script='fetch_airtable', incremental=incremental,
+                   offline=offline, sources=provenance,
+                   companies=summary['companies'], messages=summary['messages'], output=summary['output'])
+    return summary
 
 if __name__ == '__main__':
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description='Build data.json from Airtable and Google Sheets.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='pull only records changed since the last run, merged into the local record store')
+    parser.add_argument('--columnar', action='store_true',
+                        help='write companies and messages column-wise with dictionary-encoded strings and packed booleans')
+    parser.add_argument('--force', action='store_true',
+                        help='write the output even if its content digest matches the last run')
+    parser.add_argument('--offline', action='store_true',
+                        help='rebuild from the latest source snapshots instead of fetching')
+    parser.add_argument('--profile', action='store_true',
+                        help='run each stage under cProfile and tracemalloc; results go to build_stats.json')
+    args = parser.parse_args()
+    main(incremental=args.incremental, columnar=args.columnar, force=args.force, profile=args.profile,
+         offline=args.offline)
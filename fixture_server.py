@@ -0,0 +1,253 @@
+"""
+Local stand-in for the services fetch_airtable.py talks to, replaying fixtures.
+
+Endpoints:
+  - GET  /v0/<base>/<table>                          Airtable list records API
+        (fields[], filterByFormula, offset; 100 records per page)
+  - GET  /spreadsheets/d/<id>/export?format=csv&gid=  Google Sheets CSV export
+        (ETag; 304 for a matching If-None-Match)
+  - POST /geocoder/locations/addressbatch             Census batch geocoder
+
+Fixture directory layout:
+  airtable/<Table Name>.json   list of {id, fields, lastModified?}
+  sheets/<gid>.csv             CSV export of one sheet tab
+
+Point the build at it with:
+  AIRTABLE_API_URL=http://127.0.0.1:8765 GSHEETS_URL=http://127.0.0.1:8765 \\
+  CENSUS_GEOCODER_URL=http://127.0.0.1:8765 AIRTABLE_PAT=fixture python fetch_airtable.py
+
+Usage:
+  python fixture_server.py FIXTURE_DIR [--port 8765] [--latency 0.05] [--jitter 0.02]
+                           [--error-rate 0.02] [--error-status 429,503] [--retry-after 1]
+                           [--census-match-rate 0.9]
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import threading
+import time
+import urllib.parse
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAGE_SIZE = 100
+
+
+def load_fixtures(fixture_dir):
+    tables, sheets = {}, {}
+    table_dir = os.path.join(fixture_dir, 'airtable')
+    if os.path.isdir(table_dir):
+        for fn in os.listdir(table_dir):
+            if fn.endswith('.json'):
+                with open(os.path.join(table_dir, fn), 'r') as f:
+                    tables[fn[:-5]] = json.load(f)
+    sheet_dir = os.path.join(fixture_dir, 'sheets')
+    if os.path.isdir(sheet_dir):
+        for fn in os.listdir(sheet_dir):
+            if fn.endswith('.csv'):
+                with open(os.path.join(sheet_dir, fn), 'r', encoding='utf-8') as f:
+                    sheets[fn[:-4]] = f.read()
+    return tables, sheets
+
+
+# ============================================================
+# AIRTABLE FORMULA SUBSET
+# ============================================================
+_AFTER_RE = re.compile(r"IS_AFTER\(LAST_MODIFIED_TIME\(\),\s*DATETIME_PARSE\('([^']+)'\)\)")
+_RECORD_ID_RE = re.compile(r"RECORD_ID\(\)='([^']+)'")
+
+
+def _parse_iso(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+def filter_records(records, formula):
+    """Apply the filterByFormula shapes the build uses; anything else matches all."""
+    if not formula:
+        return records
+    m = _AFTER_RE.search(formula)
+    if m:
+        since = _parse_iso(m.group(1))
+        return [r for r in records if _parse_iso(r.get('lastModified') or '1970-01-01T00:00:00Z') > since]
+    ids = _RECORD_ID_RE.findall(formula)
+    if ids:
+        wanted = set(ids)
+        return [r for r in records if r['id'] in wanted]
+    return records
+
+
+# ============================================================
+# CENSUS BATCH GEOCODER
+# ============================================================
+def _multipart_file(body, content_type):
+    boundary = content_type.split('boundary=', 1)[1].strip().encode()
+    for part in body.split(b'--' + boundary):
+        head, _, data = part.partition(b'\r\n\r\n')
+        if b'name="addressFile"' in head:
+            return data.rstrip(b'\r\n').decode('utf-8')
+    return ''
+
+
+def geocode_batch(csv_text, match_rate):
+    """Answer in the Census response format with deterministic pseudo-coordinates."""
+    out = io.StringIO()
+    writer = csv.writer(out, quoting=csv.QUOTE_ALL)
+    for row in csv.reader(io.StringIO(csv_text)):
+        if not row:
+            continue
+        uid = row[0]
+        address = ', '.join(p for p in row[1:] if p)
+        h = int(hashlib.md5(uid.encode()).hexdigest()[:12], 16)
+        if (h % 1000) / 1000 < match_rate:
+            lat = 25 + (h % 2300) / 100
+            lng = -124 + ((h >> 12) % 5600) / 100
+            writer.writerow([uid, address, 'Match', 'Exact', address.upper(), f'{lng:.6f},{lat:.6f}', str(h % 10 ** 9), 'L'])
+        else:
+            writer.writerow([uid, address, 'No_Match'])
+    return out.getvalue()
+
+
+# ============================================================
+# SERVER
+# ============================================================
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without this, delayed ACKs add ~40ms per response
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, content_type='application/json', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _delay_or_fail(self):
+        """Apply latency, then maybe inject an error; returns True if one was sent."""
+        cfg = self.server.config
+        delay = cfg['latency'] + random.uniform(0, cfg['jitter'])
+        if delay > 0:
+            time.sleep(delay)
+        if cfg['error_rate'] and random.random() < cfg['error_rate']:
+            status = random.choice(cfg['error_statuses'])
+            headers = {'Retry-After': str(cfg['retry_after'])} if status in (429, 503) else None
+            self._send(status, json.dumps({'error': 'INJECTED_FAILURE'}).encode(), headers=headers)
+            with self.server.lock:
+                self.server.counts['errors'] += 1
+            return True
+        return False
+
+    def _count(self, key):
+        with self.server.lock:
+            self.server.counts[key] += 1
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        parts = [urllib.parse.unquote(p) for p in url.path.split('/') if p]
+        if self._delay_or_fail():
+            return
+
+        if len(parts) == 3 and parts[0] == 'v0':
+            self._count('airtable')
+            records = self.server.tables.get(parts[2])
+            if records is None:
+                return self._send(404, json.dumps({'error': 'TABLE_NOT_FOUND'}).encode())
+            matched = filter_records(records, query.get('filterByFormula', [''])[0])
+            fields = query.get('fields[]')
+            offset = int(query.get('offset', ['0'])[0] or 0)
+            page = []
+            for r in matched[offset:offset + PAGE_SIZE]:
+                f = r['fields'] if not fields else {k: v for k, v in r['fields'].items() if k in fields}
+                page.append({'id': r['id'], 'createdTime': r.get('createdTime', ''), 'fields': f})
+            payload = {'records': page}
+            if offset + PAGE_SIZE < len(matched):
+                payload['offset'] = str(offset + PAGE_SIZE)
+            return self._send(200, json.dumps(payload).encode())
+
+        if len(parts) == 4 and parts[0] == 'spreadsheets' and parts[3] == 'export':
+            self._count('sheets')
+            gid = query.get('gid', [''])[0]
+            if gid not in self.server.sheets:
+                return self._send(404, b'', 'text/plain')
+            body = self.server.sheets[gid].encode('utf-8')
+            etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+            if self.headers.get('If-None-Match') == etag:
+                return self._send(304, b'', 'text/csv', {'ETag': etag})
+            return self._send(200, body, 'text/csv', {'ETag': etag})
+
+        self._send(404, b'', 'text/plain')
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self._delay_or_fail():
+            return
+        if self.path.startswith('/geocoder/locations/addressbatch'):
+            self._count('census')
+            csv_text = _multipart_file(body, self.headers.get('Content-Type', ''))
+            result = geocode_batch(csv_text, self.server.config['census_match_rate'])
+            return self._send(200, result.encode('utf-8'), 'text/csv')
+        self._send(404, b'', 'text/plain')
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, fixture_dir, port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 error_statuses=(429, 503), retry_after=1, census_match_rate=0.9):
+        super().__init__(('127.0.0.1', port), FixtureHandler)
+        self.tables, self.sheets = load_fixtures(fixture_dir)
+        self.config = {
+            'latency': latency, 'jitter': jitter, 'error_rate': error_rate,
+            'error_statuses': list(error_statuses), 'retry_after': retry_after,
+            'census_match_rate': census_match_rate,
+        }
+        self.counts = {'airtable': 0, 'sheets': 0, 'census': 0, 'errors': 0}
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_port}'
+
+    def start(self):
+        """Serve on a background thread (for in-process use)."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay Airtable / Sheets / Census fixtures locally.')
+    parser.add_argument('fixture_dir')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='extra random latency, 0..jitter seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with an error')
+    parser.add_argument('--error-status', default='429,503', help='comma-separated statuses to inject')
+    parser.add_argument('--retry-after', type=int, default=1, help='Retry-After seconds sent with 429/503')
+    parser.add_argument('--census-match-rate', type=float, default=0.9)
+    args = parser.parse_args()
+
+    server = FixtureServer(
+        args.fixture_dir, args.port, args.latency, args.jitter, args.error_rate,
+        [int(s) for s in args.error_status.split(',') if s], args.retry_after, args.census_match_rate,
+    )
+    print(f"Serving {len(server.tables)} tables, {len(server.sheets)} sheets on {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
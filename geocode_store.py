@@ -0,0 +1,342 @@
+"""
+Geocoding for the build scripts: a SQLite cache plus the Census batch client.
+
+Entries are keyed by a hash of the normalized address, so a company that
+moves gets geocoded again instead of keeping its old coordinates. Lookups
+are point queries on the primary key, and only newly geocoded rows are
+written back (upserts, one transaction per run). Misses are stored too,
+with a timestamp, and become eligible for a retry after `negative_ttl_days`.
+
+The old geocode_cache.json (keyed by normalized company name) is imported
+once via migrate_json, using the current run's name -> address mapping.
+
+census_geocode sends uncached addresses to the Census batch geocoder,
+several batches in flight at once. A batch that still fails after retries
+is split in half and resubmitted, down to MIN_SPLIT_SIZE addresses.
+
+get_coords is the offline fallback for anything the cache can't place: the
+ZIP centroid from zip_centroids.bin, else the state centroid, jittered.
+"""
+
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from http_client import call_with_retry, client
+from zip_centroids import zip_centroid
+
+DEFAULT_NEGATIVE_TTL_DAYS = 30
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS geocodes (
+    addr_hash  TEXT PRIMARY KEY,
+    address    TEXT NOT NULL,
+    lat        REAL,
+    lng        REAL,
+    updated_at INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+'''
+
+
+def normalize_address(address):
+    """Lowercase, drop punctuation and collapse whitespace so trivial edits hash the same."""
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', address.lower()).split())
+
+
+def address_hash(address):
+    return hashlib.sha256(normalize_address(address).encode('utf-8')).hexdigest()[:32]
+
+
+class GeocodeCache:
+    """Address -> (lat, lng) cache in a single SQLite file."""
+
+    def __init__(self, path, negative_ttl_days=DEFAULT_NEGATIVE_TTL_DAYS):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.negative_ttl = negative_ttl_days * 86400
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM geocodes').fetchone()[0]
+
+    def counts(self):
+        matched, total = self.db.execute('SELECT COUNT(lat), COUNT(*) FROM geocodes').fetchone()
+        return {'entries': total, 'matched': matched, 'misses': total - matched}
+
+    def lookup(self, address):
+        """Return (found, coords): coords is (lat, lng), or None for a cached miss.
+
+        A miss older than the negative TTL counts as not found, so it is retried.
+        """
+        row = self.db.execute(
+            'SELECT lat, lng, updated_at FROM geocodes WHERE addr_hash = ?', (address_hash(address),)
+        ).fetchone()
+        if row is None:
+            return False, None
+        lat, lng, updated_at = row
+        if lat is None:
+            return time.time() - updated_at < self.negative_ttl, None
+        return True, (lat, lng)
+
+    def get(self, address):
+        return self.lookup(address)[1]
+
+    def put_many(self, results, now=None):
+        """Upsert {address: (lat, lng) or None}; returns the number of rows written."""
+        now = int(now if now is not None else time.time())
+        rows = []
+        for address, coords in results.items():
+            lat, lng = coords if coords else (None, None)
+            rows.append((address_hash(address), address, lat, lng, now))
+        with self.db:
+            self.db.executemany(
+                'INSERT INTO geocodes (addr_hash, address, lat, lng, updated_at) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(addr_hash) DO UPDATE SET address = excluded.address, lat = excluded.lat, '
+                'lng = excluded.lng, updated_at = excluded.updated_at',
+                rows,
+            )
+        return len(rows)
+
+    # ---- one-time import of geocode_cache.json ----
+    def _meta(self, key):
+        row = self.db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def migrate_json(self, json_path, address_by_key):
+        """Import the legacy name-keyed JSON cache once; returns the number of rows imported.
+
+        address_by_key maps the JSON's normalized company names to current
+        addresses. Old misses are imported with updated_at 0, so they get one retry.
+        """
+        if self._meta('json_migrated') or not os.path.exists(json_path):
+            return 0
+        with open(json_path, 'r') as f:
+            legacy = json.load(f)
+
+        positives, negatives = {}, {}
+        for key, coords in legacy.items():
+            address = address_by_key.get(key)
+            if not address:
+                continue
+            if coords:
+                positives[address] = tuple(coords)
+            else:
+                negatives[address] = None
+        # Don't overwrite anything the new cache already knows
+        positives = {a: c for a, c in positives.items() if not self.lookup(a)[0]}
+        negatives = {a: c for a, c in negatives.items() if not self.lookup(a)[0]}
+        imported = self.put_many(positives) + self.put_many(negatives, now=0)
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)",
+                            (os.path.abspath(json_path),))
+        return imported
+
+
+# ============================================================
+# OFFLINE FALLBACK — ZIP / state centroids
+# ============================================================
+STATE_COORDS = {
+    'AL': [32.806671, -86.791130], 'AK': [61.370716, -152.404419],
+    'AZ': [33.729759, -111.431221], 'AR': [34.969704, -92.373123],
+    'CA': [36.116203, -119.681564], 'CO': [39.059811, -105.311104],
+    'CT': [41.597782, -72.755371], 'DE': [39.318523, -75.507141],
+    'FL': [27.766279, -81.686783], 'GA': [33.040619, -83.643074],
+    'HI': [21.094318, -157.498337], 'ID': [44.240459, -114.478828],
+    'IL': [40.349457, -88.986137], 'IN': [39.849426, -86.258278],
+    'IA': [42.011539, -93.210526], 'KS': [38.526600, -96.726486],
+    'KY': [37.668140, -84.670067], 'LA': [31.169546, -91.867805],
+    'ME': [44.693947, -69.381927], 'MD': [39.063946, -76.802101],
+    'MA': [42.230171, -71.530106], 'MI': [43.326618, -84.536095],
+    'MN': [45.694454, -93.900192], 'MS': [32.741646, -89.678696],
+    'MO': [38.456085, -92.288368], 'MT': [46.921925, -110.454353],
+    'NE': [41.125370, -98.268082], 'NV': [38.313515, -117.055374],
+    'NH': [43.452492, -71.563896], 'NJ': [40.298904, -74.521011],
+    'NM': [34.840515, -106.248482], 'NY': [42.165726, -74.948051],
+    'NC': [35.630066, -79.806419], 'ND': [47.528912, -99.784012],
+    'OH': [40.388783, -82.764915], 'OK': [35.565342, -96.928917],
+    'OR': [44.572021, -122.070938], 'PA': [40.590752, -77.209755],
+    'RI': [41.680893, -71.511780], 'SC': [33.856892, -80.945007],
+    'SD': [44.299782, -99.438828], 'TN': [35.747845, -86.692345],
+    'TX': [31.054487, -97.563461], 'UT': [40.150032, -111.862434],
+    'VT': [44.045876, -72.710686], 'VA': [37.769337, -78.169968],
+    'WA': [47.400902, -121.490494], 'WV': [38.491226, -80.954456],
+    'WI': [44.268543, -89.616508], 'WY': [42.755966, -107.302490],
+    'DC': [38.897438, -77.026817]
+}
+
+STATE_NAME_TO_ABBR = {
+    'Alabama': 'AL', 'Alaska': 'AK', 'Arizona': 'AZ', 'Arkansas': 'AR',
+    'California': 'CA', 'Colorado': 'CO', 'Connecticut': 'CT', 'Delaware': 'DE',
+    'Florida': 'FL', 'Georgia': 'GA', 'Hawaii': 'HI', 'Idaho': 'ID',
+    'Illinois': 'IL', 'Indiana': 'IN', 'Iowa': 'IA', 'Kansas': 'KS',
+    'Kentucky': 'KY', 'Louisiana': 'LA', 'Maine': 'ME', 'Maryland': 'MD',
+    'Massachusetts': 'MA', 'Michigan': 'MI', 'Minnesota': 'MN', 'Mississippi': 'MS',
+    'Missouri': 'MO', 'Montana': 'MT', 'Nebraska': 'NE', 'Nevada': 'NV',
+    'New Hampshire': 'NH', 'New Jersey': 'NJ', 'New Mexico': 'NM', 'New York': 'NY',
+    'North Carolina': 'NC', 'North Dakota': 'ND', 'Ohio': 'OH', 'Oklahoma': 'OK',
+    'Oregon': 'OR', 'Pennsylvania': 'PA', 'Rhode Island': 'RI', 'South Carolina': 'SC',
+    'South Dakota': 'SD', 'Tennessee': 'TN', 'Texas': 'TX', 'Utah': 'UT',
+    'Vermont': 'VT', 'Virginia': 'VA', 'Washington': 'WA', 'West Virginia': 'WV',
+    'Wisconsin': 'WI', 'Wyoming': 'WY', 'Washington DC': 'DC'
+}
+
+ABBR_TO_STATE_NAME = {v: k for k, v in STATE_NAME_TO_ABBR.items()}
+
+# Jitter span in degrees: small around a ZIP centroid, wide around a state centroid
+ZIP_JITTER = 0.05
+STATE_JITTER = 0.8
+
+
+def resolve_state_abbr(s):
+    """USPS abbreviation for a state name or abbreviation, or '' if unrecognized."""
+    s = s.strip()
+    if len(s) == 2 and s.upper() in STATE_COORDS:
+        return s.upper()
+    return STATE_NAME_TO_ABBR.get(s, '')
+
+
+def get_coords(address, state_abbr, name):
+    """Offline lat/lng: the address's ZIP centroid, else the state centroid, with deterministic jitter."""
+    coords = zip_centroid(address, state_abbr)
+    spread = ZIP_JITTER
+    if coords:
+        lat, lng = coords
+    elif state_abbr in STATE_COORDS:
+        lat, lng = STATE_COORDS[state_abbr]
+        spread = STATE_JITTER
+    else:
+        return None, None
+    # Deterministic jitter based on company name spreads overlapping markers
+    h = int(hashlib.md5(name.encode()).hexdigest()[:8], 16)
+    lat += ((h % 1000) / 1000 - 0.5) * spread
+    lng += (((h >> 10) % 1000) / 1000 - 0.5) * spread
+    return lat, lng
+
+
+# ============================================================
+# CENSUS BATCH GEOCODER
+# ============================================================
+# The addressbatch endpoint accepts at most 10,000 rows per file
+CENSUS_MAX_BATCH = 10000
+CENSUS_MAX_IN_FLIGHT = 4
+# Failed batches are halved until they are this small, then given up on
+MIN_SPLIT_SIZE = 25
+_BOUNDARY = '----BatchBoundary'
+
+
+def _census_row(uid, address):
+    """Split 'Street, City, State ZIP[, Country]' into the Census CSV columns."""
+    parts = [p.strip() for p in address.split(',')]
+    if len(parts) >= 3:
+        sz_match = re.match(r'([A-Za-z\s]+?)\s*(\d{5})', parts[2])
+        if sz_match:
+            state, zipcode = sz_match.group(1).strip(), sz_match.group(2)
+        else:
+            state, zipcode = parts[2], ''
+        return [uid, parts[0], parts[1], state, zipcode]
+    if len(parts) == 2:
+        return [uid, parts[0], parts[1], '', '']
+    return [uid, address, '', '', '']
+
+
+def _census_body(batch):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    for uid, address in batch:
+        writer.writerow(_census_row(uid, address))
+    return (
+        f'--{_BOUNDARY}\r\n'
+        f'Content-Disposition: form-data; name="addressFile"; filename="addresses.csv"\r\n'
+        f'Content-Type: text/csv\r\n\r\n'
+    ).encode('utf-8') + out.getvalue().encode('utf-8') + (
+        f'\r\n--{_BOUNDARY}\r\n'
+        f'Content-Disposition: form-data; name="benchmark"\r\n\r\n'
+        f'Public_AR_Current\r\n'
+        f'--{_BOUNDARY}--\r\n'
+    ).encode('utf-8')
+
+
+def _parse_census_response(text):
+    """Return {uid: (lat, lng)} for matched rows of a Census batch response."""
+    results = {}
+    # Response rows: "id","input address","Match","Exact","matched address","lng,lat","tiger id","side"
+    for row in csv.reader(io.StringIO(text)):
+        if len(row) >= 6 and row[2].strip().lower() == 'match' and row[5].strip():
+            try:
+                lng_s, lat_s = row[5].split(',')
+                results[row[0].strip()] = (float(lat_s), float(lng_s))
+            except ValueError:
+                pass
+    return results
+
+
+def census_geocode(addresses, base_url, batch_size=CENSUS_MAX_BATCH, max_in_flight=CENSUS_MAX_IN_FLIGHT,
+                   timeout=600):
+    """Geocode [(uid, address)] through the Census batch API.
+
+    Returns (results, failed): results maps uid -> (lat, lng) for matches;
+    failed holds uids whose batch could not be answered even after
+    splitting, so callers can leave them uncached instead of recording a miss.
+    """
+    url = f'{base_url}/geocoder/locations/addressbatch'
+    headers = {'Content-Type': f'multipart/form-data; boundary={_BOUNDARY}'}
+    batch_size = max(1, min(batch_size, CENSUS_MAX_BATCH))
+    results, failed = {}, set()
+    done = matched = batches = 0
+    start = time.perf_counter()
+
+    def run(batch):
+        t = time.perf_counter()
+        body = _census_body(batch)
+        text = call_with_retry(
+            lambda: client.post(url, body, headers=headers, timeout=timeout).text(),
+            max_attempts=3, label=f'census batch of {len(batch)}',
+        )
+        return _parse_census_response(text), time.perf_counter() - t
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        pending = {pool.submit(run, addresses[i:i + batch_size]): addresses[i:i + batch_size]
+                   for i in range(0, len(addresses), batch_size)}
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                batch = pending.pop(future)
+                try:
+                    batch_results, elapsed = future.result()
+                except Exception as e:
+                    if len(batch) > MIN_SPLIT_SIZE:
+                        half = len(batch) // 2
+                        print(f"    Census batch of {len(batch)} failed ({e}); splitting")
+                        for part in (batch[:half], batch[half:]):
+                            pending[pool.submit(run, part)] = part
+                    else:
+                        print(f"    Census batch of {len(batch)} failed ({e}); giving up on it")
+                        failed.update(uid for uid, _ in batch)
+                        done += len(batch)
+                    continue
+                hits = sum(1 for uid, _ in batch if uid in batch_results)
+                results.update(batch_results)
+                batches += 1
+                done += len(batch)
+                matched += hits
+                print(f"    Census batch {batches}: {hits}/{len(batch)} matched "
+                      f"({hits / len(batch):.0%}) in {elapsed:.1f}s; {done}/{len(addresses)} done")
+
+    answered = len(addresses) - len(failed)
+    print(f"  Census: {matched}/{answered} matched ({matched / answered if answered else 0:.0%}), "
+          f"{len(failed)} unanswered, {batches} batches in {time.perf_counter() - start:.1f}s")
+    return results, failed
@@ -0,0 +1,335 @@
+"""
+Shared keep-alive HTTP client for the data build scripts.
+
+Airtable pages, Google Sheet CSV exports and Census batch geocoding all go
+through one pooled client so repeated calls to the same host reuse an open
+TCP+TLS connection instead of paying a fresh handshake per request.
+Responses are requested with gzip and decompressed transparently.
+
+Usage:
+    from http_client import client
+    resp = client.get(url, headers={...}, timeout=60)
+    resp.json() / resp.text() / resp.body
+    client.stats()  -> connections opened, requests, bytes in/out, latency
+
+Rate limiting and retries live here too: TokenBucket paces callers that share
+a quota, and call_with_retry retries transient failures with jittered
+exponential backoff, honoring Retry-After. Only connection, timeout and
+incomplete-read errors and 429/5xx responses are transient; a body that
+fails to decompress, decode or parse raises DecodeError straight away,
+since retrying would get the same bytes.
+"""
+
+import email.utils
+import gzip
+import http.client
+import json
+import random
+import threading
+import time
+import urllib.parse
+import zlib
+
+MAX_REDIRECTS = 5
+USER_AGENT = 'rehab-outreach-dashboard/1.0'
+
+# Errors that mean a pooled keep-alive connection went stale between requests
+_STALE_ERRORS = (
+    http.client.RemoteDisconnected, http.client.BadStatusLine,
+    ConnectionResetError, BrokenPipeError, ConnectionAbortedError,
+)
+
+
+class HTTPError(Exception):
+    """Raised for responses with status >= 400."""
+
+    def __init__(self, url, status, reason, headers, body):
+        super().__init__(f'HTTP Error {status}: {reason}')
+        self.url = url
+        self.status = status
+        self.code = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+
+class DecodeError(ValueError):
+    """Raised when a complete response body can't be decompressed, decoded or parsed."""
+
+    def __init__(self, url, error):
+        super().__init__(f'{url}: {error}')
+        self.url = url
+
+
+class Response:
+    def __init__(self, url, status, headers, body):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def text(self, encoding='utf-8'):
+        try:
+            return self.body.decode(encoding)
+        except UnicodeDecodeError as e:
+            raise DecodeError(self.url, e) from e
+
+    def json(self):
+        try:
+            return json.loads(self.body)
+        except ValueError as e:
+            raise DecodeError(self.url, e) from e
+
+
+def _decode_body(raw, encoding):
+    encoding = (encoding or '').lower()
+    if encoding == 'gzip':
+        return gzip.decompress(raw)
+    if encoding == 'deflate':
+        try:
+            return zlib.decompress(raw)
+        except zlib.error:
+            return zlib.decompress(raw, -zlib.MAX_WBITS)
+    return raw
+
+
+class HTTPClient:
+    """Thread-safe pool of keep-alive connections keyed by (scheme, host, port)."""
+
+    def __init__(self, max_idle_per_host=8):
+        self.max_idle_per_host = max_idle_per_host
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            'connectionsOpened': 0, 'requests': 0,
+            'bytesIn': 0, 'bytesOut': 0,
+            'latencyTotal': 0.0, 'latencyMax': 0.0,
+        }
+        self._by_host = {}
+
+    # ---- connection pool ----
+    def _checkout(self, key, timeout):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                conn = idle.pop()
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+        scheme, host, port = key
+        cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        conn = cls(host, port, timeout=timeout)
+        with self._lock:
+            self._counters['connectionsOpened'] += 1
+            self._host_counters(host)['connectionsOpened'] += 1
+        return conn, False
+
+    def _checkin(self, key, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            pools, self._idle = self._idle, {}
+        for idle in pools.values():
+            for conn in idle:
+                conn.close()
+
+    # ---- counters ----
+    def _host_counters(self, host):
+        if host not in self._by_host:
+            self._by_host[host] = {'connectionsOpened': 0, 'requests': 0, 'bytesIn': 0,
+                                   'bytesOut': 0, 'latencyTotal': 0.0}
+        return self._by_host[host]
+
+    def _record(self, host, bytes_out, bytes_in, latency):
+        with self._lock:
+            for counters in (self._counters, self._host_counters(host)):
+                counters['requests'] += 1
+                counters['bytesOut'] += bytes_out
+                counters['bytesIn'] += bytes_in
+                counters['latencyTotal'] += latency
+            self._counters['latencyMax'] = max(self._counters['latencyMax'], latency)
+
+    def stats(self):
+        """Snapshot of the counters, overall and per host."""
+        with self._lock:
+            out = dict(self._counters)
+            out['byHost'] = {h: dict(c) for h, c in self._by_host.items()}
+        out['latencyMean'] = out['latencyTotal'] / out['requests'] if out['requests'] else 0.0
+        return out
+
+    # ---- requests ----
+    def _send(self, method, url, headers, body, timeout):
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme.lower()
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parts.hostname, port)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        req_headers = {
+            'Host': parts.netloc,
+            'User-Agent': USER_AGENT,
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive',
+        }
+        req_headers.update(headers or {})
+        if body is not None:
+            req_headers['Content-Length'] = str(len(body))
+
+        while True:
+            conn, reused = self._checkout(key, timeout)
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=req_headers)
+                resp = conn.getresponse()
+                raw = resp.read()
+            except _STALE_ERRORS:
+                conn.close()
+                if reused:
+                    continue  # server closed an idle connection; retry on a fresh one
+                raise
+            except Exception:
+                conn.close()
+                raise
+            latency = time.perf_counter() - start
+            self._record(parts.hostname, len(body or b''), len(raw), latency)
+
+            if resp.will_close:
+                conn.close()
+            else:
+                self._checkin(key, conn)
+            return resp, raw
+
+    def request(self, method, url, headers=None, body=None, timeout=60):
+        """Send a request, following redirects; raises HTTPError for status >= 400."""
+        for _ in range(MAX_REDIRECTS + 1):
+            resp, raw = self._send(method, url, headers, body, timeout)
+            if resp.status in (301, 302, 303, 307, 308) and resp.getheader('Location'):
+                url = urllib.parse.urljoin(url, resp.getheader('Location'))
+                if resp.status == 303 or (resp.status in (301, 302) and method == 'POST'):
+                    method, body = 'GET', None
+                continue
+            try:
+                data = _decode_body(raw, resp.getheader('Content-Encoding'))
+            except (OSError, EOFError, zlib.error) as e:
+                # The body was read in full (a short read raises IncompleteRead), so this is the data
+                raise DecodeError(url, e) from e
+            if resp.status >= 400:
+                raise HTTPError(url, resp.status, resp.reason, resp.headers, data)
+            return Response(url, resp.status, resp.headers, data)
+        raise HTTPError(url, resp.status, 'Too many redirects', resp.headers, b'')
+
+    def get(self, url, headers=None, timeout=60):
+        return self.request('GET', url, headers=headers, timeout=timeout)
+
+    def post(self, url, body, headers=None, timeout=60):
+        return self.request('POST', url, headers=headers, body=body, timeout=timeout)
+
+
+# Process-wide client shared by every fetch path
+client = HTTPClient()
+
+
+# ============================================================
+# RATE LIMITING + RETRY
+# ============================================================
+TRANSIENT_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens/second, holding at most `capacity`."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold every caller for `seconds` (e.g. after the server says we are over quota)."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+
+def retry_after_seconds(headers):
+    """Parse a Retry-After header (delta-seconds or HTTP-date); None if absent."""
+    value = headers.get('Retry-After') if headers else None
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def is_transient(error):
+    if isinstance(error, HTTPError):
+        return error.status in TRANSIENT_STATUSES
+    # Connection failures and resets (OSError covers sockets, TLS and timeouts),
+    # dropped keep-alive connections and truncated bodies
+    return isinstance(error, (OSError, http.client.IncompleteRead, http.client.BadStatusLine))
+
+
+def call_with_retry(fn, bucket=None, max_attempts=6, base_delay=1.0, max_delay=60.0,
+                    rate_limited_wait=None, label='request'):
+    """Call fn() until it succeeds, retrying transient failures.
+
+    Each attempt first takes a token from `bucket`. On 429/503 the server's
+    Retry-After wins (falling back to `rate_limited_wait` for 429) and the whole
+    bucket is paused so sibling workers back off too. Other transient errors
+    sleep a full-jitter exponential delay. Non-transient errors, and the last
+    transient one, are re-raised.
+    """
+    for attempt in range(max_attempts):
+        if bucket:
+            bucket.acquire()
+        try:
+            return fn()
+        except Exception as e:
+            if not is_transient(e) or attempt == max_attempts - 1:
+                raise
+            wait = None
+            if isinstance(e, HTTPError):
+                wait = retry_after_seconds(e.headers)
+                if wait is None and e.status == 429:
+                    wait = rate_limited_wait
+            if wait is not None and bucket:
+                bucket.pause(wait)
+            if wait is None:
+                wait = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            print(f"    {label}: {e}; retry {attempt + 1}/{max_attempts - 1} in {wait:.1f}s")
+            time.sleep(wait)
+
+
+def format_stats(stats):
+    """One-line summary of client counters for run output."""
+    return (f"{stats['requests']} requests over {stats['connectionsOpened']} connections, "
+            f"{stats['bytesIn'] / 1024:.0f} KB in / {stats['bytesOut'] / 1024:.0f} KB out, "
+            f"mean latency {stats['latencyMean'] * 1000:.0f} ms (max {stats['latencyMax'] * 1000:.0f} ms)")
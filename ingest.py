@@ -0,0 +1,1069 @@
+"""
+Shared ingestion engine for the build scripts.
+
+Every source goes through an adapter that turns its rows into the same
+normalized records, so fetch_airtable.py, parse_all.py and parse_csv.py
+only differ in where their data comes from:
+
+    company  airtableId, name, key, address, state, fullState, ownership,
+             allStates, website, override, stateTier, bradfordFacility
+    message  day, meetingDay, medium, account, contactIds, contact and
+             flags, a bitmask of the outcomes (RESPONDED, SCHEDULED, ...)
+    deal     a pipeline row, as written to data.json
+
+Dates are parsed once, at the adapter, into integer days since 1970-01-01
+(epoch days); aggregation compares integers, and the output carries ISO
+dates for display alongside the epoch days the dashboard filters on.
+
+Adapters:
+    Airtable API       airtable_companies, airtable_contacts, airtable_messages
+    CSV exports        export_companies (View All / Working Sheet),
+                       grid_view (Grid view, one row per message),
+                       rollup_companies (Working Sheet with rollup counts)
+    Pipeline           sheet_pipeline, sheet_actions (Google Sheet CSV tabs),
+                       workbook_pipeline (the pipeline .xlsx)
+
+A Dataset collects records from any mix of adapters, aggregates messages
+per company (OutreachAggregate, with mediums, accounts and contacts
+interned to small int codes), keeps the messages themselves as code
+columns (MessageTable), matches pipeline deals (aliases, exact names,
+then the fuzzy index in name_match.py), geocodes through the shared cache
+and builds the output; write_output is the one digest-gated export path,
+for data.json and the side files next to it (the search index).
+"""
+
+import csv
+import io
+import os
+import re
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from datetime import date
+
+from clusters import build_clusters
+from export import (
+    COLUMNAR_FORMAT, content_digest, encode_columnar, format_write_stats, read_digest, write_digest, write_json,
+    write_sharded,
+)
+from facets import build_facets
+from geocode_store import (
+    CENSUS_MAX_BATCH, CENSUS_MAX_IN_FLIGHT, DEFAULT_NEGATIVE_TTL_DAYS, GeocodeCache, census_geocode,
+    get_coords, resolve_state_abbr,
+)
+from instrument import recorder
+from name_match import NEAR_MISS_THRESHOLD, NameIndex
+from search_index import build_search_index
+
+CENSUS_GEOCODER_URL = os.environ.get('CENSUS_GEOCODER_URL', 'https://geocoding.geo.census.gov')
+# Addresses per batch (service max 10,000) and batches submitted concurrently
+CENSUS_BATCH_SIZE = int(os.environ.get('CENSUS_BATCH_SIZE') or CENSUS_MAX_BATCH)
+CENSUS_IN_FLIGHT = int(os.environ.get('CENSUS_MAX_IN_FLIGHT') or CENSUS_MAX_IN_FLIGHT)
+
+# Company search index, written next to data.json (search_index.py)
+SEARCH_INDEX_FILE = 'search_index.json'
+
+# Deal name -> company name overrides, checked before exact and fuzzy matching.
+# Only needed for names the fuzzy matcher can't tie to the right company.
+PIPELINE_ALIASES = {
+    'nola detox & recovery center': 'nola detox',
+    'second chances': 'second chances addiction recovery center',
+    'serenity treatment centers': 'serenity treatment center',
+    'sanctuary': 'sanctuary louisiana',
+    'asheville detox (healthcare alliance)': 'asheville detox center',
+    'recovery now / longbranch': 'longbranch healthcare',
+    'dreamlife / crestview': 'dreamlife recovery pa',
+    'new waters': 'new waters recovery',
+    'momentum recovery': 'momentum recovery',
+    'the grove recovery': 'the grove recovery centers',
+    'sycamour': 'sycamore behavioral health',
+    'new vista / ethan crossing': 'ethan crossing addiction treatment',
+    'southeast detox / addiction ctr': 'southeast detox',
+    'cardinal': 'cardinal recovery',
+    'ghr': 'ghr center for addiction recovery and treatment',
+    'peachtree detox (evoraa)': 'peachtree detox',
+    'revive recover': 'gateway to sobriety (revive recover)',
+    'southern sky': 'southern sky recovery',
+    'the wave': 'the wave international',
+    'woodlake center': 'woodlake addiction recovery',
+    'the sylvia brafman mh center': 'the sylvia brafman mental health center',
+    'turning leaf behavioral health': 'turning leaf behavioral health services',
+    'centric': 'reign residential treatment center',
+}
+
+
+# ============================================================
+# RECORD MODEL
+# ============================================================
+COMPANY_DEFAULTS = {
+    'airtableId': '',
+    'name': '',
+    'key': '',
+    'address': '',
+    'state': '',
+    'fullState': '',
+    'ownership': '',
+    'allStates': '',
+    'website': '',
+    'override': False,
+    'stateTier': '',
+    'bradfordFacility': '',
+}
+
+
+def normalize_name(name):
+    """Lowercase a company name and collapse unicode/regular whitespace."""
+    return re.sub(r'\s+', ' ', name.lower().strip().replace('\u202f', ' ').replace('\u00a0', ' '))
+
+
+def company_record(name, **fields):
+    """A normalized company record; unknown fields are rejected."""
+    unknown = set(fields) - set(COMPANY_DEFAULTS)
+    if unknown:
+        raise TypeError(f"unknown company fields: {', '.join(sorted(unknown))}")
+    record = dict(COMPANY_DEFAULTS, **fields)
+    record['name'] = name
+    record['key'] = normalize_name(name)
+    return record
+
+
+# Message outcome bits; an aggregate's flags are the OR of its messages'
+RESPONDED = 1
+SCHEDULED = 2
+ASSISTED = 4
+NOT_INTERESTED = 8
+FOLLOW_UP = 16
+OPENED = 32
+VIEWED_PROFILE = 64
+
+
+def message_record(day=None, medium='', account='', contact_ids=(), contact='', meeting_day=None,
+                   responded=False, scheduled=False, assisted=False, not_interested=False,
+                   follow_up=False, opened=False, viewed_profile=False):
+    """A normalized outreach message; days are epoch days (see epoch_day), contact_ids feed
+    the per-company contact set, and the outcomes are packed into one flags int."""
+    flags = ((RESPONDED if responded else 0) | (SCHEDULED if scheduled else 0)
+             | (ASSISTED if assisted else 0) | (NOT_INTERESTED if not_interested else 0)
+             | (FOLLOW_UP if follow_up else 0) | (OPENED if opened else 0)
+             | (VIEWED_PROFILE if viewed_profile else 0))
+    return {
+        'day': day, 'meetingDay': meeting_day, 'medium': medium, 'account': account,
+        'contactIds': contact_ids, 'contact': contact, 'flags': flags,
+    }
+
+
+class Vocabulary(dict):
+    """str -> dense int code, assigned in first-seen order; values lists the strings by code."""
+
+    __slots__ = ('values',)
+
+    def __init__(self, *preset):
+        super().__init__()
+        self.values = []
+        for value in preset:
+            self[value]
+
+    def __missing__(self, value):
+        code = self[value] = len(self.values)
+        self.values.append(value)
+        return code
+
+
+def _grow(counts, size):
+    """A zeroed counter array of size slots, keeping what counts already holds."""
+    grown = array('I', bytes(4 * size))
+    if counts is not None:
+        grown[:len(counts)] = counts
+    return grown
+
+
+class OutreachAggregate:
+    """Per-company outreach totals.
+
+    Mediums, accounts and contacts are codes from the Dataset's
+    vocabularies: by_medium / by_account are array('I') counters indexed by
+    code, sized to the vocabulary (None until the first count, regrown only
+    when a new value appears), contacts a sorted array of distinct codes
+    (sorted so add() finds a code by bisection).
+    """
+
+    __slots__ = ('msgs_sent', 'responded_count', 'flags', 'by_medium', 'by_account', 'contacts',
+                 'first_day', 'last_day', 'meeting_day')
+
+    def __init__(self):
+        self.msgs_sent = 0
+        self.responded_count = 0
+        self.flags = 0
+        self.by_medium = None
+        self.by_account = None
+        self.contacts = array('I')
+        self.first_day = None
+        self.last_day = None
+        self.meeting_day = None
+
+    def add(self, flags, day, meeting_day, medium, account, contacts, mediums, accounts):
+        """Count one message; medium/account are codes (0 for blank), mediums/accounts the vocabulary sizes."""
+        self.msgs_sent += 1
+        self.flags |= flags
+        if flags & RESPONDED:
+            self.responded_count += 1
+        if medium:
+            counts = self.by_medium
+            if counts is None or medium >= len(counts):
+                counts = self.by_medium = _grow(counts, mediums)
+            counts[medium] += 1
+        if account:
+            counts = self.by_account
+            if counts is None or account >= len(counts):
+                counts = self.by_account = _grow(counts, accounts)
+            counts[account] += 1
+        known = self.contacts
+        for code in contacts:
+            i = bisect_left(known, code)
+            if i == len(known) or known[i] != code:
+                known.insert(i, code)
+        if day is not None:
+            if self.first_day is None or day < self.first_day:
+                self.first_day = day
+            if self.last_day is None or day > self.last_day:
+                self.last_day = day
+        if meeting_day is not None:
+            self.meeting_day = meeting_day
+
+
+def _counts(counts, vocabulary):
+    """{value: n} for the non-zero slots of a counter array."""
+    if counts is None:
+        return {}
+    return {vocabulary.values[code]: n for code, n in enumerate(counts) if n}
+
+
+_NO_MESSAGES = OutreachAggregate()
+
+
+# ============================================================
+# MESSAGE TABLE
+# ============================================================
+# Day column value for messages without a date
+NO_DAY = -1 << 31
+
+
+class MessageTable:
+    """The outreach messages as parallel typed columns, one entry per message.
+
+    day holds epoch days (NO_DAY when missing); medium, account, contact and
+    company hold codes into vocabularies whose code 0 is the blank value.
+    A company code stands for the companies a message counted toward,
+    labelled as their names joined by ', '. Row dicts only exist on output:
+    rows() for data.json, archive() for the columnar form.
+    """
+
+    def __init__(self, mediums=None, accounts=None):
+        self.mediums = mediums if mediums is not None else Vocabulary('')
+        self.accounts = accounts if accounts is not None else Vocabulary('')
+        self.contacts = Vocabulary('')
+        self.companies = Vocabulary('')
+        self._groups = {(): 0}         # company id tuple -> company code
+        self.day = array('i')
+        self.medium = array('I')
+        self.account = array('I')
+        self.contact = array('I')
+        self.company = array('I')
+
+    def __len__(self):
+        return len(self.day)
+
+    def company_code(self, ids, names):
+        """Code for the company id tuple ids; names(ids) gives their names the first time."""
+        code = self._groups.get(ids)
+        if code is None:
+            code = self._groups[ids] = self.companies[', '.join(names(ids))]
+        return code
+
+    def append(self, day, medium, account, contact, company):
+        """Add one message; day may be None, the rest are codes."""
+        self.day.append(NO_DAY if day is None else day)
+        self.medium.append(medium)
+        self.account.append(account)
+        self.contact.append(self.contacts[contact])
+        self.company.append(company)
+
+    def meta(self):
+        """Totals by medium, account and month, counted over the code columns."""
+        months = defaultdict(int)
+        for day, n in Counter(self.day).items():
+            if day != NO_DAY:
+                months[iso_date(day)[:7]] += n
+        return {
+            'totalMessages': len(self),
+            'mediumCounts': _code_counts(self.medium, self.mediums),
+            'accountCounts': _code_counts(self.account, self.accounts),
+            'monthlyCounts': dict(sorted(months.items())),
+        }
+
+    def rows(self):
+        """The messages as data.json row dicts."""
+        mediums, accounts = self.mediums.values, self.accounts.values
+        contacts, companies = self.contacts.values, self.companies.values
+        return [{
+            'date': iso_date(None if day == NO_DAY else day),
+            'day': None if day == NO_DAY else day,
+            'medium': mediums[medium],
+            'account': accounts[account],
+            'contact': contacts[contact],
+            'company': companies[company],
+        } for day, medium, account, contact, company
+            in zip(self.day, self.medium, self.account, self.contact, self.company)]
+
+    def archive(self):
+        """The messages in export.py's columnar layout, built from the codes without
+        materializing rows; decodes (decode_columnar, index.html) to the same rows."""
+        days = {}
+        date_codes = [days.setdefault(day, len(days)) for day in self.day]
+        return {
+            'format': COLUMNAR_FORMAT,
+            'length': len(self),
+            'columns': {
+                'date': {'type': 'dict', 'values': [iso_date(None if d == NO_DAY else d) for d in days],
+                         'codes': date_codes},
+                'day': {'type': 'plain', 'data': [None if d == NO_DAY else d for d in self.day]},
+                'medium': {'type': 'dict', 'values': self.mediums.values, 'codes': self.medium.tolist()},
+                'account': {'type': 'dict', 'values': self.accounts.values, 'codes': self.account.tolist()},
+                'contact': {'type': 'dict', 'values': self.contacts.values, 'codes': self.contact.tolist()},
+                'company': {'type': 'dict', 'values': self.companies.values, 'codes': self.company.tolist()},
+            },
+        }
+
+
+def _code_counts(column, vocabulary):
+    """{value: n} over a code column, blank (code 0) left out, in first-seen order."""
+    return {vocabulary.values[code]: n for code, n in Counter(column).items() if code}
+
+
+def _flag(value):
+    """Truthy Airtable single-select / text values: anything but blank, 'no' or 'n/a'."""
+    return bool(value) and value.lower() not in ('', 'no', 'n/a')
+
+
+def parse_num(val):
+    """Sum a rollup cell like '3, 2, NaN'; 0 when blank or unparseable."""
+    val = str(val).strip()
+    if not val or val == 'NaN':
+        return 0
+    try:
+        return sum(float(x.strip()) for x in val.split(',') if x.strip() and x.strip() != 'NaN')
+    except ValueError:
+        return 0
+
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_DATE_RE = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})|(\d{1,2})/(\d{1,2})/(\d{4})')
+# Date text -> epoch day; a few hundred distinct dates cover a whole outreach table
+_epoch_days = {}
+_iso_dates = {}
+
+
+def epoch_day(value):
+    """Days since 1970-01-01 for 'YYYY-MM-DD[Thh:mm...]' or 'M/D/YYYY' text, else None.
+
+    Only the date part is used, so ISO timestamps count on their UTC date.
+    """
+    if not value:
+        return None
+    key = value[:10]
+    try:
+        return _epoch_days[key]
+    except KeyError:
+        pass
+    m = _DATE_RE.match(key.strip())
+    day = None
+    if m:
+        y, mo, d = (m.group(1), m.group(2), m.group(3)) if m.group(1) else (m.group(6), m.group(4), m.group(5))
+        try:
+            day = date(int(y), int(mo), int(d)).toordinal() - EPOCH_ORDINAL
+        except ValueError:
+            pass
+    _epoch_days[key] = day
+    return day
+
+
+def iso_date(day):
+    """'YYYY-MM-DD' for an epoch day, '' for None."""
+    if day is None:
+        return ''
+    iso = _iso_dates.get(day)
+    if iso is None:
+        iso = _iso_dates[day] = date.fromordinal(day + EPOCH_ORDINAL).isoformat()
+    return iso
+
+
+# ============================================================
+# ADAPTERS — AIRTABLE API
+# ============================================================
+def at_val(fields, key, default=''):
+    """Extract a value from Airtable fields, handling AI-generated fields."""
+    v = fields.get(key, default)
+    if isinstance(v, dict):
+        # AI-generated fields have {state, value, isStale}
+        return v.get('value', default) or default
+    if isinstance(v, list):
+        return v  # Return lists as-is
+    return v if v is not None else default
+
+
+def _at_str(fields, key):
+    value = at_val(fields, key, '')
+    return value.strip() if isinstance(value, str) else ''
+
+
+def airtable_companies(records):
+    """Yield (record id, company) from Companies table records."""
+    for r in records:
+        f = r['fields']
+        name = f.get('Name', '').strip()
+        if not name:
+            continue
+        all_states = f.get('All State(s) Operating In', [])
+        full_state = f.get('Full HQ State Name', '').strip() if isinstance(f.get('Full HQ State Name'), str) else ''
+        yield r['id'], company_record(
+            name,
+            airtableId=r['id'],
+            address=_at_str(f, 'HQ Address'),
+            fullState=full_state,
+            state=resolve_state_abbr(full_state) or resolve_state_abbr(_at_str(f, 'HQ State')),
+            ownership=f.get('Ownership', '') or '',
+            allStates=', '.join(all_states) if isinstance(all_states, list) else str(all_states),
+            website=_at_str(f, 'Website'),
+            override=bool(f.get('Override')),
+            stateTier=_at_str(f, 'State Tier'),
+            bradfordFacility=_at_str(f, 'Bradford Facility'),
+        )
+
+
+def airtable_contacts(records):
+    """Return (contact id -> company ids, contact id -> name) from Contacts table records."""
+    contact_to_companies = {}
+    contact_names = {}
+    for r in records:
+        f = r['fields']
+        comp_ids = f.get('Companies', [])
+        if comp_ids:
+            contact_to_companies[r['id']] = comp_ids
+        name = f.get('Name', '')
+        if name:
+            contact_names[r['id']] = name
+    return contact_to_companies, contact_names
+
+
+def airtable_messages(records, contact_to_companies, contact_names):
+    """Yield (message, company ids) from Cold Outreach records."""
+    for r in records:
+        f = r['fields']
+        contact_ids = f.get('Contacts', [])
+        company_ids = []
+        for cid in contact_ids:
+            company_ids.extend(contact_to_companies.get(cid, []))
+        names = [contact_names[cid] for cid in contact_ids if contact_names.get(cid)]
+        responded = at_val(f, 'Responded', '')
+        yield message_record(
+            day=epoch_day(f.get('Date Sent', '')),
+            meeting_day=epoch_day(f.get('Meeting Date', '') or ''),
+            medium=f.get('Message Medium', '') or '',
+            account=f.get('Account', '') or '',
+            contact_ids=contact_ids,
+            contact=', '.join(names),
+            responded=str(responded).strip() not in ('', '0', 'False', 'false', 'None'),
+            scheduled=_flag(f.get('Scheduled Intro Call', '') or ''),
+            assisted=_flag(f.get('Assisted Meeting', '') or ''),
+            not_interested=bool(f.get('Not Interested', [])),
+            follow_up=bool(f.get('Follow Up Priority (from Follow Ups)', [])),
+            opened=_flag(f.get('Opened', '') or ''),
+        ), company_ids
+
+
+# ============================================================
+# ADAPTERS — CSV EXPORTS
+# ============================================================
+def _read_csv(path):
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        yield from csv.DictReader(f)
+
+
+def _cell(row, column):
+    return (row.get(column) or '').strip()
+
+
+def _export_company(r):
+    full_state = _cell(r, 'Full HQ State Name')
+    return company_record(
+        _cell(r, 'Name'),
+        address=_cell(r, 'HQ Address'),
+        fullState=full_state,
+        state=resolve_state_abbr(full_state) or resolve_state_abbr(_cell(r, 'HQ State')),
+        ownership=_cell(r, 'Ownership'),
+        allStates=_cell(r, 'All State(s) Operating In'),
+        website=_cell(r, 'Website'),
+        override=_cell(r, 'Override') == 'checked',
+        stateTier=_cell(r, 'State Tier'),
+    )
+
+
+def export_companies(path):
+    """Yield (key, company) from a Companies view export (View All, Working Sheet)."""
+    for r in _read_csv(path):
+        if _cell(r, 'Name'):
+            company = _export_company(r)
+            yield company['key'], company
+
+
+def rollup_companies(path):
+    """Yield (key, company, totals) from a Companies export with the rollup count columns.
+
+    The totals carry what the rollups can tell (see Dataset.add_aggregate):
+    message and response counts, meeting flags, first/last message dates
+    and the contact names.
+    """
+    for r in _read_csv(path):
+        if not _cell(r, 'Name'):
+            continue
+        company = _export_company(r)
+        responded = int(parse_num(r.get('# of Messages Responded (buyer + seller)', '')))
+        scheduled = parse_num(r.get('# of Meetings Scheduled (buyer + seller)', '')) > 0
+        assisted = 'TRUE' in _cell(r, 'Assisted Intro Meeting (buyer + seller)').upper()
+        agg = {
+            'msgsSent': int(parse_num(r.get('# of Messages Sent (buyer + seller)', ''))),
+            'respondedCount': responded,
+            'flags': ((RESPONDED if responded else 0) | (SCHEDULED if scheduled else 0)
+                      | (ASSISTED if assisted else 0)),
+            'firstDay': epoch_day(_cell(r, 'Date First Cold Message Sent')),
+            'lastDay': epoch_day(_cell(r, 'Date Last Cold Message Sent')),
+            'contacts': sorted({c.strip() for c in _cell(r, 'Contacts').split(',') if c.strip()}),
+        }
+        yield company['key'], company, agg
+
+
+def _split(value):
+    return [s.strip() for s in value.split(',') if s.strip()]
+
+
+def grid_view(path):
+    """Read a Cold Outreach export (one row per message).
+
+    Returns (companies, messages): key -> company built from the lookup
+    columns, and [(message, [key])] attributed to each row's first company.
+    """
+    companies = {}
+    states = defaultdict(set)
+    full_states = defaultdict(set)
+    messages = []
+    for r in _read_csv(path):
+        names = _split(_cell(r, 'Companies (from Contacts)'))
+        if not names:
+            continue
+        key = normalize_name(names[0])
+        company = companies.get(key)
+        if company is None:
+            company = companies[key] = company_record(names[0])
+        states[key].update(_split(_cell(r, 'State(s) (from Companies) (from Contacts)')))
+        full_states[key].update(_split(_cell(r, 'Full HQ State Name (from Companies) (from Contacts)')))
+        ownership = _split(_cell(r, 'Ownership (from Companies) (from Contacts)'))
+        if ownership:
+            company['ownership'] = ownership[0]
+        if 'checked' in _cell(r, 'Override (from Companies) (from Contacts)').lower():
+            company['override'] = True
+        tier = _split(_cell(r, 'State Tier (from Companies) (from Contacts)'))
+        if tier:
+            company['stateTier'] = tier[0]
+
+        contact = _cell(r, 'Contacts')
+        not_interested = _cell(r, 'Not Interested').upper()
+        messages.append((message_record(
+            day=epoch_day(_cell(r, 'Date Sent')),
+            meeting_day=epoch_day(_cell(r, 'Meeting Date')),
+            medium=_cell(r, 'Message Medium'),
+            account=_cell(r, 'Account'),
+            contact_ids=[contact] if contact else [],
+            contact=contact,
+            responded=_cell(r, 'Responded') == 'checked',
+            scheduled=_cell(r, 'Scheduled Intro Call').upper() == 'TRUE',
+            assisted=_cell(r, 'Assisted Meeting').upper() == 'TRUE',
+            not_interested=not_interested == 'NOT INTERESTED',
+            follow_up=not_interested == 'FOLLOW UP LATER',
+            opened=_cell(r, 'Opened').upper() == 'TRUE',
+            viewed_profile=_cell(r, 'Viewed Profile').upper() == 'TRUE',
+        ), [key]))
+
+    for key, company in companies.items():
+        full = sorted(full_states[key])
+        company['fullState'] = full[0] if full else ''
+        company['allStates'] = ', '.join(full or sorted(states[key]))
+        company['state'] = next(
+            (abbr for abbr in map(resolve_state_abbr, full + sorted(states[key])) if abbr), '')
+    return companies, messages
+
+
+# ============================================================
+# ADAPTERS — PIPELINE (Google Sheet tabs, workbook)
+# ============================================================
+SHEET_PIPELINE_COLUMNS = {
+    'name': 'Facility Name', 'status': 'Status', 'type': 'Type', 'priority': 'Priority',
+    'states': 'State(s)', 'ebitda': 'EBITDA / Financials', 'askingPrice': 'Asking Price',
+    'ndaStatus': 'NDA Status', 'dataRoom': 'Data Room', 'siteVisit': 'Site Visit',
+    'keyContact': 'Key Contact', 'nextAction': 'Next Action', 'actionOwner': 'Action Owner',
+    'deadline': 'Deadline', 'lastUpdate': 'Last Update', 'daysSinceUpdate': 'Days Since Update',
+    'notes': 'Notes', 'dealNumber': '#',
+}
+
+SHEET_ACTION_COLUMNS = {
+    'priority': 'Priority', 'action': 'Action Item', 'facility': 'Facility', 'owner': 'Owner',
+    'deadline': 'Deadline', 'status': 'Status', 'notes': 'Notes', 'pipelineStatus': 'Pipeline Status',
+}
+
+
+def _csv_from_header(text, *markers):
+    """DictReader starting at the first line containing every marker, or None."""
+    lines = text.strip().split('\n')
+    for i, line in enumerate(lines):
+        if all(m in line for m in markers):
+            return csv.DictReader(io.StringIO('\n'.join(lines[i:])))
+    return None
+
+
+def sheet_pipeline(text):
+    """Pipeline deals from the Pipeline tab's CSV; raises ValueError without a header row."""
+    reader = _csv_from_header(text, 'Facility Name')
+    if reader is None:
+        raise ValueError("pipeline tab has no 'Facility Name' header row")
+    deals = []
+    for row in reader:
+        deal = {field: _cell(row, column) for field, column in SHEET_PIPELINE_COLUMNS.items()}
+        if deal['name']:
+            deals.append(deal)
+    return deals
+
+
+def sheet_actions(text):
+    """Action items from the Action Tracker tab's CSV (empty if the header row is missing)."""
+    reader = _csv_from_header(text, 'Action Item', 'Priority')
+    if reader is None:
+        return []
+    actions = []
+    for row in reader:
+        action = {field: _cell(row, column) for field, column in SHEET_ACTION_COLUMNS.items()}
+        if action['action']:
+            actions.append(action)
+    return actions
+
+
+# Rows searched for a workbook sheet's header row
+HEADER_SCAN_ROWS = 10
+
+
+def _sheet_records(ws, columns, *markers):
+    """Iterator of {field: cell value} for the rows below a read-only sheet's header row, or None.
+
+    The header row is the first of the top HEADER_SCAN_ROWS rows with a cell
+    equal to every marker; `columns` maps fields to header labels, and a
+    label the header lacks reads as None. Rows stream from iter_rows, so
+    only one row tuple is held at a time.
+    """
+    rows = ws.iter_rows(values_only=True)
+    for _, header in zip(range(HEADER_SCAN_ROWS), rows):
+        labels = [str(v).strip() if v is not None else '' for v in header]
+        if all(m in labels for m in markers):
+            index = [(field, labels.index(label) if label in labels else None)
+                     for field, label in columns.items()]
+            return ({field: row[i] if i is not None and i < len(row) else None for field, i in index}
+                    for row in rows)
+    return None
+
+
+def _text(value):
+    return str(value or '').strip()
+
+
+def workbook_pipeline(path):
+    """(deals, actions) from the pipeline workbook's Pipeline Dashboard and Action Tracker sheets.
+
+    The workbook is opened read-only and each sheet streamed as value tuples,
+    with columns located by the same header labels as the Google Sheet tabs;
+    raises ValueError if the Pipeline Dashboard has no 'Facility Name' header row.
+    """
+    import openpyxl
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        records = _sheet_records(wb['Pipeline Dashboard'], SHEET_PIPELINE_COLUMNS, 'Facility Name')
+        if records is None:
+            raise ValueError("Pipeline Dashboard sheet has no 'Facility Name' header row")
+        deals = []
+        for record in records:
+            days_since = record['daysSinceUpdate']
+            deal = {field: _text(value) for field, value in record.items()}
+            if deal['name']:
+                deal['daysSinceUpdate'] = int(days_since) if days_since else None
+                deals.append(deal)
+
+        records = _sheet_records(wb['Action Tracker'], SHEET_ACTION_COLUMNS, 'Action Item', 'Priority')
+        actions = [{field: _text(value) for field, value in record.items()}
+                   for record in records or () if record['priority']]
+    finally:
+        # Read-only workbooks keep the file open until closed
+        wb.close()
+    return deals, actions
+
+
+# ============================================================
+# DATASET — merge, aggregate, match, geocode
+# ============================================================
+def batch_geocode_census(addresses):
+    """
+    Batch geocode [(id, address)] via the Census Bureau API, several batches in flight.
+    Returns (results, failed): id -> (lat, lng) for matches, and ids that got no answer.
+    """
+    return census_geocode(addresses, CENSUS_GEOCODER_URL, CENSUS_BATCH_SIZE, CENSUS_IN_FLIGHT)
+
+
+class Dataset:
+    """Normalized records from any mix of adapters, and the output built from them."""
+
+    def __init__(self):
+        self.companies = {}            # id -> company record, in first-seen order
+        self._ranks = {}               # id -> field -> priority of the source that set it
+        self.aggregates = {}           # id -> OutreachAggregate
+        self.mediums = Vocabulary('')
+        self.accounts = Vocabulary('')
+        self.contacts = Vocabulary()   # contact ids, for the aggregates' contact sets
+        self.messages = MessageTable(self.mediums, self.accounts)
+        self.pipeline = []
+        self.actions = []
+        self.pipeline_by_id = {}
+        self.pipeline_matches = None
+        self.coords_by_address = {}
+        self.geocoded = 0
+
+    def add_company(self, cid, company, priority=0):
+        """Merge a company record under id cid.
+
+        Non-empty fields from a higher-priority source replace what is there;
+        at equal priority the first source wins. The name is kept from the
+        first record so the row order and label stay stable.
+        """
+        current = self.companies.get(cid)
+        if current is None:
+            self.companies[cid] = dict(company)
+            self._ranks[cid] = {field: priority for field, value in company.items() if value}
+            return
+        ranks = self._ranks[cid]
+        for field, value in company.items():
+            if not value or field in ('name', 'key'):
+                continue
+            if field not in ranks or priority > ranks[field]:
+                current[field] = value
+                ranks[field] = priority
+
+    def add_aggregate(self, cid, totals):
+        """Use precomputed per-company totals (rollup exports) instead of message rows.
+
+        totals: msgsSent, respondedCount, flags, firstDay, lastDay and
+        contacts (names), as yielded by rollup_companies.
+        """
+        agg = self.aggregates[cid] = OutreachAggregate()
+        agg.msgs_sent = totals['msgsSent']
+        agg.responded_count = totals['respondedCount']
+        agg.flags = totals['flags']
+        agg.first_day = totals['firstDay']
+        agg.last_day = totals['lastDay']
+        agg.contacts.extend(sorted({self.contacts[c] for c in totals['contacts']}))
+
+    def add_message(self, msg, company_ids):
+        """Count a message toward each known company in company_ids and add it to the message table."""
+        ids = tuple(cid for cid in dict.fromkeys(company_ids) if cid in self.companies)
+        day = msg['day']
+        medium = self.mediums[msg['medium']]
+        account = self.accounts[msg['account']]
+        if ids:
+            contacts = [self.contacts[c] for c in msg['contactIds']]
+            for cid in ids:
+                agg = self.aggregates.get(cid)
+                if agg is None:
+                    agg = self.aggregates[cid] = OutreachAggregate()
+                agg.add(msg['flags'], day, msg['meetingDay'], medium, account, contacts,
+                        len(self.mediums), len(self.accounts))
+        self.messages.append(day, medium, account, msg['contact'],
+                             self.messages.company_code(ids, self._names))
+
+    def _names(self, ids):
+        return [self.companies[cid]['name'] for cid in ids]
+
+    def match_pipeline(self, aliases=PIPELINE_ALIASES, memo=None):
+        """Attach each pipeline deal to a company; returns the match count.
+
+        An alias entry overrides everything else; then the exact normalized
+        name; then the fuzzy name index, accepted only above its confidence
+        threshold. self.pipeline_matches records how each deal was matched and
+        the near misses that fell short, for the run summary. With a memo
+        (sheet_cache.SheetCache) the matching is reused from the last run while
+        the deal names, companies and aliases are all unchanged.
+        """
+        if memo is None:
+            cids, report = self._match_deals(aliases)
+        else:
+            cids, report = memo.memo('pipeline matches', self._match_key(aliases),
+                                     lambda: self._match_deals(aliases))
+        self.pipeline_by_id = {}
+        for deal, cid in zip(self.pipeline, cids):
+            if cid:
+                if self.companies[cid]['airtableId']:
+                    deal['airtableId'] = self.companies[cid]['airtableId']
+                self.pipeline_by_id[cid] = deal
+        self.pipeline_matches = report
+        for kind, value in report.items():
+            recorder.count(kind, value if isinstance(value, int) else len(value))
+        return report['exact'] + report['alias'] + len(report['fuzzy'])
+
+    def _match_key(self, aliases):
+        """Digest of everything _match_deals depends on."""
+        return content_digest({
+            'deals': [deal['name'] for deal in self.pipeline],
+            'companies': [[cid, comp['key'], comp['name']] for cid, comp in self.companies.items()],
+            'aliases': aliases,
+        })
+
+    def _match_deals(self, aliases):
+        """([company id or None per deal], match report)."""
+        key_to_id = {comp['key']: cid for cid, comp in self.companies.items()}
+        index = None
+        report = {'exact': 0, 'alias': 0, 'fuzzy': [], 'nearMisses': [], 'unmatched': []}
+        cids = []
+        for deal in self.pipeline:
+            norm_name = normalize_name(deal['name'])
+            cid = key_to_id.get(aliases[norm_name]) if norm_name in aliases else None
+            if cid:
+                report['alias'] += 1
+            else:
+                cid = key_to_id.get(norm_name)
+                if cid:
+                    report['exact'] += 1
+            if not cid:
+                if index is None:
+                    index = NameIndex({cid: comp['name'] for cid, comp in self.companies.items()})
+                cid, score, candidates = index.match(deal['name'])
+                if cid:
+                    report['fuzzy'].append((deal['name'], self.companies[cid]['name'], score))
+                elif candidates and score >= NEAR_MISS_THRESHOLD:
+                    report['nearMisses'].append((deal['name'], self.companies[candidates[0][1]]['name'], score))
+                else:
+                    report['unmatched'].append(deal['name'])
+            cids.append(cid)
+        return cids, report
+
+    def geocode(self, cache_db, legacy_json=None, negative_ttl_days=DEFAULT_NEGATIVE_TTL_DAYS, lookup=True):
+        """Look up every company address in the geocode cache, batch-geocoding the rest.
+
+        With lookup=False nothing is sent to the geocoder; uncached addresses
+        get the ZIP/state centroid fallback in company_rows.
+        """
+        geocode_cache = GeocodeCache(cache_db, negative_ttl_days)
+        if legacy_json:
+            imported = geocode_cache.migrate_json(
+                legacy_json, {c['key']: c['address'] for c in self.companies.values() if c['address']})
+            if imported:
+                print(f"  Imported {imported} entries from {os.path.basename(legacy_json)}")
+        print(f"  Geocode cache: {geocode_cache.counts()}")
+
+        addresses_to_geocode = []
+        with recorder.span('cache lookup'):
+            for comp in self.companies.values():
+                address = comp['address']
+                if not address or address in self.coords_by_address:
+                    continue
+                found, coords = geocode_cache.lookup(address)
+                self.coords_by_address[address] = coords
+                if not found:
+                    addresses_to_geocode.append(address)
+            recorder.count('addresses', len(self.coords_by_address))
+            recorder.count('misses', len(addresses_to_geocode))
+
+        if addresses_to_geocode and not lookup:
+            print(f"  {len(addresses_to_geocode)} uncached addresses left to centroids (no geocoder lookups)")
+        elif addresses_to_geocode:
+            print(f"  Geocoding {len(addresses_to_geocode)} new addresses...")
+            with recorder.span('census'):
+                geo_results, failed = batch_geocode_census(
+                    [(str(i), a) for i, a in enumerate(addresses_to_geocode)])
+                # Misses are cached too and retried once the negative TTL has passed
+                new_coords = {a: geo_results.get(str(i)) for i, a in enumerate(addresses_to_geocode)
+                              if str(i) not in failed}
+                geocode_cache.put_many(new_coords)
+                self.coords_by_address.update(new_coords)
+                recorder.count('matched', len(geo_results))
+                recorder.count('failed', len(failed))
+            print(f"  Geocoded {len(geo_results)} new addresses")
+        else:
+            print("  All addresses already cached")
+        geocode_cache.close()
+
+    def company_rows(self):
+        """One data.json row per company: record + message aggregate + pipeline deal + coordinates."""
+        rows = []
+        self.geocoded = 0
+        for cid, comp in self.companies.items():
+            agg = self.aggregates.get(cid, _NO_MESSAGES)
+            cached = self.coords_by_address.get(comp['address'])
+            if cached:
+                lat, lng = cached
+                self.geocoded += 1
+            else:
+                lat, lng = get_coords(comp['address'], comp['state'], comp['name'])
+            pipe = self.pipeline_by_id.get(cid) or {}
+
+            rows.append({
+                'airtableId': comp['airtableId'],
+                'name': comp['name'],
+                'address': comp['address'],
+                'state': comp['state'],
+                'fullState': comp['fullState'],
+                'ownership': comp['ownership'],
+                'override': comp['override'],
+                'website': comp['website'],
+                'allStates': comp['allStates'],
+                'stateTier': comp['stateTier'],
+                'bradfordFacility': comp['bradfordFacility'],
+                'msgsSent': agg.msgs_sent,
+                'byMedium': _counts(agg.by_medium, self.mediums),
+                'byAccount': _counts(agg.by_account, self.accounts),
+                'responded': bool(agg.flags & RESPONDED),
+                'respondedCount': agg.responded_count,
+                'scheduledIntro': bool(agg.flags & SCHEDULED),
+                'assistedMeeting': bool(agg.flags & ASSISTED),
+                'notInterested': bool(agg.flags & NOT_INTERESTED),
+                'followUpLater': bool(agg.flags & FOLLOW_UP),
+                'contactCount': len(agg.contacts),
+                'contacts': sorted(self.contacts.values[code] for code in agg.contacts),
+                'firstMsg': iso_date(agg.first_day),
+                'lastMsg': iso_date(agg.last_day),
+                'firstDay': agg.first_day,
+                'lastDay': agg.last_day,
+                'meetingDate': iso_date(agg.meeting_day),
+                'opened': bool(agg.flags & OPENED),
+                'viewedProfile': bool(agg.flags & VIEWED_PROFILE),
+                'inPipeline': bool(pipe),
+                'pipelineStatus': pipe.get('status', ''),
+                'pipelinePriority': pipe.get('priority', ''),
+                'pipelineType': pipe.get('type', ''),
+                'pipelineEbitda': pipe.get('ebitda', ''),
+                'pipelineAskingPrice': pipe.get('askingPrice', ''),
+                'pipelineNda': pipe.get('ndaStatus', ''),
+                'pipelineDataRoom': pipe.get('dataRoom', ''),
+                'pipelineSiteVisit': pipe.get('siteVisit', ''),
+                'pipelineKeyContact': pipe.get('keyContact', ''),
+                'pipelineNextAction': pipe.get('nextAction', ''),
+                'pipelineActionOwner': pipe.get('actionOwner', ''),
+                'pipelineDeadline': pipe.get('deadline', ''),
+                'pipelineLastUpdate': pipe.get('lastUpdate', ''),
+                'pipelineDaysSince': pipe.get('daysSinceUpdate', ''),
+                'pipelineNotes': pipe.get('notes', ''),
+                'lat': lat,
+                'lng': lng,
+            })
+        return rows
+
+    def assets(self):
+        """Side files for write_output, built from the rows of the last build_output."""
+        return {SEARCH_INDEX_FILE: lambda: build_search_index(self.rows)}
+
+    def build_output(self, columnar=False):
+        """The data.json document; also keeps the plain company rows on self.rows.
+
+        columnar writes companies and messages in export.py's columnar layout.
+        """
+        with recorder.span('companies'):
+            self.rows = self.company_rows()
+            companies = encode_columnar(self.rows) if columnar else self.rows
+        with recorder.span('messages'):
+            messages = self.messages.archive() if columnar else self.messages.rows()
+            meta = self.messages.meta()
+        with recorder.span('clusters'):
+            clusters = build_clusters(self.rows)
+        with recorder.span('facets'):
+            facets = build_facets(self.rows)
+        return {
+            'companies': companies,
+            'pipeline': self.pipeline,
+            'actions': self.actions,
+            'messages': messages,
+            'meta': meta,
+            'clusters': clusters,
+            'facets': facets,
+        }
+
+
+# ============================================================
+# OUTPUT
+# ============================================================
+def write_output(output, out_dir, digest_path=None, force=False, assets=None):
+    """Write data.json and its shards to out_dir unless the content digest is unchanged.
+
+    assets maps side-file names to functions building their content (see
+    Dataset.assets); they are built and written along with data.json, or
+    on their own when missing. Returns {changed, digest, dataJson, shards,
+    changedShards, assets}.
+    """
+    out_path = os.path.join(out_dir, 'data.json')
+    digest_path = digest_path or out_path + '.sha256'
+    digest = content_digest(output)
+    result = {'changed': False, 'digest': digest, 'dataJson': None, 'shards': None, 'changedShards': [],
+              'assets': {}}
+    if force or not os.path.exists(out_path) or digest != read_digest(digest_path):
+        os.makedirs(out_dir, exist_ok=True)
+        result['changed'] = True
+        with recorder.span('data.json'):
+            result['dataJson'] = write_json(output, out_path)
+            recorder.count('bytes', result['dataJson']['bytes'])
+        with recorder.span('shards'):
+            _, result['changedShards'], result['shards'] = write_sharded(output, out_dir)
+            recorder.count('bytes', result['shards']['bytes'])
+        write_digest(digest_path, digest)
+    for name, build in (assets or {}).items():
+        path = os.path.join(out_dir, name)
+        if result['changed'] or not os.path.exists(path):
+            with recorder.span(name):
+                result['assets'][name] = write_json(build(), path)
+                recorder.count('bytes', result['assets'][name]['bytes'])
+    return result
+
+
+def print_summary(dataset, output, result):
+    c = dataset.rows
+    print("\n=== OUTPUT ===")
+    print(f"Total companies: {len(c)}")
+    print(f"With coordinates: {sum(1 for x in c if x['lat'])}")
+    print(f"Geocoded (precise): {dataset.geocoded}")
+    print(f"With allStates: {sum(1 for x in c if x['allStates'])}")
+    print(f"With messages: {sum(1 for x in c if x['msgsSent'] > 0)}")
+    print(f"Total messages: {output['meta']['totalMessages']}")
+    print(f"Responded: {sum(1 for x in c if x['responded'])}")
+    print(f"Scheduled intro: {sum(1 for x in c if x['scheduledIntro'])}")
+    print(f"Assisted meeting: {sum(1 for x in c if x['assistedMeeting'])}")
+    print(f"Not interested: {sum(1 for x in c if x['notInterested'])}")
+    print(f"In pipeline: {sum(1 for x in c if x['inPipeline'])}")
+    print(f"Pipeline deals: {len(dataset.pipeline)}")
+    matches = dataset.pipeline_matches
+    if matches:
+        print(f"Pipeline matches: {matches['exact']} exact, {matches['alias']} alias, "
+              f"{len(matches['fuzzy'])} fuzzy, {len(matches['nearMisses'])} near misses, "
+              f"{len(matches['unmatched'])} unmatched")
+        for deal, company, score in matches['fuzzy']:
+            print(f"  fuzzy:     {deal!r} -> {company!r} ({score:.2f})")
+        for deal, company, score in matches['nearMisses']:
+            print(f"  near miss: {deal!r} ~ {company!r} ({score:.2f}), not matched")
+    print(f"Mediums: {output['meta']['mediumCounts']}")
+    print(f"Accounts: {output['meta']['accountCounts']}")
+    if result['changed']:
+        print(f"Serialized: {format_write_stats('data.json', result['dataJson'])}; "
+              f"{format_write_stats('shards', result['shards'])}")
+        print(f"Shards changed: {', '.join(result['changedShards']) or 'none'}")
+    else:
+        print(f"Output unchanged (sha256 {result['digest'][:12]}), skipped writing")
+    for name, stats in result['assets'].items():
+        print(f"Serialized: {format_write_stats(name, stats)}")
@@ -0,0 +1,180 @@
+"""
+Build instrumentation: nested timing spans, counters and optional profiling.
+
+Usage:
+    from instrument import recorder
+    recorder.reset(profile=args.profile)
+    with recorder.span('fetch'):
+        with recorder.span('companies'):
+            ...
+            recorder.count('records', len(records))
+    recorder.write(os.path.join(OUTPUT_DIR, BUILD_STATS_FILE), script='fetch_airtable')
+
+Each span records its wall time, the counters added while it was the
+innermost open span, the HTTP requests and bytes the shared client made
+meanwhile, and its child spans. With profile=True every top-level span
+(a build stage) also runs under cProfile, keeping its slowest functions,
+and reports the traced memory at its start and its tracemalloc peak; the
+raw profiles are dumped next to the stats file for pstats / snakeviz.
+cProfile only sees the thread that opened the span, so stages that fan out
+to worker threads are under-reported; tracemalloc counts every thread.
+
+Each thread has its own stack of open spans. Spans and counters from a
+worker thread (e.g. a fetch_sources pool worker) attach to the build root
+rather than to whatever span the main thread has open, and only spans the
+main thread opens are profiled. Span and counter updates take a lock.
+
+write() produces build_stats.json, the machine-readable companion of the
+printed run summary, so runs can be compared over time.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from http_client import client
+
+BUILD_STATS_FILE = 'build_stats.json'
+BUILD_STATS_VERSION = 1
+PROFILE_DIR = 'build_profile'
+# Functions kept per stage profile, by cumulative time
+PROFILE_TOP = 25
+
+
+def _http_counters():
+    stats = client.stats()
+    return {'requests': stats['requests'], 'bytesIn': stats['bytesIn'], 'bytesOut': stats['bytesOut']}
+
+
+def peak_rss_mb():
+    # ru_maxrss is KB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def _top_functions(profiler, limit=PROFILE_TOP):
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, func), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            'function': f'{os.path.basename(filename)}:{line}({func})',
+            'calls': calls,
+            'tottime': round(tottime, 4),
+            'cumtime': round(cumtime, 4),
+        })
+    rows.sort(key=lambda r: r['cumtime'], reverse=True)
+    return rows[:limit]
+
+
+class Recorder:
+    """Collects spans and counters for one build run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, profile=False):
+        """Start a new run, discarding what was recorded before."""
+        self.profile = profile
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.root = {'name': 'build', 'counters': {}, 'children': []}
+        self._local = threading.local()
+        self._profiles = {}
+        if profile and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @property
+    def _stack(self):
+        """This thread's open spans, outermost (the build root) first."""
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = [self.root]
+        return stack
+
+    @contextmanager
+    def span(self, name):
+        """Time the enclosed block as a child of this thread's innermost open span."""
+        node = {'name': name, 'seconds': 0.0, 'counters': {}, 'children': []}
+        stack = self._stack
+        with self._lock:
+            stack[-1]['children'].append(node)
+        stack.append(node)
+        profiler = None
+        if self.profile and len(stack) == 2 and threading.current_thread() is threading.main_thread():
+            tracemalloc.reset_peak()
+            node['tracemallocStartMB'] = round(tracemalloc.get_traced_memory()[0] / 1e6, 2)
+            profiler = cProfile.Profile()
+            profiler.enable()
+        http = _http_counters()
+        start = time.perf_counter()
+        try:
+            yield node
+        finally:
+            node['seconds'] = round(time.perf_counter() - start, 4)
+            after = _http_counters()
+            if after['requests'] > http['requests']:
+                node['http'] = {k: after[k] - http[k] for k in after}
+            if profiler is not None:
+                profiler.disable()
+                node['tracemallocPeakMB'] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+                node['profile'] = _top_functions(profiler)
+                self._profiles[name] = profiler
+            stack.pop()
+
+    def count(self, name, n=1):
+        """Add n to a counter on this thread's innermost open span."""
+        counters = self._stack[-1]['counters']
+        with self._lock:
+            counters[name] = counters.get(name, 0) + n
+
+    def stage_seconds(self):
+        """{stage: seconds} for the top-level spans."""
+        return {s['name']: s['seconds'] for s in self.root['children']}
+
+    def summary(self):
+        """One line of top-level stage times for the run output."""
+        return ', '.join(f"{name} {seconds:.2f}s" for name, seconds in self.stage_seconds().items())
+
+    def stats(self, **extra):
+        """The build_stats.json document; extra keys are added at the top level."""
+        return {
+            'version': BUILD_STATS_VERSION,
+            'startedAt': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.started_at)),
+            'commit': os.environ.get('GITHUB_SHA', ''),
+            'totalSeconds': round(time.perf_counter() - self._start, 4),
+            'stages': self.stage_seconds(),
+            'spans': self.root['children'],
+            'counters': self.root['counters'],
+            'http': client.stats(),
+            'peakRssMB': round(peak_rss_mb(), 1),
+            'profiled': self.profile,
+            **extra,
+        }
+
+    def write(self, path, **extra):
+        """Write build_stats.json (and the stage profiles when profiling); returns the stats."""
+        stats = self.stats(**extra)
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(stats, f, indent=1)
+        os.replace(tmp, path)
+        if self._profiles:
+            profile_dir = os.path.join(os.path.dirname(path), PROFILE_DIR)
+            os.makedirs(profile_dir, exist_ok=True)
+            for name, profiler in self._profiles.items():
+                profiler.dump_stats(os.path.join(profile_dir, re.sub(r'[^\w.-]+', '_', name) + '.prof'))
+        return stats
+
+
+# Shared by the build scripts and ingest.py, like http_client.client
+recorder = Recorder()
@@ -0,0 +1,236 @@
+"""
+Fuzzy company-name matching for pipeline deals.
+
+NameIndex keeps two inverted indexes over the company names: word tokens
+and character trigrams, each mapping to the ids that contain them. A query
+walks the postings of its own tokens and trigrams, rarest first, and stops
+once it has candidates and the remaining features are too common to
+discriminate, so a lookup touches a few short posting lists rather than
+every company. The best-overlapping candidates are then scored exactly,
+as a blend of:
+
+    trigram Dice            spelling, spacing and punctuation differences
+    token Dice (IDF)        shared words, with generic ones ("recovery",
+                            "center") counting for little
+    containment (IDF)       one name is the other plus extra words
+                            ("cardinal" / "cardinal recovery")
+
+Scores fall in [0, 1]; matches need MATCH_THRESHOLD and a clear lead over
+the runner-up. A name that straddles two companies is not matched at all:
+when a second candidate also clears the threshold, or when one candidate's
+words are a subset of another's ("southeast detox" / "southeast detox
+center"), the best candidate is only reported as a near miss. The one
+exception is a candidate whose words are exactly the query's.
+
+A high score can also be built entirely from the industry's stock words:
+"New Life Recovery" scores 0.72 against "New Life For Women". So an
+accepted match must also share at least one word outside GENERIC_TOKENS
+with the query, unless their words are identical.
+
+Run as a script to replay every PIPELINE_ALIASES entry through the
+matcher without the override, against the companies in a data.json:
+
+    python name_match.py [data.json]
+
+It exits non-zero if any alias fuzzy-matches a company other than its
+target; resolving to no match is fine, since the alias still applies.
+"""
+
+import json
+import math
+import re
+import sys
+from collections import defaultdict
+
+# Scores at or above this are accepted as a match
+MATCH_THRESHOLD = 0.72
+# Best candidates scoring at least this (but below the threshold) are reported as near misses
+NEAR_MISS_THRESHOLD = 0.45
+# A match whose runner-up scores within this margin is ambiguous and not accepted
+AMBIGUITY_MARGIN = 0.04
+# Score blend: trigram Dice, IDF-weighted token Dice, and IDF-weighted containment
+GRAM_WEIGHT = 0.3
+TOKEN_WEIGHT = 0.3
+CONTAINMENT_WEIGHT = 0.4
+# Candidates (by posting overlap) that get an exact score
+CANDIDATE_LIMIT = 25
+
+_ABBREVIATIONS = {
+    'ctr': 'center', 'ctrs': 'centers', 'mh': 'mental health', 'bh': 'behavioral health',
+    'tx': 'treatment', 'rehab': 'rehabilitation', 'st': 'saint',
+}
+_STOPWORDS = {'the', 'and', 'of', 'at', 'for', 'llc', 'inc'}
+# Words (as tokens() leaves them) common across rehab company names; shared
+# generic words alone never make a match
+GENERIC_TOKENS = {
+    'new', 'life', 'recovery', 'treatment', 'center', 'detox', 'addiction', 'behavioral',
+    'health', 'mental', 'rehabilitation', 'wellness', 'care', 'healthcare', 'healing',
+    'hope', 'house', 'home', 'service', 'group', 'institute', 'hospital', 'clinic',
+    'program', 'residential', 'outpatient', 'sober', 'sobriety', 'living', 'solution',
+    'place', 'ranch', 'retreat', 'family', 'women', 'men', 'first', 'way', 'path',
+    'journey', 'freedom', 'serenity', 'harmony', 'spring', 'river', 'system', 'network',
+}
+
+
+def _stem(word):
+    return word[:-1] if len(word) > 3 and word.endswith('s') and not word.endswith('ss') else word
+
+
+def tokens(name):
+    """Word tokens: lowercased, punctuation and stopwords dropped, abbreviations spelled out, plurals folded."""
+    words = re.sub(r'[^0-9a-z]+', ' ', name.lower()).split()
+    words = ' '.join(_ABBREVIATIONS.get(w, w) for w in words).split()
+    return [_stem(w) for w in words if w not in _STOPWORDS]
+
+
+def trigrams(text):
+    padded = f' {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    """Token + trigram inverted index over {id: name}."""
+
+    def __init__(self, names):
+        self.ids = []
+        self._tokens = []
+        self._grams = []
+        self.token_postings = defaultdict(list)
+        self.gram_postings = defaultdict(list)
+        for cid, name in names.items():
+            toks = tokens(name)
+            grams = trigrams(' '.join(toks))
+            i = len(self.ids)
+            self.ids.append(cid)
+            self._tokens.append(set(toks))
+            self._grams.append(grams)
+            for t in set(toks):
+                self.token_postings[t].append(i)
+            for g in grams:
+                self.gram_postings[g].append(i)
+        n = len(self.ids)
+        self._idf = {t: math.log((n + 1) / (len(p) + 0.5)) for t, p in self.token_postings.items()}
+        self._unknown_idf = math.log((n + 1) / 0.5)
+        # Postings longer than this are only walked when rarer ones found nothing
+        self._common = max(50, n // 20)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _weight(self, toks):
+        return sum(self._idf.get(t, self._unknown_idf) for t in toks)
+
+    def score(self, query_tokens, query_grams, i):
+        """Similarity of a tokenized query to entry i, in [0, 1]."""
+        grams = self._grams[i]
+        gram_dice = 2 * len(query_grams & grams) / (len(query_grams) + len(grams)) if grams else 0.0
+        toks = self._tokens[i]
+        total = self._weight(query_tokens) + self._weight(toks)
+        shared = self._weight(query_tokens & toks)
+        token_dice = 2 * shared / total if total else 0.0
+        smaller = min(self._weight(query_tokens), self._weight(toks))
+        containment = shared / smaller if smaller else 0.0
+        return GRAM_WEIGHT * gram_dice + TOKEN_WEIGHT * token_dice + CONTAINMENT_WEIGHT * containment
+
+    def _ranked(self, name, limit):
+        """(query tokens, [(score, entry index)]) for the entries most similar to name."""
+        toks = tokens(name)
+        query_tokens = set(toks)
+        query_grams = trigrams(' '.join(toks))
+        # A shared token counts as much as two shared trigrams
+        features = [(self.token_postings.get(t, ()), 2) for t in query_tokens]
+        features += [(self.gram_postings.get(g, ()), 1) for g in query_grams]
+        features.sort(key=lambda f: len(f[0]))
+        overlap = defaultdict(int)
+        for posting, weight in features:
+            if len(posting) > self._common and overlap:
+                break
+            for i in posting:
+                overlap[i] += weight
+        shortlist = sorted(overlap, key=overlap.get, reverse=True)[:CANDIDATE_LIMIT]
+        scored = sorted(((self.score(query_tokens, query_grams, i), i) for i in shortlist), reverse=True)
+        return query_tokens, [(round(s, 3), i) for s, i in scored[:limit]]
+
+    def candidates(self, name, limit=5):
+        """Ranked [(score, id)] for the entries most similar to name."""
+        return [(s, self.ids[i]) for s, i in self._ranked(name, limit)[1]]
+
+    def _ambiguous(self, query_tokens, ranked, threshold):
+        """True when the best candidate can't be told apart from another plausible one."""
+        best_score, best = ranked[0]
+        best_tokens = self._tokens[best]
+        if best_tokens == query_tokens:
+            return False
+        for score, i in ranked[1:]:
+            if score >= threshold:
+                return True
+            other = self._tokens[i]
+            if score >= NEAR_MISS_THRESHOLD and (best_tokens <= other or other <= best_tokens):
+                return True
+        return False
+
+    def _distinctive(self, query_tokens, i):
+        """True when entry i shares a non-generic word with the query, or has exactly its words."""
+        toks = self._tokens[i]
+        return toks == query_tokens or bool((toks & query_tokens) - GENERIC_TOKENS)
+
+    def match(self, name, threshold=MATCH_THRESHOLD, margin=AMBIGUITY_MARGIN):
+        """(id, score, candidates): id is None unless the best candidate clears the
+        threshold, beats the runner-up by more than the ambiguity margin, shares
+        a non-generic word with the name, and is not ambiguous with another
+        plausible candidate (see the module docstring)."""
+        query_tokens, ranked = self._ranked(name, 5)
+        found = [(s, self.ids[i]) for s, i in ranked]
+        if not found:
+            return None, 0.0, found
+        best_score, best_id = found[0]
+        runner_up = found[1][0] if len(found) > 1 else 0.0
+        if (best_score >= threshold and best_score - runner_up > margin
+                and self._distinctive(query_tokens, ranked[0][1])
+                and not self._ambiguous(query_tokens, ranked, threshold)):
+            return best_id, best_score, found
+        return None, best_score, found
+
+
+# ============================================================
+# ALIAS REPLAY CHECK
+# ============================================================
+def replay_aliases(names, aliases, normalize):
+    """[(alias, target name, matched name or None, score, ok)] for every alias with a known target.
+
+    names is {id: company name}; aliases maps normalized deal names to
+    normalized company names, as PIPELINE_ALIASES does. Each alias is
+    matched through a NameIndex of names, with no override applied; ok is
+    False when it lands on a company other than its target.
+    """
+    index = NameIndex(names)
+    by_key = {normalize(name): cid for cid, name in names.items()}
+    results = []
+    for alias, target_key in aliases.items():
+        target = by_key.get(target_key)
+        if target is None:
+            continue
+        cid, score, _ = index.match(alias)
+        results.append((alias, names[target], names[cid] if cid else None, score, cid is None or cid == target))
+    return results
+
+
+def load_company_names(path):
+    """{index: company name} from a data.json, row-wise or columnar (--columnar, as CI builds)."""
+    from export import COLUMNAR_FORMAT, decode_columnar
+    with open(path) as f:
+        companies = json.load(f)['companies']
+    if isinstance(companies, dict) and companies.get('format') == COLUMNAR_FORMAT:
+        companies = decode_columnar(companies)
+    return {i: c['name'] for i, c in enumerate(companies)}
+
+
+if __name__ == '__main__':
+    from ingest import PIPELINE_ALIASES, normalize_name
+    names = load_company_names(sys.argv[1] if len(sys.argv) > 1 else 'data.json')
+    wrong = 0
+    for alias, target, matched, score, ok in replay_aliases(names, PIPELINE_ALIASES, normalize_name):
+        wrong += not ok
+        outcome = 'no match' if matched is None else f'{matched!r} ({score:.3f})'
+        print(f"{'ok   ' if ok else 'WRONG'} {alias!r} -> {outcome}; alias target {target!r}")
+    sys.exit(1 if wrong else 0)
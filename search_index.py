@@ -0,0 +1,76 @@
+"""
+Trigram search index for the dashboard's company search.
+
+The dashboard matches a query as a substring of a company's name, address,
+fullState or allStates (lowercased). This index maps every trigram of those
+fields to the sorted indices of the companies containing it, so a query of
+three or more characters only has to check the companies in the
+intersection of its trigrams' postings; index.html verifies each candidate
+against the actual text, so postings only need to be a superset of the
+matches. Shorter queries narrow the previous query's matches instead.
+
+Postings are delta-encoded as LEB128 varints and base64'd. The index is
+written to search_index.json next to data.json (Dataset.assets) rather than
+into it, so the dashboard can render before it arrives.
+"""
+
+import base64
+
+SEARCH_INDEX_FORMAT = 'trigram-v1'
+SEARCH_FIELDS = ('name', 'address', 'fullState', 'allStates')
+
+
+def search_trigrams(text):
+    """Trigrams of lowercased text; shorter text has none."""
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def encode_postings(ids):
+    """Base64 of ascending ids as varint gaps (the first id is its own gap)."""
+    buf = bytearray()
+    prev = 0
+    for i in ids:
+        gap = i - prev
+        prev = i
+        while gap >= 0x80:
+            buf.append(gap & 0x7F | 0x80)
+            gap >>= 7
+        buf.append(gap)
+    return base64.b64encode(bytes(buf)).decode('ascii')
+
+
+def decode_postings(encoded):
+    """Inverse of encode_postings (the dashboard does the same in decodePostings)."""
+    ids = []
+    prev = value = shift = 0
+    for b in base64.b64decode(encoded):
+        value |= (b & 0x7F) << shift
+        if b & 0x80:
+            shift += 7
+        else:
+            prev += value
+            ids.append(prev)
+            value = shift = 0
+    return ids
+
+
+def build_search_index(companies):
+    """The search_index.json document for a list of company rows."""
+    postings = {}
+    for i, c in enumerate(companies):
+        grams = set()
+        for field in SEARCH_FIELDS:
+            grams |= search_trigrams(c.get(field) or '')
+        for gram in grams:
+            posting = postings.get(gram)
+            if posting is None:
+                postings[gram] = [i]
+            else:
+                posting.append(i)
+    return {
+        'format': SEARCH_INDEX_FORMAT,
+        'length': len(companies),
+        'fields': list(SEARCH_FIELDS),
+        'grams': {gram: encode_postings(ids) for gram, ids in sorted(postings.items())},
+    }
@@ -0,0 +1,86 @@
+"""
+Conditional GET cache for the Google Sheet CSV exports, plus memoized parse results.
+
+fetch() remembers each export URL's ETag, Last-Modified, body and body
+sha256, and sends If-None-Match / If-Modified-Since on the next run; a 304
+returns the remembered body without downloading it again. The Sheets export
+often answers 200 regardless, so the body hash is what decides whether a
+tab changed.
+
+memo(kind, key, compute) keeps the last result of an expensive step (the
+tab's CSV parse, the pipeline -> company matching) under a key derived from
+its inputs, and hands back a copy of it while the key is unchanged instead
+of running compute again. Results must be JSON-serializable; they are
+stored as a JSON round trip, so tuples come back as lists.
+
+Everything lives in one JSON file, by default in the record store dir that
+CI caches between runs.
+"""
+
+import hashlib
+import json
+import os
+
+from http_client import client
+from instrument import recorder
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _copy(value):
+    return json.loads(json.dumps(value))
+
+
+class SheetCache:
+    """Validators, bodies and memoized results persisted between runs in one JSON file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.data = {'responses': {}, 'memo': {}}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self.data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"  Sheet cache unreadable ({e}); starting empty")
+
+    def fetch(self, url, timeout=30):
+        """GET url as text, conditionally when a previous response is cached."""
+        cached = self.data['responses'].get(url)
+        headers = {}
+        if cached and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached and cached.get('lastModified'):
+            headers['If-Modified-Since'] = cached['lastModified']
+        resp = client.get(url, headers=headers, timeout=timeout)
+        if resp.status == 304 and cached:
+            recorder.count('not modified')
+            return cached['text']
+        text = resp.text()
+        sha = content_hash(text)
+        recorder.count('unchanged' if cached and cached['sha256'] == sha else 'changed')
+        # Written from fetch_sources' worker threads; each URL has its own key
+        self.data['responses'][url] = {
+            'etag': resp.headers.get('ETag'), 'lastModified': resp.headers.get('Last-Modified'),
+            'sha256': sha, 'text': text,
+        }
+        return text
+
+    def memo(self, kind, key, compute):
+        """compute(), or a copy of its last result if it was computed for the same key."""
+        entry = self.data['memo'].get(kind)
+        if entry and entry['key'] == key:
+            recorder.count(f'{kind} reused')
+            return _copy(entry['value'])
+        value = compute()
+        self.data['memo'][kind] = {'key': key, 'value': _copy(value)}
+        return value
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.data, f, separators=(',', ':'))
+        os.replace(tmp, self.path)
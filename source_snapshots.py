@@ -0,0 +1,122 @@
+"""
+Timestamped, gzip-compressed snapshots of the raw source responses.
+
+Every source fetch_airtable.py pulls (the Airtable tables as record lists,
+the Google Sheet tabs as CSV text) is written to
+
+    SNAPSHOT_DIR/<source>/<YYYYmmddTHHMMSSZ>.json.gz   (record lists)
+    SNAPSHOT_DIR/<source>/<YYYYmmddTHHMMSSZ>.csv.gz    (CSV text)
+
+once it has been fetched completely; a snapshot is written to a temp file
+and renamed into place, so a failed or interrupted fetch never leaves a
+truncated one behind. The newest `keep` snapshots per source are kept.
+
+The latest snapshot of a source is what a run falls back to when its live
+fetch fails, and what --offline rebuilds from without touching the network.
+Sources are independent: each falls back to its own newest good snapshot,
+which may come from a different run than its neighbours'.
+"""
+
+import gzip
+import json
+import os
+import re
+import time
+
+DEFAULT_SNAPSHOT_KEEP = 24
+STAMP_FORMAT = '%Y%m%dT%H%M%SZ'
+SUFFIXES = {'records': '.json.gz', 'text': '.csv.gz'}
+
+
+def _source_dir_name(source):
+    return re.sub(r'[^A-Za-z0-9]+', '_', source).strip('_').lower()
+
+
+def _open_gzip(path, mode):
+    # mtime=0 keeps identical responses byte-identical on disk
+    return gzip.GzipFile(path, mode, compresslevel=6, mtime=0)
+
+
+class SnapshotStore:
+    """Snapshot directory for one run; every snapshot it writes shares the run's timestamp."""
+
+    def __init__(self, root, keep=DEFAULT_SNAPSHOT_KEEP, taken_at=None):
+        self.root = root
+        self.keep = max(1, keep)
+        self.stamp = time.strftime(STAMP_FORMAT, time.gmtime(taken_at or time.time()))
+
+    def _dir(self, source):
+        return os.path.join(self.root, _source_dir_name(source))
+
+    def _path(self, source, kind):
+        return os.path.join(self._dir(source), self.stamp + SUFFIXES[kind])
+
+    def save(self, source, data):
+        """Snapshot a complete response (record list or CSV text); returns compressed bytes written."""
+        if isinstance(data, list):
+            path = self._path(source, 'records')
+            payload = json.dumps(data, separators=(',', ':')).encode('utf-8')
+        else:
+            path = self._path(source, 'text')
+            payload = data.encode('utf-8')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        with _open_gzip(tmp, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp, path)
+        self.prune(source)
+        return os.path.getsize(path)
+
+    def tee(self, source, pages):
+        """Yield record pages through unchanged, snapshotting them once the last page is through.
+
+        The records are streamed into the snapshot as they pass, so nothing is
+        held in memory; if iteration stops early or fails the partial file is
+        discarded.
+        """
+        path = self._path(source, 'records')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        first = True
+        f = _open_gzip(tmp, 'wb')
+        try:
+            f.write(b'[')
+            for page in pages:
+                for record in page:
+                    f.write((b'' if first else b',') + json.dumps(record, separators=(',', ':')).encode('utf-8'))
+                    first = False
+                yield page
+            f.write(b']')
+            f.close()
+            os.replace(tmp, path)
+        finally:
+            if not f.closed:
+                f.close()
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self.prune(source)
+
+    def snapshots(self, source):
+        """Snapshot paths for a source, oldest first."""
+        directory = self._dir(source)
+        if not os.path.isdir(directory):
+            return []
+        names = sorted(n for n in os.listdir(directory) if n.endswith(tuple(SUFFIXES.values())))
+        return [os.path.join(directory, n) for n in names]
+
+    def latest(self, source):
+        """(data, stamp) of the newest snapshot of a source, or (None, None) if it has none."""
+        paths = self.snapshots(source)
+        if not paths:
+            return None, None
+        path = paths[-1]
+        name = os.path.basename(path)
+        with _open_gzip(path, 'rb') as f:
+            payload = f.read()
+        if name.endswith(SUFFIXES['records']):
+            return json.loads(payload), name[:-len(SUFFIXES['records'])]
+        return payload.decode('utf-8'), name[:-len(SUFFIXES['text'])]
+
+    def prune(self, source):
+        for path in self.snapshots(source)[:-self.keep]:
+            os.remove(path)
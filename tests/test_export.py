@@ -0,0 +1,51 @@
+import json
+import os
+import random
+
+import pytest
+
+from export import COLUMNAR_FORMAT, decode_columnar, encode_columnar, pack_bits, unpack_bits
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize('length', [0, 1, 7, 8, 9, 16, 17, 1000])
+def test_bits_round_trip(length):
+    rng = random.Random(length)
+    flags = [rng.random() < 0.3 for _ in range(length)]
+    assert unpack_bits(pack_bits(flags), length) == flags
+
+
+def test_bits_are_lsb_first():
+    # bits 0 and 9 -> bytes 0x01 0x02
+    flags = [i in (0, 9) for i in range(10)]
+    assert pack_bits(flags) == 'AQI='
+
+
+def test_columnar_round_trip():
+    rows = [
+        {'name': f'Company {i}', 'state': 'FL' if i % 3 else 'GA', 'responded': i % 2 == 0,
+         'msgsSent': i, 'lastMsg': None if i % 4 else '2026-01-0%d' % (i % 9 + 1), 'allStates': ['FL']}
+        for i in range(40)
+    ]
+    table = encode_columnar(rows)
+    assert table['format'] == COLUMNAR_FORMAT
+    types = {field: col['type'] for field, col in table['columns'].items()}
+    assert types['responded'] == 'bits'
+    assert types['state'] == 'dict'
+    assert types['name'] == 'plain'
+    assert types['msgsSent'] == 'plain'
+    assert json.loads(json.dumps(decode_columnar(table))) == rows
+
+
+def test_columnar_empty():
+    assert decode_columnar(encode_columnar([])) == []
+
+
+def test_columnar_round_trip_on_data_json():
+    with open(os.path.join(REPO_DIR, 'data.json'), 'r') as f:
+        companies = json.load(f)['companies']
+    if isinstance(companies, dict):
+        companies = decode_columnar(companies)
+    table = json.loads(json.dumps(encode_columnar(companies)))
+    assert decode_columnar(table) == companies
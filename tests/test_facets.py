@@ -0,0 +1,59 @@
+import json
+import os
+
+from clusters import STATUS_RULES
+from export import decode_columnar, pack_bits, unpack_bits
+from facets import FACETS_FORMAT, PIPELINE_RULES, build_facets
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMPANIES = [
+    {'inPipeline': True, 'pipelineStatus': 'Active - Due Diligence', 'msgsSent': 3, 'responded': True,
+     'fullState': 'Florida', 'ownership': 'CLOSED', 'byMedium': {'Email': 2, 'Text': 1}, 'byAccount': {'Kevin': 3}},
+    {'inPipeline': False, 'pipelineStatus': 'New Lead', 'msgsSent': 1, 'state': 'GA',
+     'bradfordFacility': 'Bradford OP Office', 'byMedium': {'Email': 1, 'Text': 0}},
+    {'inPipeline': True, 'pipelineStatus': 'Stalled', 'msgsSent': 0, 'override': True,
+     'fullState': 'Florida', 'ownership': 'OPEN'},
+]
+
+
+def members(facets, section, value):
+    bits = unpack_bits(facets['facets'][section][value], facets['length'])
+    return [i for i, bit in enumerate(bits) if bit]
+
+
+def test_build_facets():
+    facets = build_facets(COMPANIES)
+    assert facets['format'] == FACETS_FORMAT
+    assert facets['length'] == 3
+    # independent pipeline tests: an 'Active - Due Diligence' deal is in both
+    assert members(facets, 'pipeline', 'active') == [0]
+    assert members(facets, 'pipeline', 'due_diligence') == [0]
+    assert members(facets, 'pipeline', 'stalled') == [2]
+    assert 'new_lead' not in facets['facets']['pipeline']
+    assert members(facets, 'status', 'responded') == [0]
+    assert members(facets, 'status', 'contacted') == [1]
+    assert members(facets, 'status', 'overridden') == [2]
+    assert members(facets, 'state', 'Florida') == [0, 2]
+    assert members(facets, 'state', 'GA') == [1]
+    assert members(facets, 'ownership', 'bradford_op') == [1]
+    assert members(facets, 'medium', 'Email') == [0, 1]
+    assert members(facets, 'medium', 'Text') == [0]
+    assert members(facets, 'account', 'Kevin') == [0]
+
+
+def test_facets_match_the_filter_rules_on_data_json():
+    with open(os.path.join(REPO_DIR, 'data.json'), 'r') as f:
+        companies = json.load(f)['companies']
+    if isinstance(companies, dict):
+        companies = decode_columnar(companies)
+    facets = build_facets(companies)
+    for key, rule in STATUS_RULES:
+        expected = [bool(rule(c)) for c in companies]
+        if any(expected):
+            assert facets['facets']['status'][key] == pack_bits(expected)
+    for key, rule in PIPELINE_RULES:
+        expected = [bool(c.get('inPipeline') and c.get('pipelineStatus') and rule(c['pipelineStatus']))
+                    for c in companies]
+        if any(expected):
+            assert facets['facets']['pipeline'][key] == pack_bits(expected)
@@ -0,0 +1,126 @@
+import json
+import os
+
+import pytest
+
+import fetch_airtable
+import ingest
+from fixture_server import FixtureServer
+from http_client import call_with_retry, client
+
+COMPANIES = [
+    {'id': f'recC{i}', 'fields': {
+        'Name': name, 'HQ Address': address, 'HQ State': state,
+        'Full HQ State Name': state_name, 'All State(s) Operating In': [state_name],
+        'Ownership': 'CLOSED', 'Override': False, 'Website': f'https://example{i}.com/',
+        'State Tier': 'Tier 1', 'Bradford Facility': '',
+    }}
+    for i, (name, address, state, state_name) in enumerate([
+        ('Harbor Recovery Center', '10 Main St, Springfield, PA 15840', 'PA', 'Pennsylvania'),
+        ('Cardinal Recovery', '22 Oak Ave, Louisville, KY 40202', 'KY', 'Kentucky'),
+        ('Peachtree Detox', '5 Peach St, Atlanta, GA 30303', 'GA', 'Georgia'),
+    ])
+]
+CONTACTS = [{'id': f'recP{i}', 'fields': {'Name': f'Contact {i}', 'Companies': [f'recC{i}']}}
+            for i in range(3)]
+OUTREACH = [
+    {'id': f'recO{i}', 'fields': {
+        'Contacts': [f'recP{i % 3}'], 'Date Sent': f'2026-0{i % 9 + 1}-10T15:00:00.000Z',
+        'Message Medium': 'Email', 'Account': 'Kevin Poler', 'Responded': i == 4,
+        'Scheduled Intro Call': '', 'Assisted Meeting': '', 'Not Interested': [], 'Opened': '',
+    }}
+    for i in range(8)
+]
+PIPELINE_CSV = (
+    'Bradford Pipeline Dashboard\n\n'
+    '#,Facility Name,State(s),Type,Status,Priority,Key Contact,Notes\n'
+    '1,Cardinal Recovery,KY,SUD,Due Diligence,1 - High,Contact 1,\n'
+)
+ACTIONS_CSV = (
+    'Action Tracker\n\n'
+    'Priority,Action Item,Facility,Owner,Deadline,Status,Notes,Pipeline Status\n'
+    'High,Follow up,Cardinal Recovery,Dylan,,Pending,,\n'
+)
+
+
+@pytest.fixture
+def fixtures(tmp_path):
+    root = tmp_path / 'fixtures'
+    (root / 'airtable').mkdir(parents=True)
+    (root / 'sheets').mkdir()
+    for table, records in [('Companies', COMPANIES), ('Contacts', CONTACTS), ('Cold Outreach', OUTREACH)]:
+        (root / 'airtable' / f'{table}.json').write_text(json.dumps(records))
+    (root / 'sheets' / f'{fetch_airtable.PIPELINE_GID}.csv').write_text(PIPELINE_CSV)
+    (root / 'sheets' / f'{fetch_airtable.ACTIONS_GID}.csv').write_text(ACTIONS_CSV)
+    return str(root)
+
+
+@pytest.fixture
+def build(tmp_path, monkeypatch):
+    """Point fetch_airtable's paths into tmp_path; returns a function that sets the service URL."""
+    store = tmp_path / 'store'
+    out = tmp_path / 'out'
+    out.mkdir()
+    monkeypatch.setattr(fetch_airtable, 'PAT', 'fixture')
+    monkeypatch.setattr(fetch_airtable, 'RECORD_STORE_DIR', str(store))
+    monkeypatch.setattr(fetch_airtable, 'SNAPSHOT_DIR', str(store / 'snapshots'))
+    monkeypatch.setattr(fetch_airtable, 'SHEET_CACHE_FILE', str(store / 'sheet_cache.json'))
+    monkeypatch.setattr(fetch_airtable, 'OUTPUT_DIR', str(out))
+    monkeypatch.setattr(fetch_airtable, 'OUTPUT_DIGEST_FILE', str(out / 'data.json.sha256'))
+    monkeypatch.setattr(fetch_airtable, 'GEOCODE_CACHE_FILE', str(out / 'geocode_cache.json'))
+    monkeypatch.setattr(fetch_airtable, 'GEOCODE_CACHE_DB', str(out / 'geocode_cache.sqlite'))
+    monkeypatch.delenv('GITHUB_OUTPUT', raising=False)
+    # A stopped server fails every attempt; don't sit through the backoff
+    monkeypatch.setattr(fetch_airtable, 'call_with_retry',
+                        lambda fn, **kwargs: call_with_retry(fn, **{**kwargs, 'base_delay': 0}))
+
+    def point_at(url):
+        monkeypatch.setattr(fetch_airtable, 'AIRTABLE_API_URL', url)
+        monkeypatch.setattr(fetch_airtable, 'GSHEETS_URL', url)
+        monkeypatch.setattr(ingest, 'CENSUS_GEOCODER_URL', url)
+        return out
+    return point_at
+
+
+def serve(fixture_dir):
+    return FixtureServer(fixture_dir, census_match_rate=1.0).start()
+
+
+def companies(out):
+    with open(os.path.join(out, 'data.json')) as f:
+        return sorted(json.load(f)['companies'], key=lambda c: c['name'])
+
+
+def test_incremental_falls_back_to_snapshots_when_server_is_down(fixtures, build):
+    server = serve(fixtures)
+    out = build(server.url)
+    try:
+        fetch_airtable.main(incremental=True)
+        live = companies(out)
+    finally:
+        server.shutdown()
+        server.server_close()
+        # Pooled keep-alive connections would still reach the handler threads
+        client.close()
+    store_files = {name: (out.parent / 'store' / name).read_bytes()
+                   for name in os.listdir(out.parent / 'store') if name.endswith('.json')}
+
+    # Nothing listens there any more
+    build(server.url)
+    summary = fetch_airtable.main(incremental=True, force=True)
+
+    assert set(summary['sources']) == {'Companies', 'Contacts', 'Cold Outreach', 'Pipeline Sheet', 'Actions Sheet'}
+    assert 'live' not in summary['sources'].values()
+    assert companies(out) == live
+    # The failed sync left the record store as the last good sync wrote it
+    for name, data in store_files.items():
+        assert (out.parent / 'store' / name).read_bytes() == data
+
+
+def test_incremental_without_snapshots_exits(fixtures, build):
+    server = serve(fixtures)
+    server.server_close()
+    build(server.url)
+    with pytest.raises(SystemExit) as exc:
+        fetch_airtable.main(incremental=True)
+    assert exc.value.code == 1
@@ -0,0 +1,99 @@
+import email.utils
+import json
+import time
+
+import pytest
+
+from fixture_server import FixtureServer
+from http_client import DecodeError, HTTPError, call_with_retry, client, is_transient, retry_after_seconds
+
+
+@pytest.mark.parametrize('headers, wait', [
+    ({'Retry-After': '7'}, 7.0),
+    ({'Retry-After': ' 0 '}, 0.0),
+    ({'Retry-After': 'soon'}, None),
+    ({'Retry-After': ''}, None),
+    ({}, None),
+    (None, None),
+])
+def test_retry_after_seconds(headers, wait):
+    assert retry_after_seconds(headers) == wait
+
+
+def test_retry_after_http_date():
+    later = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 25 <= retry_after_seconds({'Retry-After': later}) <= 30
+    earlier = email.utils.formatdate(time.time() - 30, usegmt=True)
+    assert retry_after_seconds({'Retry-After': earlier}) == 0.0
+
+
+def http_error(status):
+    return HTTPError('http://x', status, 'reason', {}, b'')
+
+
+def test_is_transient():
+    assert is_transient(http_error(429))
+    assert is_transient(http_error(503))
+    assert not is_transient(http_error(404))
+    assert is_transient(ConnectionResetError())
+    assert not is_transient(DecodeError('http://x', 'bad gzip'))
+
+
+def failing(errors, result='ok'):
+    """fn for call_with_retry that raises each of errors in turn, then returns result."""
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+    return fn, calls
+
+
+def test_retries_transient_errors():
+    fn, calls = failing([ConnectionResetError(), http_error(503)])
+    assert call_with_retry(fn, base_delay=0) == 'ok'
+    assert len(calls) == 3
+
+
+def test_gives_up_after_max_attempts():
+    fn, calls = failing([ConnectionResetError()] * 5)
+    with pytest.raises(ConnectionResetError):
+        call_with_retry(fn, max_attempts=3, base_delay=0)
+    assert len(calls) == 3
+
+
+def test_does_not_retry_permanent_errors():
+    fn, calls = failing([http_error(404)])
+    with pytest.raises(HTTPError):
+        call_with_retry(fn, base_delay=0)
+    assert len(calls) == 1
+
+
+@pytest.fixture
+def server(tmp_path):
+    (tmp_path / 'airtable').mkdir()
+    records = [{'id': f'rec{i}', 'fields': {'Name': f'Company {i}'}} for i in range(3)]
+    (tmp_path / 'airtable' / 'Companies.json').write_text(json.dumps(records))
+    server = FixtureServer(str(tmp_path), error_rate=1.0, error_statuses=(429, 503), retry_after=0).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    client.close()
+
+
+def test_retries_against_fixture_server(server):
+    url = f'{server.url}/v0/base/Companies'
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        if len(calls) == 3:
+            server.config['error_rate'] = 0.0
+        return client.get(url).json()
+
+    data = call_with_retry(fetch, base_delay=0)
+    assert [r['id'] for r in data['records']] == ['rec0', 'rec1', 'rec2']
+    assert len(calls) == 3
+    assert server.counts['errors'] == 2
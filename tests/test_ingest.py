@@ -0,0 +1,87 @@
+import pytest
+
+from ingest import (
+    Dataset, OutreachAggregate, airtable_companies, airtable_contacts, airtable_messages, company_record,
+    epoch_day, iso_date, normalize_name,
+)
+
+
+@pytest.mark.parametrize('text, day', [
+    ('1970-01-01', 0),
+    ('1970-01-02', 1),
+    ('2024-05-28', 19871),
+    ('2024-05-28T15:00:00.000Z', 19871),
+    ('5/28/2024', 19871),
+    ('05/28/2024', 19871),
+    ('1969-12-31', -1),
+    ('2024-02-30', None),
+    ('13/1/2024', None),
+    ('not a date', None),
+    ('', None),
+    (None, None),
+])
+def test_epoch_day(text, day):
+    assert epoch_day(text) == day
+
+
+@pytest.mark.parametrize('text', ['2000-02-29', '2024-05-28', '2026-12-31'])
+def test_iso_date_inverts_epoch_day(text):
+    assert iso_date(epoch_day(text)) == text
+
+
+def test_iso_date_blank():
+    assert iso_date(None) == ''
+
+
+def test_aggregate_contacts_are_sorted_and_distinct():
+    agg = OutreachAggregate()
+    for contacts in ([5, 2], [2, 9, 5], [], [1, 9, 9]):
+        agg.add(0, None, None, 0, 0, contacts, 1, 1)
+    assert agg.contacts.tolist() == [1, 2, 5, 9]
+    assert agg.msgs_sent == 4
+
+
+def test_normalize_name():
+    assert normalize_name('  Harbor\u00a0Recovery \u202f Center ') == 'harbor recovery center'
+
+
+def test_company_record_rejects_unknown_fields():
+    with pytest.raises(TypeError):
+        company_record('Harbor', adress='typo')
+
+
+def test_add_company_merges_by_priority():
+    ds = Dataset()
+    ds.add_company('c1', company_record('Harbor', address='1 Old Rd', website='old.com'), priority=0)
+    ds.add_company('c1', company_record('Harbor Recovery', address='2 New Rd', ownership=''), priority=1)
+    ds.add_company('c1', company_record('Harbor', website='other.com', ownership='OPEN'), priority=0)
+    comp = ds.companies['c1']
+    assert comp['name'] == 'Harbor'
+    assert comp['address'] == '2 New Rd'
+    assert comp['website'] == 'old.com'
+    assert comp['ownership'] == 'OPEN'
+
+
+def test_airtable_adapters_aggregate_per_company():
+    companies = [{'id': 'recC1', 'fields': {'Name': 'Harbor Recovery', 'Full HQ State Name': 'Florida'}},
+                 {'id': 'recC2', 'fields': {'Name': ' '}}]
+    contacts = [{'id': 'recP1', 'fields': {'Name': 'Ann', 'Companies': ['recC1']}},
+                {'id': 'recP2', 'fields': {'Name': 'Bo', 'Companies': ['recC1', 'recC9']}}]
+    outreach = [
+        {'id': 'recO1', 'fields': {'Contacts': ['recP1'], 'Date Sent': '2026-01-05T10:00:00.000Z',
+                                   'Message Medium': 'Email', 'Account': 'Kevin'}},
+        {'id': 'recO2', 'fields': {'Contacts': ['recP2', 'recP1'], 'Date Sent': '2026-01-02',
+                                   'Message Medium': 'Text', 'Account': 'Kevin', 'Responded': True}},
+    ]
+    ds = Dataset()
+    for cid, comp in airtable_companies(companies):
+        ds.add_company(cid, comp)
+    assert list(ds.companies) == ['recC1']
+    assert ds.companies['recC1']['state'] == 'FL'
+    for msg, company_ids in airtable_messages(outreach, *airtable_contacts(contacts)):
+        ds.add_message(msg, company_ids)
+    agg = ds.aggregates['recC1']
+    assert agg.msgs_sent == 2
+    assert agg.responded_count == 1
+    assert (iso_date(agg.first_day), iso_date(agg.last_day)) == ('2026-01-02', '2026-01-05')
+    assert sorted(ds.contacts.values[c] for c in agg.contacts) == ['recP1', 'recP2']
@@ -0,0 +1,75 @@
+import json
+import os
+
+import pytest
+
+from ingest import PIPELINE_ALIASES, normalize_name
+from name_match import NameIndex, load_company_names, replay_aliases
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+NAMES = {
+    'c1': 'New Life For Women',
+    'c2': 'Rebel New Life Treatment Center',
+    'c3': 'Kingdom Life Recovery',
+    'c4': 'Cardinal Recovery',
+    'c5': 'Peachtree Detox',
+    'c6': 'Southeast Detox',
+    'c7': 'Southeast Addiction Center',
+    'c8': 'Serenity Treatment Center',
+    'c9': 'The Sylvia Brafman Mental Health Center',
+    'c10': 'Harbor Recovery Center',
+    'c11': 'Lakeview Behavioral Health',
+}
+
+
+@pytest.fixture(scope='module')
+def index():
+    return NameIndex(NAMES)
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('Cardinal', 'c4'),
+    ('Peachtree Detox (Evoraa)', 'c5'),
+    ('Serenity Treatment Centers', 'c8'),
+    ('The Sylvia Brafman MH Center', 'c9'),
+])
+def test_accepts(index, name, expected):
+    assert index.match(name)[0] == expected
+
+
+@pytest.mark.parametrize('name', [
+    # Only generic words in common
+    'New Life Recovery',
+    # Straddles two companies
+    'Southeast Detox / Addiction Ctr',
+    'Unrelated Name',
+])
+def test_rejects(index, name):
+    assert index.match(name)[0] is None
+
+
+def _data_json_names():
+    path = os.path.join(REPO_DIR, 'data.json')
+    if not os.path.exists(path):
+        pytest.skip('no data.json')
+    return load_company_names(path)
+
+
+def test_loads_columnar_data_json(tmp_path):
+    from export import encode_columnar
+    rows = [{'name': 'A Place'}, {'name': 'B Place'}]
+    path = tmp_path / 'data.json'
+    path.write_text(json.dumps({'companies': encode_columnar(rows)}))
+    assert load_company_names(str(path)) == {0: 'A Place', 1: 'B Place'}
+
+
+def test_generic_words_do_not_match_on_real_names():
+    # Scored 0.72 against 'New Life For Women', ahead of 'Rebel New Life Treatment Center'
+    names = _data_json_names()
+    assert NameIndex(names).match('New Life Recovery')[0] is None
+
+
+def test_aliases_never_resolve_to_another_company():
+    wrong = [r for r in replay_aliases(_data_json_names(), PIPELINE_ALIASES, normalize_name) if not r[4]]
+    assert wrong == []
@@ -0,0 +1,45 @@
+import pytest
+
+from search_index import SEARCH_INDEX_FORMAT, build_search_index, decode_postings, encode_postings, search_trigrams
+
+
+@pytest.mark.parametrize('ids', [
+    [],
+    [0],
+    [0, 1, 2],
+    [5, 127, 128, 129],
+    [300, 16383, 16384, 2 ** 21, 2 ** 28 + 7],
+])
+def test_postings_round_trip(ids):
+    assert decode_postings(encode_postings(ids)) == ids
+
+
+def test_small_gaps_take_one_byte():
+    # one varint byte per id -> 4 bytes -> 8 base64 chars
+    assert len(encode_postings([3, 10, 100, 227])) == 8
+
+
+def search(index, query):
+    """Candidate ids for a query: the intersection of its trigram postings, as index.html does."""
+    result = None
+    for gram in search_trigrams(query):
+        ids = set(decode_postings(index['grams'].get(gram, '')))
+        result = ids if result is None else result & ids
+    return sorted(result or ())
+
+
+def test_build_search_index():
+    companies = [
+        {'name': 'Harbor Recovery Center', 'address': '10 Main St, Springfield, PA', 'fullState': 'Pennsylvania'},
+        {'name': 'Cardinal Recovery', 'address': '', 'fullState': 'Kentucky', 'allStates': 'Kentucky, Ohio'},
+        {'name': 'Peachtree Detox', 'address': None, 'fullState': 'Georgia'},
+    ]
+    index = build_search_index(companies)
+    assert index['format'] == SEARCH_INDEX_FORMAT
+    assert index['length'] == 3
+    assert search(index, 'recovery') == [0, 1]
+    assert search(index, 'Ohio') == [1]
+    assert search(index, 'springf') == [0]
+    assert search(index, 'detox') == [2]
+    assert search(index, 'xyz') == []
+    assert list(index['grams']) == sorted(index['grams'])
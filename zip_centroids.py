@@ -0,0 +1,160 @@
+"""
+Offline ZIP code -> centroid lookup, used by get_coords when a company has
+no cached geocode.
+
+zip_centroids.bin is a sorted fixed-width table that is memory-mapped and
+binary-searched, so nothing is parsed up front:
+
+    header   b'ZIPC', uint16 version, uint32 count          (little-endian)
+    zips     count x uint32   ZIP as an integer, ascending
+    lats     count x int32    latitude  * 1e5
+    lngs     count x int32    longitude * 1e5
+    states   count x 2 bytes  USPS state abbreviation
+
+A ZIP missing from the table falls back to the nearest listed ZIP with the
+same 3-digit prefix, which is nearly always in the same area.
+
+Rebuild from the Census ZCTA Gazetteer (or any CSV/TSV with zip, lat and
+lng columns):
+    python zip_centroids.py 2023_Gaz_zcta_national.txt [zip_centroids.bin]
+"""
+
+import bisect
+import csv
+import mmap
+import os
+import re
+import struct
+import sys
+
+ZIP_CENTROIDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'zip_centroids.bin')
+MAGIC = b'ZIPC'
+VERSION = 1
+_HEADER = struct.Struct('<4sHI')
+SCALE = 100000
+
+_ZIP_RE = re.compile(r'\b(\d{5})(?:-\d{4})?\b')
+
+
+class ZipCentroids:
+    """Memory-mapped view of zip_centroids.bin."""
+
+    def __init__(self, path=ZIP_CENTROIDS_FILE):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path}: not a version {VERSION} ZIP centroid table')
+        self.count = count
+        view = memoryview(self._mm)
+        start = _HEADER.size
+        self.zips = view[start:start + 4 * count].cast('I')
+        self.lats = view[start + 4 * count:start + 8 * count].cast('i')
+        self.lngs = view[start + 8 * count:start + 12 * count].cast('i')
+        self._states = start + 12 * count
+
+    def __len__(self):
+        return self.count
+
+    def state(self, i):
+        return self._mm[self._states + 2 * i:self._states + 2 * i + 2].decode('ascii')
+
+    def _entry(self, i):
+        return self.lats[i] / SCALE, self.lngs[i] / SCALE, self.state(i)
+
+    def lookup(self, zipcode):
+        """Return (lat, lng, state) for a 5-digit ZIP, or None.
+
+        An unlisted ZIP resolves to the nearest listed one sharing its 3-digit prefix.
+        """
+        z = int(zipcode)
+        i = bisect.bisect_left(self.zips, z)
+        if i < self.count and self.zips[i] == z:
+            return self._entry(i)
+        prefix = z // 100
+        candidates = [j for j in (i - 1, i) if 0 <= j < self.count and self.zips[j] // 100 == prefix]
+        if not candidates:
+            return None
+        return self._entry(min(candidates, key=lambda j: abs(self.zips[j] - z)))
+
+
+_table = None
+
+
+def zip_centroid(address, state_abbr=''):
+    """(lat, lng) for the ZIP in an address, or None.
+
+    The last 5-digit group is taken as the ZIP (street numbers come first),
+    and a centroid in a different state than state_abbr is ignored.
+    """
+    global _table
+    zips = _ZIP_RE.findall(address or '')
+    if not zips:
+        return None
+    if _table is None:
+        if not os.path.exists(ZIP_CENTROIDS_FILE):
+            return None
+        _table = ZipCentroids()
+    hit = _table.lookup(zips[-1])
+    if not hit or (state_abbr and hit[2] != state_abbr):
+        return None
+    return hit[0], hit[1]
+
+
+# ============================================================
+# BUILD
+# ============================================================
+_COLUMN_NAMES = {
+    'zip': ('zip', 'zip_code', 'zipcode', 'zcta', 'zcta5', 'geoid'),
+    'lat': ('lat', 'latitude', 'intptlat'),
+    'lng': ('lng', 'long', 'lon', 'longitude', 'intptlong'),
+    'state': ('state', 'state_abbr', 'usps'),
+}
+
+
+def read_source(path):
+    """Yield (zip, lat, lng, state) from a CSV/TSV with recognizable column names."""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        sample = f.readline()
+        f.seek(0)
+        reader = csv.reader(f, delimiter='\t' if '\t' in sample else ',')
+        header = [h.strip().lower() for h in next(reader)]
+        cols = {}
+        for key, names in _COLUMN_NAMES.items():
+            cols[key] = next((header.index(n) for n in names if n in header), None)
+        if cols['zip'] is None or cols['lat'] is None or cols['lng'] is None:
+            raise ValueError(f'{path}: need zip, lat and lng columns, got {header}')
+        for row in reader:
+            try:
+                z = row[cols['zip']].strip()
+                lat, lng = float(row[cols['lat']]), float(row[cols['lng']])
+            except (IndexError, ValueError):
+                continue
+            state = row[cols['state']].strip().upper() if cols['state'] is not None else ''
+            if len(z) == 5 and z.isdigit():
+                yield int(z), lat, lng, state
+
+
+def build(entries, path=ZIP_CENTROIDS_FILE):
+    """Write (zip, lat, lng, state) entries as a sorted table; returns the entry count."""
+    by_zip = {}
+    for z, lat, lng, state in entries:
+        by_zip[z] = (lat, lng, state)
+    zips = sorted(by_zip)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(zips)))
+        f.write(struct.pack(f'<{len(zips)}I', *zips))
+        f.write(struct.pack(f'<{len(zips)}i', *(round(by_zip[z][0] * SCALE) for z in zips)))
+        f.write(struct.pack(f'<{len(zips)}i', *(round(by_zip[z][1] * SCALE) for z in zips)))
+        f.write(b''.join((by_zip[z][2] or '  ')[:2].ljust(2).encode('ascii') for z in zips))
+    os.replace(tmp, path)
+    return len(zips)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        sys.exit('usage: python zip_centroids.py SOURCE.csv|tsv [OUT.bin]')
+    out = sys.argv[2] if len(sys.argv) > 2 else ZIP_CENTROIDS_FILE
+    n = build(read_source(sys.argv[1]), out)
+    print(f"Wrote {n} ZIP centroids to {out} ({os.path.getsize(out) / 1024:.0f} KB)")